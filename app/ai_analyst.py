@@ -27,6 +27,7 @@ Columns:
 - url (String): Source URL
 - source (String): Source name (e.g., 'baidu', 'xinhua')
 - deep_collected (Boolean): Whether deep content has been collected
+- duplicate_of (Integer): Near-duplicate of this collection_item id (syndicated copy); filter `duplicate_of IS NULL` to count each article once
 - deep_content (Text): (Legacy) Deep content text
 - created_at (DateTime)
 
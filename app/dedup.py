@@ -0,0 +1,276 @@
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import insert, update, bindparam
+
+from app import db
+from app.models import CollectionItem, DeepCollectionContent, ItemSignatureBand
+from tools.near_dup import (
+    title_simhash, simhash_bands, hamming, to_signed64, to_unsigned64, normalize_title,
+    content_minhash, minhash_bands, jaccard_estimate, pack_signature, unpack_signature
+)
+
+
+def _title_signature(title):
+    cfg = current_app.config
+    if len(normalize_title(title)) < cfg['NEAR_DUP_MIN_TITLE']:
+        return None
+    return title_simhash(title)
+
+
+def _content_signature(content):
+    cfg = current_app.config
+    if not content or len(content) < cfg['NEAR_DUP_MIN_CONTENT']:
+        return None
+    return content_minhash(content)
+
+
+def _candidates(keys, exclude_id=None):
+    """
+    与给定分桶键同桶的条目 id (按 id 升序)
+    """
+    if not keys:
+        return []
+    q = db.session.query(ItemSignatureBand.item_id).filter(ItemSignatureBand.key.in_(keys))
+    if exclude_id is not None:
+        q = q.filter(ItemSignatureBand.item_id != exclude_id)
+    return sorted({r[0] for r in q.distinct()})
+
+
+def _compare(ids, title_hash, content_sig):
+    """
+    逐个核对候选条目
+    :return: [(item, title_distance, content_jaccard)]，仅返回达到阈值的
+    """
+    if not ids:
+        return []
+    cfg = current_app.config
+    rows = db.session.query(CollectionItem, DeepCollectionContent.minhash) \
+        .outerjoin(DeepCollectionContent, DeepCollectionContent.item_id == CollectionItem.id) \
+        .filter(CollectionItem.id.in_(ids)).order_by(CollectionItem.id).all()
+    matches = []
+    for other, other_minhash in rows:
+        distance = None
+        if title_hash is not None and other.title_simhash is not None:
+            distance = hamming(title_hash, to_unsigned64(other.title_simhash))
+        jaccard = None
+        if content_sig is not None and other_minhash:
+            jaccard = jaccard_estimate(content_sig, unpack_signature(other_minhash))
+        if (distance is not None and distance <= cfg['NEAR_DUP_TITLE_DISTANCE']) or \
+                (jaccard is not None and jaccard >= cfg['NEAR_DUP_CONTENT_JACCARD']):
+            matches.append((other, distance, jaccard))
+    return matches
+
+
+def _signature_keys(title_hash, content_sig):
+    keys = []
+    if title_hash is not None:
+        keys += simhash_bands(title_hash)
+    if content_sig is not None:
+        keys += minhash_bands(content_sig)
+    return keys
+
+
+def index_item(item, content=None):
+    """
+    计算条目的标题/正文签名、更新分桶索引，并与已入库条目比对
+    命中时 duplicate_of 指向最早的原始条目 (只把较新的条目标为重复)
+    :param content: 深度采集正文，默认取 item.deep_content_obj
+    :return: 原始条目 id 或 None
+    """
+    if item.id is None:
+        db.session.flush()
+    if content is None and item.deep_content_obj:
+        content = item.deep_content_obj.content
+
+    title_hash = _title_signature(item.title)
+    content_sig = _content_signature(content)
+    item.title_simhash = to_signed64(title_hash) if title_hash is not None else None
+    if item.deep_content_obj:
+        item.deep_content_obj.minhash = pack_signature(content_sig) if content_sig else None
+
+    keys = _signature_keys(title_hash, content_sig)
+    matches = _compare(_candidates(keys, exclude_id=item.id), title_hash, content_sig)
+
+    item.signature_bands = [ItemSignatureBand(key=k) for k in keys]
+
+    root = None
+    for other, _, _ in matches:
+        origin = other.duplicate_of or other.id
+        if origin != item.id and (root is None or origin < root):
+            root = origin
+    item.duplicate_of = root if root is not None and root < item.id else None
+    return item.duplicate_of
+
+
+def find_title_duplicate(title, require_content=True):
+    """
+    入库前按标题查找已有的原始条目 (用于跳过重复的深度采集)
+    :param require_content: 只认已有深度采集正文的条目
+    :return: CollectionItem 或 None
+    """
+    title_hash = _title_signature(title)
+    if title_hash is None:
+        return None
+    for other, _, _ in _compare(_candidates(simhash_bands(title_hash)), title_hash, None):
+        origin = db.session.get(CollectionItem, other.duplicate_of) if other.duplicate_of else other
+        if origin is None:
+            continue
+        if not require_content or (origin.deep_content_obj and origin.deep_content_obj.content):
+            return origin
+    return None
+
+
+def similar_items(item, limit=20):
+    """
+    与条目近似重复的其他条目：同桶比对命中的，以及 duplicate_of 指向它或与它指向同一原始条目的
+    :return: [(other, title_distance, content_jaccard)]
+    """
+    title_hash = to_unsigned64(item.title_simhash) if item.title_simhash is not None else None
+    content_sig = None
+    if item.deep_content_obj and item.deep_content_obj.minhash:
+        content_sig = unpack_signature(item.deep_content_obj.minhash)
+
+    ids = set(_candidates(_signature_keys(title_hash, content_sig), exclude_id=item.id))
+    origin = item.duplicate_of or item.id
+    linked = db.session.query(CollectionItem.id).filter(
+        (CollectionItem.duplicate_of == origin) | (CollectionItem.id == origin)
+    ).all()
+    ids.update(r[0] for r in linked)
+    ids.discard(item.id)
+
+    found = {other.id: (other, d, j) for other, d, j in _compare(sorted(ids), title_hash, content_sig)}
+    for other in CollectionItem.query.filter(CollectionItem.id.in_(ids - set(found))).all():
+        found[other.id] = (other, None, None)
+    return sorted(found.values(), key=lambda m: m[0].id)[:limit]
+
+
+def forget_items(ids):
+    """
+    删除条目前调用：指向它们的重复条目改为独立条目
+    """
+    if ids:
+        CollectionItem.query.filter(CollectionItem.duplicate_of.in_(ids)).update(
+            {CollectionItem.duplicate_of: None}, synchronize_session=False)
+
+
+def apply_resolved_url(item, final):
+    """
+    条目地址换成跳转解析后的真实地址，原地址存入 original_url
+    真实地址已有条目时不改地址 (url_hash 唯一)，本条并入已有条目：
+    标为已有条目 (或其原始条目) 的重复，原先指向本条的重复条目一并改指
+    :return: 持有真实地址的条目 (本条或已有条目)
+    """
+    other = CollectionItem.find_by_url(final)
+    if other is None or other.id == item.id:
+        item.original_url = item.url
+        item.url = final
+        return item
+    origin = other.duplicate_of or other.id
+    if origin == item.id:
+        other.duplicate_of = None
+        origin = other.id
+    if not other.original_url:
+        other.original_url = item.url
+    CollectionItem.query.filter(CollectionItem.duplicate_of == item.id).update({CollectionItem.duplicate_of: origin})
+    item.duplicate_of = origin
+    return other
+
+
+def _chunks(values, size=500):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def index_items(entries):
+    """
+    批量版 index_item：整批计算签名、一次替换分桶、按桶批量取候选，结果批量写回
+    :param entries: [(item_id, title, content)]，content 为 None 时沿用已存的正文签名
+    :return: {item_id: duplicate_of}
+    """
+    if not entries:
+        return {}
+    cfg = current_app.config
+    ids = [item_id for item_id, _, _ in entries]
+    stored = {}
+    for part in _chunks(ids):
+        rows = db.session.query(CollectionItem.id, CollectionItem.duplicate_of, DeepCollectionContent.minhash) \
+            .outerjoin(DeepCollectionContent, DeepCollectionContent.item_id == CollectionItem.id) \
+            .filter(CollectionItem.id.in_(part))
+        stored.update((item_id, (dup, minhash)) for item_id, dup, minhash in rows)
+
+    sigs = {}
+    minhashes = []
+    for item_id, title, content in entries:
+        title_hash = _title_signature(title)
+        if content is not None:
+            content_sig = _content_signature(content)
+            minhashes.append({'b_item_id': item_id, 'b_minhash': pack_signature(content_sig) if content_sig else None})
+        else:
+            minhash = stored.get(item_id, (None, None))[1]
+            content_sig = unpack_signature(minhash) if minhash else None
+        sigs[item_id] = (title_hash, content_sig, _signature_keys(title_hash, content_sig))
+    if minhashes:
+        table = DeepCollectionContent.__table__
+        db.session.execute(
+            table.update().where(table.c.item_id == bindparam('b_item_id')).values(minhash=bindparam('b_minhash')),
+            minhashes
+        )
+
+    for part in _chunks(ids):
+        ItemSignatureBand.query.filter(ItemSignatureBand.item_id.in_(part)).delete(synchronize_session=False)
+    bands = [{'item_id': i, 'key': k} for i, (_, _, keys) in sigs.items() for k in keys]
+    if bands:
+        db.session.execute(insert(ItemSignatureBand), bands)
+
+    # 同桶候选 (含同批次条目)
+    by_key = defaultdict(set)
+    for part in _chunks({k for _, _, keys in sigs.values() for k in keys}):
+        for item_id, key in db.session.query(ItemSignatureBand.item_id, ItemSignatureBand.key) \
+                .filter(ItemSignatureBand.key.in_(part)):
+            by_key[key].add(item_id)
+
+    others = {}
+    other_ids = set().union(*by_key.values()) - set(ids) if by_key else set()
+    for part in _chunks(other_ids):
+        rows = db.session.query(CollectionItem.id, CollectionItem.title_simhash, CollectionItem.duplicate_of,
+                                DeepCollectionContent.minhash) \
+            .outerjoin(DeepCollectionContent, DeepCollectionContent.item_id == CollectionItem.id) \
+            .filter(CollectionItem.id.in_(part))
+        for other_id, other_title, other_dup, other_minhash in rows:
+            others[other_id] = (
+                to_unsigned64(other_title) if other_title is not None else None,
+                unpack_signature(other_minhash) if other_minhash else None,
+                other_dup
+            )
+
+    result = {}
+    for item_id in sorted(ids):
+        title_hash, content_sig, keys = sigs[item_id]
+        candidates = set().union(*(by_key[k] for k in keys)) if keys else set()
+        candidates.discard(item_id)
+        root = None
+        for other_id in candidates:
+            if other_id in sigs:
+                other_title, other_sig = sigs[other_id][:2]
+                other_dup = result[other_id] if other_id in result else stored[other_id][0]
+            else:
+                other_title, other_sig, other_dup = others[other_id]
+            distance = hamming(title_hash, other_title) \
+                if title_hash is not None and other_title is not None else None
+            jaccard = jaccard_estimate(content_sig, other_sig) \
+                if content_sig is not None and other_sig is not None else None
+            if (distance is not None and distance <= cfg['NEAR_DUP_TITLE_DISTANCE']) or \
+                    (jaccard is not None and jaccard >= cfg['NEAR_DUP_CONTENT_JACCARD']):
+                origin = other_dup or other_id
+                if origin != item_id and (root is None or origin < root):
+                    root = origin
+        result[item_id] = root if root is not None and root < item_id else None
+
+    db.session.execute(update(CollectionItem), [
+        {'id': i, 'title_simhash': to_signed64(sigs[i][0]) if sigs[i][0] is not None else None,
+         'duplicate_of': result[i]}
+        for i in ids
+    ])
+    return result
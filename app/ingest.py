@@ -0,0 +1,152 @@
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, update
+
+from app import db
+from app.models import CollectionItem, DeepCollectionContent
+from app.dedup import index_items
+from app.search import mark_search_dirty
+from app.pagination import invalidate_counts
+from tools.url_canon import url_hash
+from tools.cover_resolver import get_cover_resolver
+from tools.redirect_resolver import get_redirect_resolver
+
+
+def resolved_urls(item_data):
+    """
+    推送时跳转链接可能还没解析完，入库前取解析缓存换成真实地址
+    :return: (url, original_url)
+    """
+    url = item_data.get('url')
+    final = get_redirect_resolver().cached(url)
+    if final:
+        return final, url
+    return url, item_data.get('original_url')
+
+
+def _prepare(items_data):
+    """
+    整理提交的条目：换成真实地址、补上已解析的封面，按规范化 URL 去重 (同一页面以最后一条为准)
+    """
+    covers = get_cover_resolver()
+    entries = {}
+    for item_data in items_data:
+        url, original_url = resolved_urls(item_data)
+        h = url_hash(url)
+        if not h:
+            continue
+        entries[h] = {
+            'url': url,
+            'url_hash': h,
+            'original_url': original_url,
+            'title': item_data.get('title'),
+            'cover': item_data.get('cover') or covers.cached(url),
+            'source': item_data.get('source'),
+            'deep_collected': item_data.get('deep_collected', False),
+            'deep_content': item_data.get('deep_content')
+        }
+    return list(entries.values())
+
+
+def _existing_ids(chunk):
+    """
+    一次查询找出本块已入库的条目 (含之前按跳转链接入库的)
+    :return: {url_hash: item_id}
+    """
+    hashes = [e['url_hash'] for e in chunk]
+    wrapped = {}
+    for e in chunk:
+        h = url_hash(e['original_url']) if e['original_url'] else None
+        if h and h != e['url_hash']:
+            wrapped[h] = e['url_hash']
+    existing = {}
+    rows = db.session.query(CollectionItem.id, CollectionItem.url_hash) \
+        .filter(CollectionItem.url_hash.in_(hashes + list(wrapped)))
+    for item_id, h in rows:
+        if h in wrapped:
+            existing.setdefault(wrapped[h], item_id)
+        else:
+            existing[h] = item_id
+    return existing
+
+
+def _save_chunk(chunk, keyword):
+    now = datetime.utcnow()
+    existing = _existing_ids(chunk)
+
+    new_rows = []
+    updates = []
+    for e in chunk:
+        row = {
+            'keyword': keyword,
+            'title': e['title'],
+            'cover': e['cover'],
+            'url': e['url'],
+            'url_hash': e['url_hash'],
+            'source': e['source'],
+            'deep_collected': e['deep_collected'],
+            'updated_at': now
+        }
+        if e['original_url']:
+            row['original_url'] = e['original_url']
+        item_id = existing.get(e['url_hash'])
+        if item_id:
+            row['id'] = item_id
+            if not row['cover']:
+                # 本次既没带封面也没解析到，保留库里已有的封面
+                del row['cover']
+            updates.append(row)
+        else:
+            row['created_at'] = now
+            new_rows.append(row)
+
+    ids = dict(existing)
+    if new_rows:
+        # 批量插入不经过 @validates，url_hash 已在上面算好
+        inserted = db.session.execute(
+            insert(CollectionItem).returning(CollectionItem.id, CollectionItem.url_hash), new_rows)
+        ids.update((h, item_id) for item_id, h in inserted)
+    if updates:
+        db.session.execute(update(CollectionItem), updates)
+
+    # 深度采集正文：已有的按主键更新，其余插入
+    contents = {ids[e['url_hash']]: e['deep_content'] for e in chunk if e['deep_content']}
+    if contents:
+        have = dict(db.session.query(DeepCollectionContent.item_id, DeepCollectionContent.id)
+                    .filter(DeepCollectionContent.item_id.in_(list(contents))))
+        content_updates = [{'id': have[i], 'content': c, 'updated_at': now} for i, c in contents.items() if i in have]
+        content_inserts = [{'item_id': i, 'content': c, 'created_at': now, 'updated_at': now}
+                           for i, c in contents.items() if i not in have]
+        if content_updates:
+            db.session.execute(update(DeepCollectionContent), content_updates)
+        if content_inserts:
+            db.session.execute(insert(DeepCollectionContent), content_inserts)
+
+    index_items([(ids[e['url_hash']], e['title'], e['deep_content'] or None) for e in chunk])
+    mark_search_dirty(ids[e['url_hash']] for e in chunk)
+    return len(new_rows), len(updates)
+
+
+def save_items(items_data, keyword, chunk_size=None):
+    """
+    采集结果批量入库：每块一次按 URL 哈希探测已有条目，新条目批量插入、已有条目批量更新，
+    深度采集正文批量写入，近似重复索引整块计算，每块单独提交
+    :param items_data: 前端提交的条目 [{url, title, cover, source, deep_collected, deep_content, original_url}]
+    :return: {'saved', 'created', 'updated'}
+    """
+    chunk_size = chunk_size or current_app.config['BULK_SAVE_CHUNK']
+    entries = _prepare(items_data)
+    created = updated = 0
+    for i in range(0, len(entries), chunk_size):
+        try:
+            c, u = _save_chunk(entries[i:i + chunk_size], keyword)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        created += c
+        updated += u
+    if created:
+        invalidate_counts(CollectionItem.__tablename__)
+    return {'saved': created + updated, 'created': created, 'updated': updated}
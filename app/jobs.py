@@ -0,0 +1,534 @@
+import json
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_, and_, func, update, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import undefer
+
+from app import db
+from app.models import Job, CollectionItem, CrawlRule, DeepCollectionContent, match_rule
+from app.dedup import index_item, index_items, apply_resolved_url
+from app.search import rebuild_search_index
+from tools.baidu_crawler import deep_collect_with_rule
+from tools.crawl_plan import get_rule_plan
+from tools.concurrent_runner import DomainLimitedRunner
+from tools.redirect_resolver import get_redirect_resolver
+from tools.fetcher import get_fetcher
+from tools.url_canon import url_hash
+
+# 任务类型 -> 处理函数
+JOB_HANDLERS = {}
+SQLITE_BUSY_TIMEOUT_MS = 5000  # sqlite3 驱动默认的等锁时间
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobRequeue(Exception):
+    """
+    任务本轮未做完：保留断点重新排队，由 worker 稍后续跑
+    :param progressed: 本轮是否有进展；没有进展的一轮计入租用次数，避免无限重排
+    """
+    def __init__(self, progressed=True):
+        super().__init__('requeued')
+        self.progressed = progressed
+
+
+def job_handler(job_type):
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue_job(job_type, payload):
+    """
+    创建任务并立即返回，由 worker 进程异步执行
+    """
+    job = Job(type=job_type, status='queued', payload_json=json.dumps(payload, ensure_ascii=False))
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def job_to_dict(job):
+    return {
+        'id': job.id,
+        'type': job.type,
+        'status': job.status,
+        'progress': job.progress or 0,
+        'total': job.total or 0,
+        'result': json.loads(job.result_json) if job.result_json else None,
+        'error': job.error,
+        'attempts': job.attempts or 0,
+        'cancel_requested': bool(job.cancel_requested),
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def cancel_job(job):
+    """
+    排队中的任务直接取消；运行中的任务打上标记，由 worker 在下一个检查点停止
+    """
+    if job.status == 'queued':
+        job.status = 'cancelled'
+        job.finished_at = datetime.utcnow()
+    elif job.status == 'running':
+        job.cancel_requested = True
+    db.session.commit()
+
+
+def lease_job(owner):
+    """
+    租用一个可执行的任务：排队中的，或租约已过期 (worker 崩溃/重启) 的运行中任务
+    通过 version 乐观锁保证多个 worker 不会拿到同一个任务
+    :return: Job 或 None
+    """
+    lease_seconds = current_app.config['JOB_LEASE_SECONDS']
+    max_attempts = current_app.config['JOB_MAX_ATTEMPTS']
+    now = datetime.utcnow()
+    candidates = Job.query.filter(or_(
+        Job.status == 'queued',
+        and_(Job.status == 'running', Job.lease_expires_at < now)
+    )).order_by(Job.id).limit(10).all()
+
+    for job in candidates:
+        if (job.attempts or 0) >= max_attempts:
+            job.status = 'failed'
+            job.error = job.error or 'lease expired too many times'
+            job.finished_at = now
+            db.session.commit()
+            continue
+        updated = Job.query.filter(Job.id == job.id, Job.version == job.version).update({
+            Job.status: 'running',
+            Job.lease_owner: owner,
+            Job.lease_expires_at: now + timedelta(seconds=lease_seconds),
+            Job.version: (job.version or 0) + 1,
+            Job.attempts: (job.attempts or 0) + 1,
+            Job.started_at: job.started_at or now
+        }, synchronize_session=False)
+        db.session.commit()
+        if updated:
+            db.session.refresh(job)
+            return job
+    return None
+
+
+class JobContext:
+    """
+    传给任务处理函数的上下文：汇报进度、续租、保存断点、检查取消
+    """
+    HEARTBEAT_INTERVAL = 2
+
+    def __init__(self, job):
+        self.job = job
+        self.payload = json.loads(job.payload_json) if job.payload_json else {}
+        self.checkpoint = json.loads(job.checkpoint_json) if job.checkpoint_json else {}
+        self._last_beat = 0
+        self._renewed = time.monotonic()  # 最近一次成功续租
+
+    def set_total(self, total):
+        self.job.total = total
+        self.report(self.job.progress or 0, force=True)
+
+    def report(self, progress, checkpoint=None, force=False):
+        """
+        汇报进度；force 时提交会话 (任务已写入的数据与断点一起落库)，否则只按心跳间隔续租
+        """
+        self.job.progress = progress
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        if not force:
+            self.heartbeat()
+            return
+        self._last_beat = self._renewed = time.monotonic()
+        self.job.checkpoint_json = json.dumps(self.checkpoint, ensure_ascii=False)
+        self.job.lease_expires_at = datetime.utcnow() + timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+        db.session.commit()
+        self._check_cancel(db.session.query(Job.cancel_requested).filter(Job.id == self.job.id).scalar())
+
+    def heartbeat(self):
+        """
+        续租并写入进度、读取取消标记；被取消时抛出 JobCancelled
+        在单独的连接上执行，不提交任务会话里尚未提交的写入，也不使已加载的对象过期
+        """
+        now = time.monotonic()
+        if now - self._last_beat < self.HEARTBEAT_INTERVAL:
+            return
+        self._last_beat = now
+        lease = datetime.utcnow() + timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+        with db.engine.connect() as conn:
+            sqlite = conn.dialect.name == 'sqlite'
+            if sqlite:
+                # 任务会话有未提交的写入时 SQLite 库被锁定：不等锁，续租留到下一次提交
+                conn.exec_driver_sql('PRAGMA busy_timeout = 0')
+                conn.commit()
+            try:
+                conn.execute(update(Job).where(Job.id == self.job.id)
+                             .values(lease_expires_at=lease, progress=self.job.progress))
+                conn.commit()
+                self._renewed = now
+            except OperationalError:
+                conn.rollback()
+            cancelled = conn.execute(select(Job.cancel_requested).where(Job.id == self.job.id)).scalar()
+            conn.rollback()
+            if sqlite:
+                conn.exec_driver_sql(f'PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}')
+                conn.commit()
+        self._check_cancel(cancelled)
+        if now - self._renewed > current_app.config['JOB_LEASE_SECONDS'] / 2:
+            # 一直没能单独续租：连同已汇报的断点一起提交，避免租约过期被其他 worker 接手
+            print(f"Job {self.job.id} lease renewal blocked, committing checkpoint")
+            self.report(self.job.progress, force=True)
+
+    def _check_cancel(self, cancelled):
+        if cancelled:
+            raise JobCancelled()
+
+
+def run_job(job):
+    handler = JOB_HANDLERS.get(job.type)
+    if not handler:
+        job.status = 'failed'
+        job.error = f"unknown job type: {job.type}"
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return
+
+    ctx = JobContext(job)
+    try:
+        result = handler(ctx)
+        job.status = 'done'
+        job.result_json = json.dumps(result, ensure_ascii=False)
+    except JobCancelled:
+        db.session.rollback()
+        job.status = 'cancelled'
+    except JobRequeue as e:
+        # 断点已由处理函数提交，重新排队后从断点继续
+        job.status = 'queued'
+        job.checkpoint_json = json.dumps(ctx.checkpoint, ensure_ascii=False)
+        if e.progressed:
+            job.attempts = max((job.attempts or 1) - 1, 0)
+        job.lease_owner = None
+        job.lease_expires_at = None
+        db.session.commit()
+        return
+    except Exception as e:
+        db.session.rollback()
+        print(f"Job {job.id} ({job.type}) error: {e}")
+        job.status = 'failed'
+        job.error = str(e)
+    job.lease_owner = None
+    job.lease_expires_at = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def worker_loop(app, stop_event=None):
+    """
+    worker 主循环：不断租用并执行任务，空闲时按 JOB_POLL_INTERVAL 轮询
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    with app.app_context():
+        poll = app.config['JOB_POLL_INTERVAL']
+        # 后台任务不占用网页请求线程，限速冷却时一直排队等待
+        get_fetcher().max_wait = None
+        print(f"Job worker {owner} started")
+        while not (stop_event and stop_event.is_set()):
+            try:
+                job = lease_job(owner)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Job lease error: {e}")
+                job = None
+            if job is None:
+                time.sleep(poll)
+                continue
+            print(f"Job worker {owner} running job {job.id} ({job.type})")
+            run_job(job)
+            db.session.remove()
+
+
+# --- Job handlers ---
+
+@job_handler('batch_deep')
+def batch_deep_job(ctx):
+    cfg = current_app.config
+    ids = ctx.payload.get('ids', [])
+    manual_rule_id = ctx.payload.get('rule_id')
+    workers = ctx.payload.get('workers') or cfg['BATCH_DEEP_WORKERS']
+    skip_duplicates = ctx.payload.get('skip_duplicates')
+    if skip_duplicates is None:
+        skip_duplicates = cfg['NEAR_DUP_SKIP']
+
+    # 断点续跑：跳过已经处理过的条目
+    done_ids = set(ctx.checkpoint.get('done_ids', []))
+    processed = ctx.checkpoint.get('processed', 0)
+    skipped = ctx.checkpoint.get('skipped', 0)
+
+    items = CollectionItem.query.filter(CollectionItem.id.in_(ids)).all()
+    items_by_id = {it.id: it for it in items}
+    ctx.set_total(len(items))
+
+    all_rules = CrawlRule.query.all()
+    manual_rule = None
+    if manual_rule_id:
+        manual_rule = db.session.get(CrawlRule, int(manual_rule_id))
+
+    # 早期入库的百度跳转链接先并发解析为真实地址，规则按真实域名匹配，也省掉抓取时的一次跳转
+    resolved = get_redirect_resolver().resolve_many([it.url for it in items if it.id not in done_ids and it.url])
+
+    # Build tasks here; runner threads only fetch and parse, never touch the ORM
+    tasks = []
+    targets = {}  # 并入已有条目的跳转条目 id -> 正文写入的条目
+    for it in items:
+        item_id = it.id
+        if item_id in done_ids:
+            continue
+        if not it.url:
+            done_ids.add(item_id)
+            continue
+        if it.url in resolved:
+            owner = apply_resolved_url(it, resolved[it.url])
+            if owner is not it:
+                # 真实地址已有条目：本条已并入该条目，正文改为采集到该条目上 (它在本批中或已采集过时跳过)
+                if owner.deep_collected or owner.id in items_by_id:
+                    done_ids.add(item_id)
+                    skipped += 1
+                    continue
+                targets[item_id] = owner
+                it = owner
+        # 近似重复条目的正文与原始条目相同，不再抓取
+        if skip_duplicates and it.duplicate_of:
+            done_ids.add(item_id)
+            skipped += 1
+            continue
+
+        # Priority:
+        # 1. Manual rule (if selected)
+        # 2. Existing associated rule (it.rule)
+        # 3. Auto-match from all rules
+        rule = manual_rule or it.rule or match_rule(all_rules, it.url, it.source)
+        rule_args = None
+        if rule:
+            it.rule_id = rule.id
+            rule_args = get_rule_plan(rule)
+        tasks.append((item_id, it.url, (it.url, rule_args)))
+
+    # 后台任务默认不设截止时间；等待慢速抓取期间按心跳间隔续租
+    runner = DomainLimitedRunner(
+        max_workers=workers,
+        per_domain=cfg['BATCH_DEEP_PER_DOMAIN'],
+        deadline=cfg['BATCH_DEEP_JOB_DEADLINE'] or None
+    )
+    pending = 0
+    done_before = len(done_ids)
+    for item_id, content_text, error in runner.run(tasks, deep_collect_with_rule,
+                                                   tick=ctx.HEARTBEAT_INTERVAL, on_tick=ctx.heartbeat):
+        done_ids.add(item_id)
+        if error:
+            print(f"Batch deep error item {item_id}: {error}")
+        elif content_text:
+            it = targets.get(item_id) or items_by_id[item_id]
+            if it.deep_content_obj:
+                it.deep_content_obj.content = content_text
+            else:
+                it.deep_content_obj = DeepCollectionContent(content=content_text)
+            it.deep_collected = True
+            index_item(it, content_text)
+            processed += 1
+            pending += 1
+        checkpoint = {'done_ids': sorted(done_ids), 'processed': processed, 'skipped': skipped}
+        # Commit in chunks so finished work survives a crash further down the batch
+        if pending >= cfg['BATCH_DEEP_COMMIT_CHUNK']:
+            pending = 0
+            ctx.report(len(done_ids), checkpoint, force=True)
+        else:
+            ctx.report(len(done_ids), checkpoint)
+
+    ctx.report(len(done_ids), {'done_ids': sorted(done_ids), 'processed': processed, 'skipped': skipped}, force=True)
+    if runner.unfinished:
+        # 到达本轮截止时间：未完成的条目不在 done_ids 中，重新排队后继续
+        raise JobRequeue(progressed=len(done_ids) > done_before)
+    return {'processed': processed, 'skipped': skipped}
+
+
+@job_handler('auto_associate')
+def auto_associate_job(ctx):
+    rules = CrawlRule.query.all()
+    # 匹配只用到 URL 与来源，按列查询，不加载整条记录
+    rows = db.session.query(CollectionItem.id, CollectionItem.url, CollectionItem.source) \
+        .filter(CollectionItem.rule_id == None).all()
+    ctx.set_total(len(rows))
+    # 已关联的条目不会再被查询到，重启后自然从剩余条目继续
+    count = ctx.checkpoint.get('associated', 0)
+    chunk = current_app.config['BULK_SAVE_CHUNK']
+    updates = []
+
+    for idx, (item_id, url, source) in enumerate(rows, 1):
+        # We need at least URL or Source to match
+        if url or source:
+            rule = match_rule(rules, url, source)
+            if rule:
+                updates.append({'id': item_id, 'rule_id': rule.id})
+                count += 1
+        if len(updates) >= chunk:
+            db.session.execute(update(CollectionItem), updates)
+            updates = []
+            ctx.report(idx, {'associated': count}, force=True)
+        else:
+            # 断点只记已写入的条数
+            ctx.report(idx, {'associated': count - len(updates)})
+
+    if updates:
+        db.session.execute(update(CollectionItem), updates)
+    ctx.report(len(rows), {'associated': count}, force=True)
+    return {'associated': count}
+
+
+@job_handler('analyze')
+def analyze_job(ctx):
+    from app.ai_analyst import AiDataAnalyst
+
+    ids = ctx.payload.get('ids') or ([ctx.payload['id']] if ctx.payload.get('id') else [])
+    skip_duplicates = ctx.payload.get('skip_duplicates')
+    if skip_duplicates is None:
+        skip_duplicates = current_app.config['NEAR_DUP_SKIP']
+    q = DeepCollectionContent.query.options(undefer(DeepCollectionContent.content))
+    if ids:
+        q = q.filter(DeepCollectionContent.item_id.in_(ids))
+    if skip_duplicates:
+        # 同一通知的多份转载只送一份给模型
+        q = q.join(CollectionItem, CollectionItem.id == DeepCollectionContent.item_id).filter(CollectionItem.duplicate_of == None)
+    contents = q.order_by(DeepCollectionContent.created_at.desc()).limit(20).all()
+    samples = [c.content for c in contents if c.content and len(c.content) > 50]
+    ctx.set_total(len(samples))
+    if not samples:
+        return {'samples': 0, 'heatmap': []}
+
+    analyst = AiDataAnalyst(ctx.payload.get('engine_id'))
+    heatmap = analyst.analyze_heatmap(samples)
+    ctx.report(len(samples), force=True)
+    return {'samples': len(samples), 'heatmap': heatmap}
+
+
+@job_handler('near_dup_index')
+def near_dup_index_job(ctx):
+    """
+    为已入库条目补建 (rebuild 时重建) 近似重复索引，按 id 升序处理，较早的条目作为原始条目
+    """
+    q = CollectionItem.query
+    if not ctx.payload.get('rebuild'):
+        q = q.filter(CollectionItem.title_simhash == None)
+    last_id = ctx.checkpoint.get('last_id', 0)
+    duplicates = ctx.checkpoint.get('duplicates', 0)
+    ids = [r[0] for r in q.with_entities(CollectionItem.id).filter(CollectionItem.id > last_id).order_by(CollectionItem.id)]
+    ctx.set_total(len(ids))
+
+    # 按块投影读取标题与正文，整块交给 index_items 批量计算签名与比对，每块提交一次
+    chunk = current_app.config['BATCH_DEEP_COMMIT_CHUNK']
+    for start in range(0, len(ids), chunk):
+        part = ids[start:start + chunk]
+        rows = db.session.query(CollectionItem.id, CollectionItem.title, DeepCollectionContent.content) \
+            .outerjoin(DeepCollectionContent, DeepCollectionContent.item_id == CollectionItem.id) \
+            .filter(CollectionItem.id.in_(part)).all()
+        result = index_items([(item_id, title, content or None) for item_id, title, content in rows])
+        duplicates += sum(1 for origin in result.values() if origin)
+        ctx.report(start + len(part), {'last_id': part[-1], 'duplicates': duplicates}, force=True)
+
+    ctx.report(len(ids), {'last_id': ids[-1] if ids else last_id, 'duplicates': duplicates}, force=True)
+    return {'indexed': len(ids), 'duplicates': duplicates}
+
+
+@job_handler('url_rehash')
+def url_rehash_job(ctx):
+    """
+    规范化规则 (tools/url_canon.py) 调整后按新规则重算 url_hash，否则按新规则查找会找不到旧条目
+    重算后撞到同一哈希的条目合并：保留已有该哈希的条目 (没有时取有正文的最早一条)，
+    其余条目清空 url_hash 并标为它的重复，不删除数据；中途中断时重跑即可 (已清空的会再参与比对)
+    """
+    chunk = current_app.config['BULK_SAVE_CHUNK']
+    ctx.set_total(db.session.query(func.count(CollectionItem.id)).scalar() or 0)
+
+    # 逐批找出哈希与当前规则不一致的条目
+    changed = {}
+    last_id = 0
+    scanned = 0
+    while True:
+        rows = db.session.query(CollectionItem.id, CollectionItem.url, CollectionItem.url_hash) \
+            .filter(CollectionItem.id > last_id).order_by(CollectionItem.id).limit(chunk).all()
+        if not rows:
+            break
+        for item_id, url, stored in rows:
+            h = url_hash(url)
+            if h != stored:
+                changed[item_id] = h
+        last_id = rows[-1][0]
+        scanned += len(rows)
+        ctx.report(scanned)
+
+    # 按新哈希分组，组内已有该哈希且不需要改的条目优先保留
+    groups = {}
+    for item_id, h in changed.items():
+        if h:
+            groups.setdefault(h, []).append(item_id)
+    owners = {}
+    hashes = list(groups)
+    for i in range(0, len(hashes), chunk):
+        for item_id, h in db.session.query(CollectionItem.id, CollectionItem.url_hash) \
+                .filter(CollectionItem.url_hash.in_(hashes[i:i + chunk])):
+            if item_id not in changed:
+                owners[h] = item_id
+
+    collected = set()
+    multi = [item_id for h, ids in groups.items() if len(ids) > 1 and h not in owners for item_id in ids]
+    for i in range(0, len(multi), chunk):
+        collected.update(r[0] for r in db.session.query(CollectionItem.id).filter(
+            CollectionItem.id.in_(multi[i:i + chunk]), CollectionItem.deep_collected == True))
+
+    keep, merged = [], {}
+    for h, ids in groups.items():
+        keeper = owners.get(h)
+        if keeper is None:
+            ids.sort(key=lambda i: (i not in collected, i))
+            keeper = ids[0]
+            keep.append({'id': keeper, 'url_hash': h})
+        for item_id in ids:
+            if item_id != keeper:
+                merged[item_id] = keeper
+
+    # 先清空全部待改的哈希，再写入新哈希，避免批内互换时撞唯一索引
+    ids = list(changed)
+    for i in range(0, len(ids), chunk):
+        db.session.execute(update(CollectionItem), [{'id': i_, 'url_hash': None} for i_ in ids[i:i + chunk]])
+    db.session.flush()
+    for i in range(0, len(keep), chunk):
+        db.session.execute(update(CollectionItem), keep[i:i + chunk])
+    if merged:
+        origins = dict(db.session.query(CollectionItem.id, CollectionItem.duplicate_of)
+                       .filter(CollectionItem.id.in_(set(merged.values()))))
+        rows = []
+        for item_id, keeper in merged.items():
+            origin = origins.get(keeper) or keeper
+            rows.append({'id': item_id, 'duplicate_of': keeper if origin == item_id else origin})
+        for i in range(0, len(rows), chunk):
+            db.session.execute(update(CollectionItem), rows[i:i + chunk])
+    ctx.report(scanned, {}, force=True)
+    return {'rehashed': len(keep), 'merged': len(merged)}
+
+
+@job_handler('search_index')
+def search_index_job(ctx):
+    """
+    重建全文索引 (没有索引表时先建表)
+    """
+    ctx.set_total(db.session.query(func.count(CollectionItem.id)).scalar() or 0)
+    indexed = rebuild_search_index(progress=lambda done: ctx.report(done, {}, force=True))
+    return {'indexed': indexed}
@@ -1,7 +1,9 @@
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy.orm import validates, deferred
 from app import db, login
+from tools.url_canon import url_hash
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -40,14 +42,21 @@ class SystemSetting(db.Model):
         return '<SystemSetting {}: {}>'.format(self.key, self.value)
 
 class CollectionItem(db.Model):
+    # 列表按 (created_at, id) 倒序做键集分页
+    __table_args__ = (db.Index('ix_collection_item_created_at_id', 'created_at', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     keyword = db.Column(db.String(128), index=True)
     title = db.Column(db.String(512))
     cover = db.Column(db.String(1024))
     url = db.Column(db.String(1024), unique=False, index=True)
+    url_hash = db.Column(db.String(40), unique=True, index=True) # 规范化 URL 的哈希，用于判重
+    original_url = db.Column(db.String(1024)) # 跳转包装 (如百度 /link?url=) 的原地址，url 存解析后的真实地址
+    title_simhash = db.Column(db.BigInteger) # 标题 SimHash (有符号存储)
+    duplicate_of = db.Column(db.Integer, db.ForeignKey('collection_item.id'), nullable=True, index=True) # 近似重复时指向最早的原始条目
     source = db.Column(db.String(256))
     deep_collected = db.Column(db.Boolean, default=False)
-    deep_content = db.Column(db.Text)
+    deep_content = deferred(db.Column(db.Text)) # 旧版正文字段，默认不随条目加载
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -58,19 +67,49 @@ class CollectionItem(db.Model):
     rule_id = db.Column(db.Integer, db.ForeignKey('crawl_rule.id'), nullable=True)
     rule = db.relationship('CrawlRule', backref='collection_items')
 
+    # 近似重复检测的分桶索引
+    signature_bands = db.relationship('ItemSignatureBand', backref='item', cascade="all, delete-orphan")
+
+    @validates('url')
+    def _set_url_hash(self, key, url):
+        self.url_hash = url_hash(url)
+        return url
+
+    @classmethod
+    def find_by_url(cls, url):
+        """
+        按规范化 URL 查找已入库的条目 (忽略统计参数、协议、末尾斜杠等差异)
+        """
+        h = url_hash(url)
+        return cls.query.filter_by(url_hash=h).first() if h else None
+
     def __repr__(self):
         return '<CollectionItem {}>'.format(self.title)
 
 class DeepCollectionContent(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    content = db.Column(db.Text)
+    # 正文与签名默认延迟加载，列表、判重等只在用到时才读取
+    content = deferred(db.Column(db.Text))
     item_id = db.Column(db.Integer, db.ForeignKey('collection_item.id'), unique=True)
+    minhash = deferred(db.Column(db.LargeBinary)) # 正文 MinHash 签名
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return '<DeepCollectionContent item_id={}>'.format(self.item_id)
 
+class ItemSignatureBand(db.Model):
+    """
+    近似重复检测的 LSH 分桶：标题 SimHash 分段 (t*) 与正文 MinHash 分段 (c*)
+    同桶的条目才作为候选比对，判重不必扫描全表
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('collection_item.id'), index=True)
+    key = db.Column(db.String(24), index=True)
+
+    def __repr__(self):
+        return '<ItemSignatureBand {} {}>'.format(self.item_id, self.key)
+
 class CrawlRule(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(256), default='未命名规则') # 规则名称
@@ -85,6 +124,20 @@ class CrawlRule(db.Model):
     def __repr__(self):
         return '<CrawlRule {}>'.format(self.name or self.site)
 
+def match_rule(rules, url, source):
+    """
+    按域名或来源从规则列表中匹配第一条规则
+    """
+    for rule in rules:
+        r_site_clean = rule.site.replace('http://','').replace('https://','').strip() if rule.site else ""
+        if rule.match_type == 'domain':
+            if url and r_site_clean and r_site_clean in url:
+                return rule
+        elif rule.match_type == 'source':
+            if source and rule.site and (rule.site == source or rule.site in source or source in rule.site):
+                return rule
+    return None
+
 class AiEngine(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     provider = db.Column(db.String(64), nullable=False) # Service Provider Name (e.g., OpenAI, DeepSeek)
@@ -99,6 +152,8 @@ class AiEngine(db.Model):
         return '<AiEngine {} - {}>'.format(self.provider, self.model_name)
 
 class CrawlerConfig(db.Model):
+    __table_args__ = (db.Index('ix_crawler_config_created_at_id', 'created_at', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False, unique=True) # 爬虫名称
     base_url = db.Column(db.String(512), nullable=False) # 基础URL或搜索URL模板
@@ -123,6 +178,29 @@ class CrawlerConfig(db.Model):
     def __repr__(self):
         return '<CrawlerConfig {}>'.format(self.name)
 
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(64), index=True) # 任务类型: batch_deep / auto_associate / analyze
+    status = db.Column(db.String(16), default='queued', index=True) # queued / running / done / failed / cancelled
+    payload_json = db.Column(db.Text) # 任务参数 JSON
+    result_json = db.Column(db.Text) # 任务结果 JSON
+    checkpoint_json = db.Column(db.Text) # 断点信息 JSON，重启后据此续跑
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    lease_owner = db.Column(db.String(128)) # 当前持有租约的 worker
+    lease_expires_at = db.Column(db.DateTime, index=True)
+    version = db.Column(db.Integer, default=0) # 乐观锁，每次租用 +1
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return '<Job {} {} {}>'.format(self.id, self.type, self.status)
+
 @login.user_loader
 def load_user(id):
     return db.session.get(User, int(id))
@@ -0,0 +1,147 @@
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, tuple_
+from sqlalchemy.orm import Session
+
+from app import db
+
+
+def encode_cursor(created_at, id_):
+    """
+    游标：上一页最后一条的 (created_at, id)，对前端不透明
+    """
+    raw = json.dumps({'c': created_at.isoformat(), 'i': id_}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    :raise ValueError: 游标无法解析
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data['c']), int(data['i'])
+    except Exception as e:
+        raise ValueError(f'invalid cursor: {e}')
+
+
+def request_cursor(args, page):
+    """
+    取请求中的游标；带 cursor_page 时只在它与请求的页码一致时使用 (表格直接跳页时退回 OFFSET)
+    """
+    cursor = args.get('cursor', default='', type=str)
+    cursor_page = args.get('cursor_page', type=int)
+    if cursor and cursor_page is not None and cursor_page != page:
+        return ''
+    return cursor
+
+
+def newest_first(query, model):
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def keyset_page(query, model, size, cursor=None, page=1):
+    """
+    按 (created_at, id) 倒序分页
+    - 带 cursor 时从游标之后取 (键集分页，走 (created_at, id) 索引，翻到多深都是常数开销)
+    - 否则按 page 取 OFFSET (兼容直接跳页)
+    :return: (items, next_cursor)，没有下一页时 next_cursor 为 None
+    :raise ValueError: 游标无法解析
+    """
+    if cursor:
+        created_at, id_ = decode_cursor(cursor)
+        query = newest_first(query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, id_)), model)
+    else:
+        query = newest_first(query, model).offset((max(page, 1) - 1) * size)
+    items = query.limit(size + 1).all()
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
+
+
+class CountCache:
+    """
+    列表总数缓存：过期后先返回旧值，由后台线程重新 COUNT，翻页请求不再每次全表计数
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._values = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='count')
+
+    def _refresh(self, app, key, count_query):
+        try:
+            with app.app_context():
+                value = count_query()
+                db.session.remove()
+            self._store(key, value)
+        except Exception as e:
+            print(f"Count refresh error for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._values[key] = (value, time.monotonic())
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+    def get(self, key, count_query):
+        """
+        :param key: (表名, 筛选条件...)，如 ('collection_item', keyword)
+        :param count_query: 无参函数，返回总数；可能在后台线程的 app context 中执行，查询须在函数内构造
+        """
+        ttl = current_app.config['LIST_COUNT_TTL']
+        with self._lock:
+            cached = self._values.get(key)
+        if cached is None:
+            value = count_query()
+            self._store(key, value)
+            return value
+        value, at = cached
+        if time.monotonic() - at > ttl:
+            with self._lock:
+                start = key not in self._refreshing
+                self._refreshing.add(key)
+            if start:
+                self._executor.submit(self._refresh, current_app._get_current_object(), key, count_query)
+        return value
+
+    def invalidate(self, table):
+        """
+        增删条目后调用：该表的所有缓存在下次读取时后台刷新
+        """
+        with self._lock:
+            for key, (value, _) in list(self._values.items()):
+                if key[0] == table:
+                    self._values[key] = (value, float('-inf'))
+
+
+_counts = CountCache()
+
+
+def cached_count(key, count_query):
+    return _counts.get(key, count_query)
+
+
+def invalidate_counts(table):
+    _counts.invalidate(table)
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_on_change(session, flush_context):
+    for table in {obj.__tablename__ for obj in list(session.new) + list(session.deleted)}:
+        _counts.invalidate(table)
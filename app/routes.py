@@ -1,14 +1,29 @@
-from flask import Blueprint, render_template, request, Response, jsonify, stream_with_context
+from flask import Blueprint, render_template, request, Response, jsonify, stream_with_context, current_app
 from flask_login import login_required, current_user
 from datetime import datetime
 from tools.baidu_crawler import crawl_baidu_news
 from tools.baidu_crawler import crawl_xinhua_sc_news
-from tools.baidu_crawler import deep_collect_content, collect_content_by_rule, generic_extract, crawl_generic
+from tools.baidu_crawler import deep_collect_content, deep_collect_with_rule, collect_content_by_plan, generic_extract, crawl_generic
+from tools.crawl_plan import get_rule_plan
+from tools.fetcher import get_fetcher
+from tools.url_canon import url_hash
+from tools.concurrent_runner import DomainLimitedRunner
+from tools.cover_resolver import CoverBatch, get_cover_resolver
+from tools.extraction_profiles import get_profile_store
+from tools.redirect_resolver import get_redirect_resolver
 import urllib.parse
 from app import db
-from sqlalchemy.orm import joinedload
-from app.models import CollectionItem, CrawlRule, DeepCollectionContent, AiEngine, CrawlerConfig
+from sqlalchemy import func
+from sqlalchemy.orm import undefer
+from app.models import CollectionItem, CrawlRule, DeepCollectionContent, AiEngine, CrawlerConfig, Job, match_rule
 from app.ai_analyst import AiDataAnalyst
+from app.jobs import enqueue_job, cancel_job, job_to_dict
+from app.dedup import index_item, find_title_duplicate, similar_items, forget_items, apply_resolved_url
+from app.seen import sync_seen_filter
+from app.ingest import save_items, resolved_urls
+from app.search import search_items
+from app.pagination import keyset_page, cached_count, request_cursor
+from tools.search_text import highlight, snippet
 import json
 from urllib.parse import urlparse
 
@@ -51,16 +66,22 @@ def crawler_list():
     page = request.args.get('page', default=1, type=int)
     size = request.args.get('size', default=20, type=int)
     keyword = request.args.get('keyword', default='', type=str)
-    
-    q = CrawlerConfig.query
-    if keyword:
-        q = q.filter(CrawlerConfig.name.like(f"%{keyword}%"))
-    
-    q = q.order_by(CrawlerConfig.created_at.desc())
-    items = q.paginate(page=page, per_page=size, error_out=False)
+    cursor = request_cursor(request.args, page)
+
+    def filtered():
+        q = CrawlerConfig.query
+        if keyword:
+            q = q.filter(CrawlerConfig.name.like(f"%{keyword}%"))
+        return q
+
+    try:
+        items, next_cursor = keyset_page(filtered(), CrawlerConfig, size, cursor=cursor, page=page)
+    except ValueError:
+        return jsonify({'code': 1, 'msg': 'invalid cursor', 'count': 0, 'data': []}), 400
+    total = cached_count(('crawler_config', keyword), lambda: filtered().count())
     
     data = []
-    for it in items.items:
+    for it in items:
         data.append({
             'id': it.id,
             'name': it.name,
@@ -73,7 +94,8 @@ def crawler_list():
     return jsonify({
         'code': 0,
         'msg': '',
-        'count': items.total,
+        'count': total,
+        'next_cursor': next_cursor,
         'data': data
     })
 
@@ -161,6 +183,8 @@ def collector_stream():
     max_count = request.args.get('count', default=20, type=int)
     source = request.args.get('source', default='baidu')
     max_pages = request.args.get('max_pages', default=5, type=int)
+    # 增量采集：跳过已入库的 URL，一页大部分已入库即停止翻页
+    seen = sync_seen_filter() if request.args.get('mode') == 'incremental' else None
 
     def sse_event(data):
         return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -175,6 +199,8 @@ def collector_stream():
             config = db.session.get(CrawlerConfig, crawler_id)
             if config and config.enabled:
                 crawler_config_dict = {
+                    'id': config.id,
+                    'updated_at': config.updated_at,
                     'name': config.name,
                     'base_url': config.base_url,
                     'method': config.method,
@@ -196,10 +222,12 @@ def collector_stream():
     def generate():
         yield sse_event({"type": "start", "keyword": keyword, "total": max_count, "source": source})
         
+        # 缺封面的条目先推送，封面在后台解析完成后以 cover 事件补发
+        covers = CoverBatch()
         if source == 'xinhua':
-            results_gen = crawl_xinhua_sc_news(max_count=max_count)
+            results_gen = crawl_xinhua_sc_news(max_count=max_count, covers=covers, seen=seen)
         elif source == 'baidu':
-            results_gen = crawl_baidu_news(keyword, max_count=max_count, max_pages=max_pages)
+            results_gen = crawl_baidu_news(keyword, max_count=max_count, max_pages=max_pages, seen=seen)
         else:
             if crawler_error:
                 yield sse_event({"type": "error", "message": crawler_error})
@@ -207,7 +235,7 @@ def collector_stream():
             
             if crawler_config_dict:
                 try:
-                    results_gen = crawl_generic(crawler_config_dict, keyword, max_count=max_count, max_pages=max_pages)
+                    results_gen = crawl_generic(crawler_config_dict, keyword, max_count=max_count, max_pages=max_pages, covers=covers, seen=seen)
                 except Exception as e:
                     yield sse_event({"type": "error", "message": f"Crawler execution error: {str(e)}"})
                     return
@@ -217,16 +245,41 @@ def collector_stream():
                  return
         
         count = 0
+        indexes = {}
+        resolved = {}
+
+        def cover_event(url, cover):
+            resolved[url] = cover
+            return sse_event({"type": "cover", "index": indexes.get(url), "url": url, "cover": cover})
+
         try:
             for idx, item in enumerate(results_gen, 1):
                 count = idx
+                indexes[item.get('url')] = idx
                 item_update = dict(item)
                 item_update.update({"deep_collected": False})
                 yield sse_event({"type": "item", "index": idx, "total": max_count, "item": item_update})
                 yield sse_event({"type": "progress", "current": idx, "total": max_count})
+                for url, cover in covers.ready():
+                    yield cover_event(url, cover)
+            for url, cover in covers.drain():
+                yield cover_event(url, cover)
         except Exception as e:
              yield sse_event({"type": "error", "message": f"Stream error: {str(e)}"})
              return
+
+        # 采集过程中已入库的条目补写封面
+        filled = {u: c for u, c in resolved.items() if c}
+        if filled:
+            try:
+                by_hash = {url_hash(u): c for u, c in filled.items()}
+                for it in CollectionItem.query.filter(CollectionItem.url_hash.in_(list(by_hash))).all():
+                    if not it.cover:
+                        it.cover = by_hash[it.url_hash]
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Cover write-back error: {e}")
         
         yield sse_event({"type": "complete", "total": count})
 
@@ -234,7 +287,7 @@ def collector_stream():
         'Cache-Control': 'no-cache',
         'X-Accel-Buffering': 'no'
     }
-    return Response(generate(), mimetype='text/event-stream', headers=headers)
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
 
 @bp.route('/warehouse/list')
 @login_required
@@ -242,87 +295,179 @@ def warehouse_list():
     page = request.args.get('page', default=1, type=int)
     size = request.args.get('size', default=20, type=int)
     keyword = request.args.get('keyword', default='', type=str)
-    q = CollectionItem.query.options(joinedload(CollectionItem.rule), joinedload(CollectionItem.deep_content_obj))
-    if keyword:
-        q = q.filter(CollectionItem.title.like(f"%{keyword}%"))
-    q = q.order_by(CollectionItem.created_at.desc())
-    items = q.paginate(page=page, per_page=size, error_out=False)
-    data = []
-    for it in items.items:
-        # Retrieve deep content from new table or fallback to old field
-        deep_content_val = ""
-        if it.deep_content_obj and it.deep_content_obj.content:
-            deep_content_val = it.deep_content_obj.content
-        elif it.deep_content:
-            deep_content_val = it.deep_content
-            
-        domain = ''
-        if it.url:
-            try:
-                domain = urlparse(it.url).netloc
-            except:
-                pass
+    cursor = request_cursor(request.args, page)
+    search = request.args.get('q', default='', type=str).strip()
+    if search:
+        return _warehouse_search(search, page, size)
 
-        data.append({
-            'id': it.id,
-            'keyword': it.keyword,
-            'title': it.title,
-            'cover': it.cover,
-            'url': it.url,
-            'source': it.source,
-            'domain': domain,
-            'rule_id': it.rule_id,
-            'rule_name': it.rule.name if it.rule else None,
-            'deep_collected': it.deep_collected,
-            'deep_content': deep_content_val,
-            'created_at': it.created_at.isoformat()
-        })
+    def filtered(q):
+        if keyword:
+            q = q.filter(CollectionItem.title.like(f"%{keyword}%"))
+        return q
+
+    # 顺序翻页带上一页返回的 cursor (键集分页)，直接跳页仍按 page 取 OFFSET
+    try:
+        rows, next_cursor = keyset_page(filtered(_warehouse_rows()), CollectionItem, size, cursor=cursor, page=page)
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
     return jsonify({
         'page': page,
         'size': size,
-        'total': items.total,
+        'total': cached_count(('collection_item', keyword), lambda: filtered(CollectionItem.query).count()),
+        'next_cursor': next_cursor,
+        'items': [_warehouse_row(row) for row in rows]
+    })
+
+@bp.route('/warehouse/item/<int:id>')
+@login_required
+def warehouse_item(id):
+    """
+    单条目详情，含深度采集正文全文 (列表只返回摘要)
+    """
+    row = _warehouse_rows().add_columns(_item_body().label('deep_content')) \
+        .filter(CollectionItem.id == id).first()
+    if not row:
+        return jsonify({'error': 'not found'}), 404
+    data = _warehouse_row(row)
+    data['deep_content'] = row.deep_content or ''
+    return jsonify(data)
+
+def _item_body():
+    # 正文优先取深度采集表，旧数据退回 collection_item.deep_content
+    return func.coalesce(func.nullif(DeepCollectionContent.content, ''), CollectionItem.deep_content)
+
+def _warehouse_rows():
+    """
+    数据仓库列表的投影查询：只取展示用的列与规则名，正文只截取开头 LIST_PREVIEW_CHARS 个字
+    不构造 ORM 对象，也不读取正文全文与签名
+    """
+    return db.session.query(
+        CollectionItem.id, CollectionItem.keyword, CollectionItem.title, CollectionItem.cover,
+        CollectionItem.url, CollectionItem.original_url, CollectionItem.source,
+        CollectionItem.rule_id, CrawlRule.name.label('rule_name'),
+        CollectionItem.deep_collected, CollectionItem.duplicate_of, CollectionItem.created_at,
+        func.substr(_item_body(), 1, current_app.config['LIST_PREVIEW_CHARS']).label('preview')
+    ).outerjoin(CrawlRule, CrawlRule.id == CollectionItem.rule_id) \
+        .outerjoin(DeepCollectionContent, DeepCollectionContent.item_id == CollectionItem.id)
+
+def _warehouse_row(row):
+    domain = ''
+    if row.url:
+        try:
+            domain = urlparse(row.url).netloc
+        except:
+            pass
+
+    return {
+        'id': row.id,
+        'keyword': row.keyword,
+        'title': row.title,
+        'cover': row.cover,
+        'url': row.url,
+        'original_url': row.original_url,
+        'source': row.source,
+        'domain': domain,
+        'rule_id': row.rule_id,
+        'rule_name': row.rule_name,
+        'deep_collected': row.deep_collected,
+        'has_content': bool(row.preview),
+        'preview': row.preview or '',
+        'duplicate_of': row.duplicate_of,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+def _warehouse_search(search, page, size):
+    """
+    全文检索模式 (q=)：按相关度排序，返回标出检索词的标题与正文摘要
+    非 SQLite 或尚未建全文索引时退回标题/正文 LIKE 匹配
+    """
+    found = search_items(search, offset=(page - 1) * size, limit=size)
+    if found is None:
+        like = f"%{search}%"
+        q = _warehouse_rows() \
+            .filter(CollectionItem.title.like(like) | DeepCollectionContent.content.like(like)) \
+            .order_by(CollectionItem.created_at.desc())
+        paged = q.paginate(page=page, per_page=size, error_out=False)
+        total, hits = paged.total, [(row.id, None) for row in paged.items]
+        loaded = {row.id: row for row in paged.items}
+    else:
+        total, hits = found
+        loaded = {row.id: row for row in _warehouse_rows().filter(CollectionItem.id.in_([i for i, _ in hits]))}
+
+    # 摘要要在全文中定位检索词，只读取本页条目的正文
+    bodies = dict(db.session.query(CollectionItem.id, _item_body())
+                  .outerjoin(DeepCollectionContent, DeepCollectionContent.item_id == CollectionItem.id)
+                  .filter(CollectionItem.id.in_(list(loaded))))
+    data = []
+    for item_id, score in hits:
+        row = loaded.get(item_id)
+        if not row:
+            continue
+        item = _warehouse_row(row)
+        item['score'] = score
+        item['title_html'] = highlight(row.title, search)
+        item['snippet'] = snippet(bodies.get(item_id) or '', search)
+        data.append(item)
+    return jsonify({
+        'page': page,
+        'size': size,
+        'total': total,
+        'q': search,
         'items': data
     })
 
+@bp.route('/warehouse/search_index', methods=['POST'])
+@login_required
+def warehouse_search_index():
+    """
+    重建全文索引 (首次启用、切换分词方式后使用)
+    """
+    job = enqueue_job('search_index', {})
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
 @bp.route('/warehouse/auto_associate', methods=['POST'])
 @login_required
 def warehouse_auto_associate():
-    try:
-        rules = CrawlRule.query.all()
-        items = CollectionItem.query.filter(CollectionItem.rule_id == None).all()
-        count = 0
-        
-        for it in items:
-            # We need at least URL or Source to match
-            if not it.url and not it.source:
-                continue
-                
-            # Simple match logic
-            matched_rule_id = None
-            for r in rules:
-                # Normalize site for domain matching
-                r_site_clean = r.site.replace('http://','').replace('https://','').strip() if r.site else ""
-                
-                if r.match_type == 'domain' and it.url and r_site_clean and r_site_clean in it.url:
-                    matched_rule_id = r.id
-                    break
-                elif r.match_type == 'source' and it.source and r.site:
-                    # Bidirectional contains for source
-                    if r.site == it.source or r.site in it.source or it.source in r.site:
-                        matched_rule_id = r.id
-                        break
-            
-            if matched_rule_id:
-                it.rule_id = matched_rule_id
-                count += 1
-        
-        if count > 0:
-            db.session.commit()
-            
-        return jsonify({'associated': count})
-    except Exception as e:
-        print(f"Auto associate error: {e}")
-        return jsonify({'error': str(e)}), 500
+    job = enqueue_job('auto_associate', {})
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+@bp.route('/warehouse/similar/<int:id>')
+@login_required
+def warehouse_similar(id):
+    """
+    与指定条目近似重复的条目 (标题 SimHash / 正文 MinHash)
+    """
+    it = db.session.get(CollectionItem, id)
+    if not it:
+        return jsonify({'error': 'not found'}), 404
+    limit = request.args.get('limit', default=20, type=int)
+    data = []
+    for other, distance, jaccard in similar_items(it, limit=limit):
+        data.append({
+            'id': other.id,
+            'title': other.title,
+            'url': other.url,
+            'source': other.source,
+            'duplicate_of': other.duplicate_of,
+            'title_distance': distance,
+            'content_similarity': round(jaccard, 3) if jaccard is not None else None,
+            'created_at': other.created_at.isoformat() if other.created_at else None
+        })
+    return jsonify({'id': it.id, 'duplicate_of': it.duplicate_of, 'items': data})
+
+@bp.route('/warehouse/near_dup_index', methods=['POST'])
+@login_required
+def warehouse_near_dup_index():
+    payload = request.get_json() or {}
+    job = enqueue_job('near_dup_index', {'rebuild': bool(payload.get('rebuild'))})
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+@bp.route('/warehouse/url_rehash', methods=['POST'])
+@login_required
+def warehouse_url_rehash():
+    # URL 规范化规则调整后重算判重哈希
+    job = enqueue_job('url_rehash', {})
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
 
 @bp.route('/warehouse/update', methods=['POST'])
 @login_required
@@ -334,6 +479,11 @@ def warehouse_update():
     it = db.session.get(CollectionItem, int(id_))
     if not it:
         return jsonify({'error': 'not found'}), 404
+    # url_hash 唯一：改成的地址 (含统计参数等不同写法) 已属于其他条目时不修改
+    if payload.get('url'):
+        other = CollectionItem.find_by_url(payload['url'])
+        if other is not None and other.id != it.id:
+            return jsonify({'error': 'url already exists', 'id': other.id}), 409
     for k in ['keyword','title','cover','url','source','deep_collected']:
         if k in payload:
             setattr(it, k, payload.get(k))
@@ -344,6 +494,9 @@ def warehouse_update():
             it.deep_content_obj.content = content
         else:
             it.deep_content_obj = DeepCollectionContent(content=content)
+
+    if 'title' in payload or 'deep_content' in payload:
+        index_item(it)
             
     db.session.commit()
     return jsonify({'id': it.id})
@@ -358,6 +511,7 @@ def warehouse_delete():
     it = db.session.get(CollectionItem, int(id_))
     if not it:
         return jsonify({'error': 'not found'}), 404
+    forget_items([it.id])
     db.session.delete(it)
     db.session.commit()
     return jsonify({'deleted': 1})
@@ -371,6 +525,7 @@ def warehouse_batch_delete():
         return jsonify({'deleted': 0})
     try:
         items = CollectionItem.query.filter(CollectionItem.id.in_(ids)).all()
+        forget_items([it.id for it in items])
         count = 0
         for it in items:
             db.session.delete(it)
@@ -385,8 +540,13 @@ def warehouse_batch_delete():
 @login_required
 def warehouse_analyze():
     payload = request.get_json() or {}
-    id_ = payload.get('id')
-    return jsonify({'status': 'pending', 'id': id_})
+    job = enqueue_job('analyze', {
+        'id': payload.get('id'),
+        'ids': payload.get('ids'),
+        'engine_id': payload.get('engine_id'),
+        'skip_duplicates': payload.get('skip_duplicates')
+    })
+    return jsonify({'job_id': job.id, 'status': job.status, 'id': payload.get('id')}), 202
 
 @bp.route('/rules/list')
 @login_required
@@ -547,26 +707,15 @@ def collector_deep():
     source = data.get('source')
     if not url:
         return jsonify({"error": "missing url"}), 400
+    # 百度跳转链接先解析为真实地址，才能按域名匹配规则
+    url = get_redirect_resolver().resolve(url)
     
     content = None
     
-    # 1. Try to match a rule
-    rules = CrawlRule.query.all()
-    matched_rule = None
-    
-    for r in rules:
-        r_site_clean = r.site.replace('http://','').replace('https://','').strip() if r.site else ""
-        if r.match_type == 'domain':
-            if r_site_clean and r_site_clean in url:
-                matched_rule = r
-                break
-        elif r.match_type == 'source' and source:
-            if r.site == source or r.site in source or source in r.site:
-                matched_rule = r
-                break
-                
+    # 1. Try to match a rule (与批量深度采集、后台任务同一套匹配规则)
+    matched_rule = match_rule(CrawlRule.query.all(), url, source)
     if matched_rule:
-        res = collect_content_by_rule(url, matched_rule.title_xpath, matched_rule.content_xpath, matched_rule.headers_json)
+        res = collect_content_by_plan(url, get_rule_plan(matched_rule))
         if res:
             _, content = res
             
@@ -578,6 +727,167 @@ def collector_deep():
         return jsonify({"deep_content": "", "deep_collected": False})
     return jsonify({"deep_content": content, "deep_collected": True})
 
+@bp.route('/collector/deep_batch', methods=['POST'])
+@login_required
+def collector_deep_batch():
+    """
+    批量深度采集：一次请求并发抓取多条，边完成边以 NDJSON 逐行返回，采到正文的条目分批入库
+    请求: {keyword, items: [{url, source, title, cover}], save: true}
+    返回行: {"type": "item", url, deep_collected, deep_content} / {"type": "saved", items: [{url, id}]} / {"type": "complete", ...}
+    """
+    payload = request.get_json() or {}
+    keyword = payload.get('keyword', '')
+    save = payload.get('save', True)
+    cfg = current_app.config
+
+    # 仍是跳转包装的地址换成真实地址 (采集页推送时通常已解析，多数命中缓存)
+    items_data = payload.get('items', [])
+    resolved = get_redirect_resolver().resolve_many([d.get('url') for d in items_data])
+
+    # 按规范化 URL 去重，同一页面的不同写法只采一次
+    items_by_url = {}
+    hashes = {}
+    for item_data in items_data:
+        url = item_data.get('url')
+        if url in resolved:
+            item_data = dict(item_data, url=resolved[url], original_url=url)
+            url = resolved[url]
+        h = url_hash(url)
+        if h and h not in hashes:
+            items_by_url[url] = item_data
+            hashes[h] = url
+    hashes = {url: h for h, url in hashes.items()}
+    if not items_by_url:
+        return jsonify({'error': 'missing items'}), 400
+
+    # 之前按跳转链接入库的条目也对应上，入库时改写为真实地址；真实地址也已有条目时并入该条目
+    wrapped = {url_hash(d['original_url']): url for url, d in items_by_url.items() if d.get('original_url')}
+    existing = {}
+    wrappers = []
+    for it in CollectionItem.query.filter(CollectionItem.url_hash.in_(list(hashes.values()) + list(wrapped))).all():
+        if it.url_hash in wrapped:
+            wrappers.append(it)
+        else:
+            existing[it.url_hash] = it
+    merged = False
+    for it in wrappers:
+        url = wrapped[it.url_hash]
+        if hashes[url] not in existing:
+            existing[hashes[url]] = it
+        elif save:
+            apply_resolved_url(it, url)
+            merged = True
+    if merged:
+        db.session.commit()
+
+    # 已标为近似重复、或标题与已深度采集的条目近似的，不再抓取
+    duplicates = {}
+    if payload.get('skip_duplicates', cfg['NEAR_DUP_SKIP']):
+        for url, item_data in items_by_url.items():
+            it = existing.get(hashes[url])
+            if it and it.duplicate_of:
+                duplicates[url] = it.duplicate_of
+            elif not it:
+                origin = find_title_duplicate(item_data.get('title'))
+                if origin:
+                    duplicates[url] = origin.id
+
+    # 规则只加载一次，逐条匹配后交给采集线程 (线程内不访问 ORM)
+    rules = CrawlRule.query.all()
+    tasks = []
+    matched = {}
+    for url, item_data in items_by_url.items():
+        if url in duplicates:
+            continue
+        rule = match_rule(rules, url, item_data.get('source'))
+        matched[url] = rule.id if rule else None
+        tasks.append((url, url, (url, get_rule_plan(rule) if rule else None)))
+
+    def line(data):
+        return json.dumps(data, ensure_ascii=False) + "\n"
+
+    def generate():
+        runner = DomainLimitedRunner(
+            max_workers=cfg['BATCH_DEEP_WORKERS'],
+            per_domain=cfg['BATCH_DEEP_PER_DOMAIN'],
+            deadline=cfg['BATCH_DEEP_DEADLINE']
+        )
+        for url, origin_id in duplicates.items():
+            yield line({'type': 'item', 'url': url, 'original_url': items_by_url[url].get('original_url'),
+                        'deep_collected': False, 'duplicate_of': origin_id})
+
+        batch = []
+        collected = saved = 0
+
+        def flush():
+            # 整批提交，提交后才有新条目的 id
+            nonlocal saved
+            try:
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Deep batch save error: {e}")
+                result = line({'type': 'error', 'message': 'save failed', 'urls': [it.url for it in batch]})
+                batch.clear()
+                return result
+            saved += len(batch)
+            result = line({'type': 'saved', 'items': [{'url': it.url, 'original_url': it.original_url, 'id': it.id}
+                                                      for it in batch]})
+            batch.clear()
+            return result
+
+        for url, content, error in runner.run(tasks, deep_collect_with_rule):
+            original_url = items_by_url[url].get('original_url')
+            if error:
+                print(f"Deep batch error for {url}: {error}")
+            if not content:
+                yield line({'type': 'item', 'url': url, 'original_url': original_url, 'deep_collected': False,
+                            'error': str(error) if error else None})
+                continue
+            collected += 1
+            yield line({'type': 'item', 'url': url, 'original_url': original_url, 'deep_collected': True,
+                        'deep_content': content})
+            if not save:
+                continue
+
+            item_data = items_by_url[url]
+            it = existing.get(hashes[url])
+            if not it:
+                it = CollectionItem(url=url, created_at=datetime.utcnow())
+                db.session.add(it)
+            elif it.url_hash != hashes[url]:
+                it.url = url
+            it.keyword = keyword
+            it.title = item_data.get('title') or it.title
+            it.cover = item_data.get('cover') or get_cover_resolver().cached(url) or it.cover
+            it.source = item_data.get('source') or it.source
+            it.original_url = item_data.get('original_url') or it.original_url
+            it.rule_id = matched[url] or it.rule_id
+            it.deep_collected = True
+            it.updated_at = datetime.utcnow()
+            if it.deep_content_obj:
+                it.deep_content_obj.content = content
+            else:
+                it.deep_content_obj = DeepCollectionContent(content=content)
+            index_item(it, content)
+            batch.append(it)
+            if len(batch) >= cfg['BATCH_DEEP_COMMIT_CHUNK']:
+                yield flush()
+
+        if batch:
+            yield flush()
+        for url in runner.unfinished:
+            yield line({'type': 'item', 'url': url, 'original_url': items_by_url[url].get('original_url'),
+                        'deep_collected': False, 'error': 'deadline exceeded'})
+        yield line({'type': 'complete', 'total': len(items_by_url), 'collected': collected, 'saved': saved,
+                    'skipped': len(duplicates), 'unfinished': len(runner.unfinished)})
+
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
+
 @bp.route('/collector/test_parse', methods=['POST'])
 @login_required
 def collector_test_parse():
@@ -588,6 +898,79 @@ def collector_test_parse():
     res = generic_extract(url)
     return jsonify(res)
 
+@bp.route('/collector/fetch_stats')
+@login_required
+def collector_fetch_stats():
+    fetcher = get_fetcher()
+    return jsonify({
+        'cache': fetcher.cache.snapshot() if fetcher.cache else None,
+        'hosts': fetcher.limiter.snapshot()
+    })
+
+@bp.route('/collector/seen/rebuild', methods=['POST'])
+@login_required
+def collector_seen_rebuild():
+    """
+    从 CollectionItem 整体重建增量采集用的已入库 URL 集合 (删除条目后使用)
+    """
+    seen = sync_seen_filter(rebuild=True)
+    return jsonify({'count': seen.bloom.count, 'capacity': seen.bloom.capacity, 'max_id': seen.max_id})
+
+@bp.route('/collector/profiles')
+@login_required
+def collector_profiles():
+    """
+    通用提取学到的各站点正文选择器 (命中次数、命中率)
+    """
+    store = get_profile_store()
+    if not store:
+        return jsonify({'enabled': False, 'items': []})
+    host = request.args.get('host')
+    return jsonify({'enabled': True, 'items': store.profiles(host)})
+
+@bp.route('/collector/profiles/promote', methods=['POST'])
+@login_required
+def collector_profiles_promote():
+    """
+    把学到的选择器提升为 CrawlRule (按域名匹配)
+    """
+    payload = request.get_json() or {}
+    host = payload.get('host')
+    css = payload.get('css')
+    store = get_profile_store()
+    if not host or not css:
+        return jsonify({'error': 'missing host or css'}), 400
+    profile = store.get(host, css) if store else None
+    if not profile:
+        return jsonify({'error': 'not found'}), 404
+    try:
+        r = CrawlRule(
+            name=payload.get('name') or f'{host} (自动学习)',
+            site=host,
+            match_type='domain',
+            title_xpath=profile['title_xpath'],
+            content_xpath=profile['xpath']
+        )
+        db.session.add(r)
+        db.session.commit()
+        return jsonify({'id': r.id})
+    except Exception as e:
+        db.session.rollback()
+        print(e)
+        return jsonify({'error': 'create failed'}), 500
+
+@bp.route('/collector/profiles/delete', methods=['POST'])
+@login_required
+def collector_profiles_delete():
+    payload = request.get_json() or {}
+    host = payload.get('host')
+    if not host:
+        return jsonify({'error': 'missing host'}), 400
+    store = get_profile_store()
+    if store:
+        store.delete(host, payload.get('css'))
+    return jsonify({'deleted': 1})
+
 @bp.route('/collector/save_one', methods=['POST'])
 @login_required
 def collector_save_one():
@@ -598,10 +981,10 @@ def collector_save_one():
     if not item_data or not item_data.get('url'):
         return jsonify({'error': 'missing data'}), 400
         
-    url = item_data.get('url')
+    url, original_url = resolved_urls(item_data)
     
     # Check if exists
-    it = CollectionItem.query.filter_by(url=url).first()
+    it = CollectionItem.find_by_url(url) or (original_url and CollectionItem.find_by_url(original_url))
     if not it:
         it = CollectionItem()
         it.created_at = datetime.utcnow()
@@ -609,8 +992,10 @@ def collector_save_one():
     
     it.keyword = keyword
     it.title = item_data.get('title')
-    it.cover = item_data.get('cover')
+    # 封面可能在推送后才解析完成，取解析服务的缓存补上
+    it.cover = item_data.get('cover') or get_cover_resolver().cached(url) or it.cover
     it.url = url
+    it.original_url = original_url or it.original_url
     it.source = item_data.get('source')
     it.deep_collected = item_data.get('deep_collected', False)
     it.updated_at = datetime.utcnow()
@@ -622,131 +1007,56 @@ def collector_save_one():
             it.deep_content_obj.content = deep_content
         else:
             it.deep_content_obj = DeepCollectionContent(content=deep_content)
-            
+
+    index_item(it)
     db.session.commit()
-    return jsonify({'id': it.id})
+    return jsonify({'id': it.id, 'duplicate_of': it.duplicate_of})
 
 @bp.route('/collector/save', methods=['POST'])
 @login_required
 def collector_save():
     data = request.get_json() or {}
-    items = data.get('items', [])
-    keyword = data.get('keyword', '')
-    
-    saved_count = 0
-    for item_data in items:
-        url = item_data.get('url')
-        if not url:
-            continue
-            
-        it = CollectionItem.query.filter_by(url=url).first()
-        if not it:
-            it = CollectionItem()
-            it.created_at = datetime.utcnow()
-            db.session.add(it)
-            
-        it.keyword = keyword
-        it.title = item_data.get('title')
-        it.cover = item_data.get('cover')
-        it.url = url
-        it.source = item_data.get('source')
-        it.deep_collected = item_data.get('deep_collected', False)
-        it.updated_at = datetime.utcnow()
-        
-        deep_content = item_data.get('deep_content')
-        if deep_content:
-            if it.deep_content_obj:
-                it.deep_content_obj.content = deep_content
-            else:
-                it.deep_content_obj = DeepCollectionContent(content=deep_content)
-                
-        saved_count += 1
-        
-    db.session.commit()
-    return jsonify({'saved': saved_count})
+    try:
+        result = save_items(data.get('items', []), data.get('keyword', ''))
+    except Exception as e:
+        print(f"Bulk save error: {e}")
+        return jsonify({'error': 'save failed'}), 500
+    return jsonify(result)
 
 @bp.route('/warehouse/batch_deep', methods=['POST'])
 @login_required
 def warehouse_batch_deep():
     payload = request.get_json() or {}
     ids = payload.get('ids', [])
-    manual_rule_id = payload.get('rule_id') # Allow manual binding
     
     if not ids:
         return jsonify({'processed': 0})
     
-    items = CollectionItem.query.filter(CollectionItem.id.in_(ids)).all()
-    processed = 0
-    
-    # Load all rules for matching
-    all_rules = CrawlRule.query.all()
-    
-    manual_rule = None
-    if manual_rule_id:
-        manual_rule = db.session.get(CrawlRule, int(manual_rule_id))
+    job = enqueue_job('batch_deep', {
+        'ids': ids,
+        'rule_id': payload.get('rule_id'), # Allow manual binding
+        'workers': payload.get('workers'),
+        'skip_duplicates': payload.get('skip_duplicates')
+    })
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
 
-    for it in items:
-        try:
-            if not it.url:
-                continue
-            
-            matched_rules = []
-            
-            # Priority: 
-            # 1. Manual rule (if selected)
-            # 2. Existing associated rule (it.rule)
-            # 3. Auto-match from all rules
-            
-            if manual_rule:
-                matched_rules.append(manual_rule)
-            elif it.rule:
-                matched_rules.append(it.rule)
-            else:
-                # Auto match logic
-                for rule in all_rules:
-                    is_match = False
-                    r_site_clean = rule.site.replace('http://','').replace('https://','').strip() if rule.site else ""
-                    
-                    if rule.match_type == 'domain':
-                        if it.url and r_site_clean and r_site_clean in it.url:
-                            is_match = True
-                    elif rule.match_type == 'source':
-                        if it.source and rule.site and (rule.site == it.source or rule.site in it.source or it.source in rule.site):
-                            is_match = True
-                    
-                    if is_match:
-                        matched_rules.append(rule)
-            
-            # Use the first matched rule or skip
-            content_text = None
-            
-            if matched_rules:
-                rule = matched_rules[0]
-                it.rule_id = rule.id
-                
-                # Perform deep collection with rule
-                # unpack tuple (title, content)
-                res = collect_content_by_rule(it.url, rule.title_xpath, rule.content_xpath, rule.headers_json)
-                if res:
-                    _, content_text = res
-            
-            # Fallback to generic deep collection if rule failed or no rule matched
-            if not content_text:
-                content_text = deep_collect_content(it.url)
-            
-            if content_text:
-                if it.deep_content_obj:
-                    it.deep_content_obj.content = content_text
-                else:
-                    it.deep_content_obj = DeepCollectionContent(content=content_text)
-                it.deep_collected = True
-                processed += 1
-                
-        except Exception as e:
-            print(f"Batch deep error item {it.id}: {e}")
-            
-    db.session.commit()
-    return jsonify({'processed': processed})
+# --- Background Jobs Routes ---
+@bp.route('/jobs/<int:id>')
+@login_required
+def job_status(id):
+    job = db.session.get(Job, id)
+    if not job:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(job_to_dict(job))
+
+@bp.route('/jobs/<int:id>/cancel', methods=['POST'])
+@login_required
+def job_cancel(id):
+    job = db.session.get(Job, id)
+    if not job:
+        return jsonify({'error': 'not found'}), 404
+    cancel_job(job)
+    return jsonify(job_to_dict(job))
 
 # --- AI Engines Routes ---
 @bp.route('/ai_engine/list')
@@ -896,7 +1206,8 @@ def dashboard_heatmap():
     # Analyze recent deep content for heatmap
     try:
         # Get latest 20 items with deep content
-        contents = DeepCollectionContent.query.order_by(DeepCollectionContent.created_at.desc()).limit(20).all()
+        contents = DeepCollectionContent.query.options(undefer(DeepCollectionContent.content)) \
+            .order_by(DeepCollectionContent.created_at.desc()).limit(20).all()
         
         if not contents:
             return jsonify([])
@@ -0,0 +1,163 @@
+from itertools import chain
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, text, bindparam
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import CollectionItem, DeepCollectionContent
+from tools.search_text import index_text, match_expression
+
+SEARCH_TABLE = 'item_search'
+_PENDING = 'search_pending'
+_available = {}
+
+# prefix='1' 为单字前缀建索引 (单个汉字检索用前缀匹配)；bm25 中标题权重高于正文
+_CREATE = [
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(title, content, tokenize='unicode61', prefix='1')",
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES('rank', 'bm25(10.0, 1.0)')",
+]
+
+
+def search_available(session=None):
+    """
+    全文索引只在 SQLite (FTS5) 上启用，且需要已建表 (迁移或重建任务)
+    """
+    bind = (session or db.session).get_bind()
+    if bind.dialect.name != 'sqlite':
+        return False
+    key = str(bind.url)
+    if key not in _available:
+        with bind.connect() as conn:
+            found = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                 {'name': SEARCH_TABLE}).first()
+        _available[key] = found is not None
+    return _available[key]
+
+
+def mark_search_dirty(ids, session=None):
+    """
+    绕过 ORM 的写入 (批量插入/更新) 调用，提交时重建这些条目的索引
+    """
+    session = session or db.session()
+    session.info.setdefault(_PENDING, set()).update(ids)
+
+
+def _chunks(values, size=500):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def sync_search_rows(session, ids):
+    """
+    按当前数据库内容重写这些条目的索引行，已删除的条目只删除索引行
+    """
+    delete = text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True))
+    insert = text(f"INSERT INTO {SEARCH_TABLE}(rowid, title, content) VALUES (:id, :title, :content)")
+    conn = session.connection()
+    for part in _chunks(ids):
+        conn.execute(delete, {'ids': part})
+        rows = session.query(CollectionItem.id, CollectionItem.title,
+                             func.coalesce(func.nullif(DeepCollectionContent.content, ''), CollectionItem.deep_content)) \
+            .outerjoin(DeepCollectionContent, DeepCollectionContent.item_id == CollectionItem.id) \
+            .filter(CollectionItem.id.in_(part)).all()
+        if rows:
+            conn.execute(insert, [{'id': i, 'title': index_text(t), 'content': index_text(c)} for i, t, c in rows])
+
+
+def _changed(obj, *keys):
+    state = inspect(obj)
+    return any(state.attrs[k].history.has_changes() for k in keys)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, CollectionItem):
+            if obj in session.dirty and not _changed(obj, 'title', 'deep_content'):
+                continue
+            ids.add(obj.id)
+        elif isinstance(obj, DeepCollectionContent):
+            if obj in session.dirty and not _changed(obj, 'content'):
+                continue
+            ids.add(obj.item_id)
+    ids.discard(None)
+    if ids:
+        mark_search_dirty(ids, session)
+
+
+@event.listens_for(Session, 'before_commit')
+def _sync_on_commit(session):
+    # before_commit 在最后一次 flush 之前触发，先 flush 才能收集到全部改动
+    session.flush()
+    ids = session.info.pop(_PENDING, None)
+    if ids and search_available(session):
+        sync_search_rows(session, ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+def search_items(q, offset=0, limit=20):
+    """
+    全文检索条目标题与深度采集正文
+    为使耗时不随库的规模增长，只取最新的 SEARCH_MAX_HITS 条命中：
+    - 命中数未到上限时按 bm25 排序 (标题权重更高)
+    - 到达上限 (常见词) 时 bm25 要扫描整个倒排表统计词频，改为标题命中优先、较新优先
+    :return: (total, [(item_id, score)])，total 最多为 SEARCH_MAX_HITS；全文索引不可用时返回 None
+    """
+    if not search_available():
+        return None
+    expr = match_expression(q)
+    if expr is None:
+        return 0, []
+    cap = current_app.config['SEARCH_MAX_HITS']
+    newest = text(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :expr ORDER BY rowid DESC LIMIT :cap")
+    ids = db.session.execute(newest, {'expr': expr, 'cap': cap}).scalars().all()
+    if len(ids) < cap:
+        rows = db.session.execute(text(
+            f"SELECT rowid, rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :expr "
+            f"ORDER BY rank LIMIT :limit OFFSET :offset"
+        ), {'expr': expr, 'limit': limit, 'offset': offset}).all()
+        return len(ids), [(r[0], r[1]) for r in rows]
+
+    # 标题命中只在同一 rowid 区间内查，扫描量与上面相同
+    in_title = set(db.session.execute(text(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :expr AND rowid >= :floor"
+    ), {'expr': f"title : ({expr})", 'floor': ids[-1]}).scalars())
+    ordered = [i for i in ids if i in in_title] + [i for i in ids if i not in in_title]
+    return len(ids), [(i, None) for i in ordered[offset:offset + limit]]
+
+
+def rebuild_search_index(progress=None):
+    """
+    重建全文索引 (没有表时先建表)
+    :param progress: 回调 progress(done)
+    :return: 已索引的条目数
+    """
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return 0
+    db.session.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    for stmt in _CREATE:
+        db.session.execute(text(stmt))
+    _available[str(bind.url)] = True
+    done = 0
+    last_id = 0
+    while True:
+        ids = [r[0] for r in db.session.query(CollectionItem.id).filter(CollectionItem.id > last_id)
+               .order_by(CollectionItem.id).limit(1000)]
+        if not ids:
+            break
+        sync_search_rows(db.session, ids)
+        db.session.commit()
+        done += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(done)
+    db.session.commit()
+    return done
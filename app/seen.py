@@ -0,0 +1,31 @@
+from sqlalchemy import func
+
+from app import db
+from app.models import CollectionItem
+from tools.seen_filter import get_seen_filter, SEEN_CAPACITY
+
+
+def sync_seen_filter(rebuild=False):
+    """
+    把上次同步之后新入库的条目补进持久化的已入库 URL 集合
+    :param rebuild: 整体重建 (删除过大量条目，或条目数超出容量时自动重建)
+    :return: SeenFilter
+    """
+    seen = get_seen_filter()
+    with seen.lock:
+        if rebuild or seen.full:
+            total = db.session.query(func.count(CollectionItem.id)).scalar() or 0
+            seen.reset(capacity=max(SEEN_CAPACITY, total * 2))
+        # 跳转原地址也收录：列表页上仍是跳转链接、或解析前后两种写法都可能出现
+        rows = db.session.query(CollectionItem.id, CollectionItem.url_hash, CollectionItem.original_url) \
+            .filter(CollectionItem.id > seen.max_id).order_by(CollectionItem.id).yield_per(5000)
+        added = 0
+        for item_id, h, original_url in rows:
+            seen.add_hash(h)
+            if original_url:
+                seen.add(original_url)
+            seen.max_id = item_id
+            added += 1
+        if added or rebuild:
+            seen.save()
+    return seen
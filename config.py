@@ -7,3 +7,33 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # 批量深度采集 (/warehouse/batch_deep)
+    BATCH_DEEP_WORKERS = int(os.environ.get('BATCH_DEEP_WORKERS', 8))        # 线程池大小
+    BATCH_DEEP_PER_DOMAIN = int(os.environ.get('BATCH_DEEP_PER_DOMAIN', 2))  # 同一域名并发上限
+    BATCH_DEEP_DEADLINE = int(os.environ.get('BATCH_DEEP_DEADLINE', 120))    # 整体截止时间(秒)，仅用于请求线程内的批量采集
+    BATCH_DEEP_JOB_DEADLINE = int(os.environ.get('BATCH_DEEP_JOB_DEADLINE', 0))  # 后台任务每轮的截止时间(秒)，0 为不限；到时未完成的条目重新排队续跑
+    BATCH_DEEP_COMMIT_CHUNK = int(os.environ.get('BATCH_DEEP_COMMIT_CHUNK', 20))  # 每多少条提交一次
+
+    # 采集结果批量入库 (/collector/save, app/ingest.py)
+    BULK_SAVE_CHUNK = int(os.environ.get('BULK_SAVE_CHUNK', 500))  # 每块条目数，每块一次探测、一次提交
+
+    # 全文检索 (app/search.py)
+    SEARCH_MAX_HITS = int(os.environ.get('SEARCH_MAX_HITS', 10000))  # 只在最新的这么多条命中中排序，检索耗时不随库增长
+
+    # 列表分页 (app/pagination.py)
+    LIST_COUNT_TTL = int(os.environ.get('LIST_COUNT_TTL', 30))  # 列表总数缓存秒数，过期后后台重新计数
+    LIST_PREVIEW_CHARS = int(os.environ.get('LIST_PREVIEW_CHARS', 80))  # 列表中正文摘要的字数，全文按条目单独获取
+
+    # 后台任务 (app/jobs.py, worker.py)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))                # worker 进程数
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 120))  # 租约时长，超时未续租视为 worker 失联
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))      # 最多被租用的次数
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))  # 空闲轮询间隔(秒)
+
+    # 近似重复检测 (app/dedup.py)
+    NEAR_DUP_TITLE_DISTANCE = int(os.environ.get('NEAR_DUP_TITLE_DISTANCE', 3))           # 标题 SimHash 海明距离上限 (≤3)
+    NEAR_DUP_MIN_TITLE = int(os.environ.get('NEAR_DUP_MIN_TITLE', 8))                     # 参与标题判重的最短标题 (去标点后)
+    NEAR_DUP_CONTENT_JACCARD = float(os.environ.get('NEAR_DUP_CONTENT_JACCARD', 0.7))     # 正文 MinHash 相似度下限
+    NEAR_DUP_MIN_CONTENT = int(os.environ.get('NEAR_DUP_MIN_CONTENT', 100))               # 参与正文判重的最短正文
+    NEAR_DUP_SKIP = os.environ.get('NEAR_DUP_SKIP', '1') == '1'                           # 深度采集、分析默认跳过近似重复条目
@@ -0,0 +1,66 @@
+"""add full text search index
+
+Revision ID: 9bd498fbdafc
+Revises: 1cc65101cd89
+Create Date: 2026-10-17 18:31:05.410276
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from tools.search_text import index_text
+
+
+# revision identifiers, used by Alembic.
+revision = '9bd498fbdafc'
+down_revision = '1cc65101cd89'
+branch_labels = None
+depends_on = None
+
+
+collection_item = sa.table(
+    'collection_item',
+    sa.column('id', sa.Integer),
+    sa.column('title', sa.String),
+    sa.column('deep_content', sa.Text),
+)
+deep_collection_content = sa.table(
+    'deep_collection_content',
+    sa.column('item_id', sa.Integer),
+    sa.column('content', sa.Text),
+)
+
+
+def upgrade():
+    # FTS5 只在 SQLite 上可用，其他数据库的全文检索退回 LIKE 匹配
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return
+    op.execute("CREATE VIRTUAL TABLE item_search USING fts5(title, content, tokenize='unicode61', prefix='1')")
+    op.execute("INSERT INTO item_search(item_search, rank) VALUES('rank', 'bm25(10.0, 1.0)')")
+
+    # 回填：标题与深度采集正文按 bigram 分词后写入，按 id 分批读取
+    insert = sa.text("INSERT INTO item_search(rowid, title, content) VALUES (:id, :title, :content)")
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(
+                collection_item.c.id, collection_item.c.title,
+                sa.func.coalesce(sa.func.nullif(deep_collection_content.c.content, ''),
+                                 collection_item.c.deep_content)
+            ).select_from(
+                collection_item.outerjoin(deep_collection_content,
+                                          deep_collection_content.c.item_id == collection_item.c.id)
+            ).where(collection_item.c.id > last_id).order_by(collection_item.c.id).limit(1000)
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(insert, [{'id': i, 'title': index_text(t), 'content': index_text(c)} for i, t, c in rows])
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS item_search")
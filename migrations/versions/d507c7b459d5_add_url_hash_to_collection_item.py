@@ -0,0 +1,209 @@
+"""add url_hash to collection_item
+
+Revision ID: d507c7b459d5
+Revises: be4292d208f3
+Create Date: 2026-10-17 15:02:11.504312
+
+"""
+import hashlib
+import urllib.parse
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd507c7b459d5'
+down_revision = 'be4292d208f3'
+branch_labels = None
+depends_on = None
+
+
+# 规范化规则按本次迁移时的版本固定 (不引用 tools.url_canon)，之后规则调整时由 url_rehash 任务重算
+_TRACKING_PARAMS = {
+    'spm', 'wfr', 'share_token', 'share_from', 'sharefrom', 'isappinstalled', 'scene', 'clicktime',
+    'enterid', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'from_source', 'timestamp'
+}
+_TRACKING_PREFIXES = ('utm_',)
+_HOST_KEEP_PARAMS = {
+    'baijiahao.baidu.com': {'id'},
+}
+_REDIRECT_WRAPPERS = {
+    'link.zhihu.com': ('/', 'target'),
+    'link.juejin.cn': ('/', 'target'),
+    'link.csdn.net': ('/', 'target'),
+    'www.jianshu.com': ('/go-wild', 'url'),
+    'www.douban.com': ('/link2/', 'url'),
+    'weibo.cn': ('/sinaurl', 'u'),
+    'www.google.com': ('/url', 'q'),
+    'l.facebook.com': ('/l.php', 'u'),
+}
+_DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def _unwrap_redirect(url):
+    for _ in range(3):
+        parts = urllib.parse.urlsplit(url)
+        wrapper = _REDIRECT_WRAPPERS.get((parts.hostname or '').lower())
+        if not wrapper or (parts.path or '/') != wrapper[0]:
+            return url
+        values = urllib.parse.parse_qs(parts.query).get(wrapper[1])
+        if not values or not values[0].startswith(('http://', 'https://')):
+            return url
+        url = values[0]
+    return url
+
+
+def _canonicalize_url(url):
+    url = (url or '').strip()
+    if not url:
+        return ''
+    url = _unwrap_redirect(url)
+    try:
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https'):
+        return url
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    if port and str(port) != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    path = parts.path or '/'
+
+    keep = _HOST_KEEP_PARAMS.get(parts.hostname or '')
+    params = []
+    for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True):
+        lk = k.lower()
+        if keep is not None and k not in keep:
+            continue
+        if lk in _TRACKING_PARAMS or lk.startswith(_TRACKING_PREFIXES):
+            continue
+        params.append((k, v))
+    params.sort()
+    return urllib.parse.urlunsplit((scheme, host, path, urllib.parse.urlencode(params), ''))
+
+
+def url_hash(url):
+    canon = _canonicalize_url(url)
+    if not canon:
+        return None
+    return hashlib.sha1(canon.encode('utf-8')).hexdigest()
+
+
+collection_item = sa.table(
+    'collection_item',
+    sa.column('id', sa.Integer),
+    sa.column('keyword', sa.String),
+    sa.column('title', sa.String),
+    sa.column('cover', sa.String),
+    sa.column('url', sa.String),
+    sa.column('url_hash', sa.String),
+    sa.column('source', sa.String),
+    sa.column('deep_collected', sa.Boolean),
+    sa.column('deep_content', sa.Text),
+    sa.column('rule_id', sa.Integer),
+)
+deep_collection_content = sa.table(
+    'deep_collection_content',
+    sa.column('id', sa.Integer),
+    sa.column('item_id', sa.Integer),
+    sa.column('content', sa.Text),
+)
+
+MERGE_FIELDS = ('keyword', 'title', 'cover', 'source', 'rule_id')
+
+
+def _has_text(column):
+    return sa.and_(column.isnot(None), column != '')
+
+
+def _merge_duplicates(conn, groups):
+    """
+    同一规范化 URL 的多条记录合并为一条：
+    保留有深度采集正文的最早一条 (都没有正文时保留最早一条)，其余记录的非空字段补到保留条目的空缺上；
+    保留条目缺少的正文 (deep_collection_content 与旧版 deep_content 字段) 从其他记录移过来，再删除其他记录
+    """
+    contents = {r.item_id: (r.id, r.filled) for r in conn.execute(sa.select(
+        deep_collection_content.c.id, deep_collection_content.c.item_id,
+        _has_text(deep_collection_content.c.content).label('filled')))}
+    legacy = {r.id for r in conn.execute(sa.select(collection_item.c.id).where(_has_text(collection_item.c.deep_content)))}
+
+    def has_content(r):
+        return contents.get(r.id, (None, False))[1]
+
+    for h, rows in groups.items():
+        if len(rows) < 2:
+            continue
+        rows.sort(key=lambda r: (not (has_content(r) or r.id in legacy), r.id))
+        keeper, others = rows[0], rows[1:]
+
+        values = {}
+        for field in MERGE_FIELDS:
+            if getattr(keeper, field) is None or getattr(keeper, field) == '':
+                for o in others:
+                    v = getattr(o, field)
+                    if v is not None and v != '':
+                        values[field] = v
+                        break
+        values['url_hash'] = h
+        if any(r.deep_collected for r in others):
+            values['deep_collected'] = True
+
+        # 正文：把其他记录的正文行改挂到保留条目上，旧版字段按原值复制
+        if not has_content(keeper):
+            donor = next((o for o in others if has_content(o)), None)
+            if donor is not None:
+                if keeper.id in contents:
+                    conn.execute(deep_collection_content.delete().where(deep_collection_content.c.item_id == keeper.id))
+                conn.execute(deep_collection_content.update()
+                             .where(deep_collection_content.c.id == contents[donor.id][0]).values(item_id=keeper.id))
+        if keeper.id not in legacy:
+            donor = next((o for o in others if o.id in legacy), None)
+            if donor is not None:
+                src = collection_item.alias('src')
+                values['deep_content'] = sa.select(src.c.deep_content).where(src.c.id == donor.id).scalar_subquery()
+
+        other_ids = [o.id for o in others]
+        conn.execute(deep_collection_content.delete().where(deep_collection_content.c.item_id.in_(other_ids)))
+        conn.execute(collection_item.update().where(collection_item.c.id == keeper.id).values(**values))
+        conn.execute(collection_item.delete().where(collection_item.c.id.in_(other_ids)))
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('collection_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('url_hash', sa.String(length=40), nullable=True))
+
+    # ### end Alembic commands ###
+
+    # 回填哈希并合并重复记录，之后才能建唯一索引
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(
+        collection_item.c.id, collection_item.c.url, collection_item.c.deep_collected,
+        *[collection_item.c[f] for f in MERGE_FIELDS]
+    )).fetchall()
+    groups = {}
+    for r in rows:
+        h = url_hash(r.url)
+        if h:
+            groups.setdefault(h, []).append(r)
+    _merge_duplicates(conn, groups)
+    for h, group in groups.items():
+        if len(group) == 1:
+            conn.execute(collection_item.update().where(collection_item.c.id == group[0].id).values(url_hash=h))
+
+    with op.batch_alter_table('collection_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_collection_item_url_hash'), ['url_hash'], unique=True)
+
+
+def downgrade():
+    # 合并掉的重复记录无法恢复
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('collection_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_collection_item_url_hash'))
+        batch_op.drop_column('url_hash')
+
+    # ### end Alembic commands ###
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# tools/ 没有 __init__.py，按仓库根目录导入 (与 python -m tools.xxx 一致)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
@@ -0,0 +1,18 @@
+from tools.cover_resolver import extract_page_cover
+
+LOGO_PAGE = b'<html><head></head><body><img src="/site-logo.png"><div class="c">text</div></body></html>'
+META_PAGE = (b'<html><head><meta property="og:image" content="/og.jpg"></head>'
+             b'<body><img src="/site-logo.png"><div class="pic"><img src="/a.jpg"></div></body></html>')
+
+
+def test_deep_selector_hit():
+    assert extract_page_cover(META_PAGE, 'text/html', 'https://x.com/n/1', '.pic img') == 'https://x.com/a.jpg'
+
+
+def test_deep_selector_miss_uses_meta_only():
+    assert extract_page_cover(META_PAGE, 'text/html', 'https://x.com/n/1', '.nothing img') == 'https://x.com/og.jpg'
+    assert extract_page_cover(LOGO_PAGE, 'text/html', 'https://x.com/n/1', '.nothing img') == ''
+
+
+def test_fallback_chain_without_selector():
+    assert extract_page_cover(LOGO_PAGE, 'text/html', 'https://x.com/n/1') == 'https://x.com/site-logo.png'
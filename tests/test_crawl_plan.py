@@ -0,0 +1,33 @@
+"""
+通用爬虫配置编译：选择器写错时记在 plan.error 上，爬虫不产出条目也不抛出
+"""
+from tools.crawl_plan import CrawlerPlan
+from tools.baidu_crawler import crawl_generic, parse_generic_page, iter_generic_results
+
+BAD_CONFIG = {
+    'name': '写错的配置',
+    'base_url': 'http://127.0.0.1:9/list',
+    'list_selector': 'li.news-item',
+    'title_selector': 'a[href',
+}
+
+
+def test_bad_selector_recorded_on_plan():
+    plan = CrawlerPlan(BAD_CONFIG)
+    assert plan.error is not None
+    assert plan.title_css is None
+
+
+def test_good_selectors_compile():
+    plan = CrawlerPlan(dict(BAD_CONFIG, title_selector='a.title', url_selector='a.title (data-href)',
+                            cover_selector='img|deep:.article img', source_selector='fixed:本站'))
+    assert plan.error is None
+    assert plan.list_match is not None and plan.url_attr == 'data-href'
+    assert plan.deep_cover_selector == '.article img' and plan.fixed_source == '本站'
+
+
+def test_crawlers_skip_bad_config():
+    body = b'<ul><li class="news-item"><a class="title" href="/1">x</a></li></ul>'
+    assert list(crawl_generic(BAD_CONFIG, 'kw')) == []
+    assert parse_generic_page(body, 'text/html', BAD_CONFIG, 'http://example.com/') is None
+    assert list(iter_generic_results([body], 'text/html', BAD_CONFIG, 'http://example.com/')) == []
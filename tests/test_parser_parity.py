@@ -0,0 +1,201 @@
+"""
+解析一致性：lxml 与 bs4 引擎逐字段相同，增量解析与整页解析结果相同
+
+    python -m pytest tests
+"""
+import glob
+import os
+
+import pytest
+
+from tools import parser_engine
+from tools.parser_engine import ENGINES, parse_baidu_results, parse_baidu_page, iter_baidu_results
+from tools.baidu_crawler import parse_generic_page, iter_generic_results
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+PAGES = sorted(glob.glob(os.path.join(basedir, 'debug_baidu*.html')))
+FIELDS = ('title', 'cover', 'url', 'source')
+
+# 各种边界情况的结果容器：缺封面、缺来源、缺标题链接、懒加载封面、脚本里的文字、备选来源 class
+EDGE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>edge</title></head><body>
+<div class="result-op c-container">
+  <h3><a href="https://a.example.com/1">完整 <em>条目</em></a></h3>
+  <img class="c-img" src="https://img.example.com/1.jpg">
+  <span class="c-color-gray">来源甲</span>
+</div>
+<div class="result-op c-container">
+  <h3><a href="https://a.example.com/2">缺封面</a></h3>
+  <span class="c-color-gray2">来源乙</span>
+</div>
+<div class="result-op c-container">
+  <h3><a href="https://a.example.com/3">缺来源</a></h3>
+  <img src="" data-src=" https://img.example.com/3.jpg ">
+</div>
+<div class="result-op c-container">
+  <p>没有标题链接</p>
+</div>
+<div class="c-container result-op extra">
+  <h3><a href="https://a.example.com/5">标题<script>var x = "脚本";</script>尾部</a></h3>
+  <div class="source_1Vdff"> 来源 <b>丙</b> </div>
+</div>
+</body></html>
+"""
+
+GENERIC_CONFIG = {
+    'name': '测试站',
+    'list_selector': 'li.news-item',
+    'title_selector': 'a.title',
+    'url_selector': 'a.title',
+    'cover_selector': 'img',
+    'source_selector': '.src',
+}
+
+GENERIC_PAGE = """<html><head><meta charset="utf-8"></head><body><ul>
+<li class="news-item"><a class="title" href="/n/1">第一条</a><img src="/i/1.jpg"><span class="src">甲</span></li>
+<li class="news-item"><a class="title" href="https://b.example.com/n/2">第二条 <em>加粗</em></a></li>
+<li class="news-item"><span class="src">没有链接</span></li>
+<li class="news-item other"><a class="title" href="n/4">第四条</a><img data-src="/i/4.jpg"></li>
+</ul></body></html>
+"""
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def split_at(body, marker):
+    """
+    恰好在每个 marker (标签开头) 处切块
+    """
+    chunks, start = [], 0
+    pos = body.find(marker, 1)
+    while pos != -1:
+        chunks.append(body[start:pos])
+        start = pos
+        pos = body.find(marker, pos + 1)
+    chunks.append(body[start:])
+    return chunks
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def assert_same(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        for field in FIELDS:
+            assert x[field] == y[field], (field, x, y)
+
+
+@pytest.fixture
+def engine(request):
+    # 切换默认引擎，测试结束后还原
+    saved = parser_engine.PARSER_ENGINE
+    parser_engine.PARSER_ENGINE = request.param
+    yield request.param
+    parser_engine.PARSER_ENGINE = saved
+
+
+@pytest.mark.skipif(not PAGES, reason='no debug_baidu*.html pages')
+@pytest.mark.parametrize('path', PAGES, ids=os.path.basename)
+def test_baidu_engines_match(path):
+    html = read(path).decode('utf-8', 'replace')
+    lxml_items, bs4_items = (parse_baidu_results(html, e) for e in ENGINES)
+    assert lxml_items
+    assert_same(lxml_items, bs4_items)
+
+
+@pytest.mark.skipif(not PAGES, reason='no debug_baidu*.html pages')
+@pytest.mark.parametrize('path', PAGES, ids=os.path.basename)
+@pytest.mark.parametrize('size', [1024, 4093, 65536, 1 << 30])
+def test_baidu_incremental_matches_whole(path, size):
+    body = read(path)
+    assert_same(list(iter_baidu_results(chunked(body, size))), parse_baidu_page(body))
+
+
+@pytest.mark.skipif(not PAGES, reason='no debug_baidu*.html pages')
+@pytest.mark.parametrize('path', PAGES, ids=os.path.basename)
+def test_baidu_incremental_split_at_tag_boundary(path):
+    body = read(path)
+    chunks = split_at(body, b'<div class="result-op')
+    assert len(chunks) > 1
+    assert_same(list(iter_baidu_results(chunks)), parse_baidu_page(body))
+
+
+@pytest.mark.skipif(not PAGES, reason='no debug_baidu*.html pages')
+@pytest.mark.parametrize('path', PAGES, ids=os.path.basename)
+def test_baidu_truncated_body(path):
+    # 下载中断：正文停在最后一个结果容器中间
+    body = read(path)
+    cut = body[:body.rfind(b'c-container') + 3000]
+    whole = parse_baidu_page(cut)
+    assert whole
+    assert_same(list(iter_baidu_results(chunked(cut, 4093))), whole)
+    assert_same(parse_baidu_results(cut.decode('utf-8', 'replace'), 'bs4'), whole)
+
+
+def test_baidu_edge_cases():
+    results = [parse_baidu_results(EDGE_PAGE, e) for e in ENGINES]
+    assert_same(*results)
+    assert_same(list(iter_baidu_results(chunked(EDGE_PAGE.encode('utf-8'), 7))), results[0])
+
+    items = results[0]
+    assert [it['url'] for it in items] == ['https://a.example.com/1', 'https://a.example.com/2',
+                                           'https://a.example.com/3', '', 'https://a.example.com/5']
+    assert items[0] == {'title': '完整条目', 'cover': 'https://img.example.com/1.jpg',
+                        'url': 'https://a.example.com/1', 'source': '来源甲'}
+    assert items[1]['cover'] == '' and items[1]['source'] == '来源乙'
+    assert items[2]['cover'] == 'https://img.example.com/3.jpg' and items[2]['source'] == '未知来源'
+    assert items[3]['title'] == '无标题'
+    assert items[4]['title'] == '标题尾部' and items[4]['source'] == '来源丙'
+
+
+def test_baidu_fallback_selector():
+    html = '<html><body><div class="result"><h3><a href="https://a.example.com/x">兜底</a></h3></div></body></html>'
+    results = [parse_baidu_results(html, e) for e in ENGINES]
+    assert_same(*results)
+    assert_same(list(iter_baidu_results([html.encode('utf-8')])), results[0])
+    assert results[0][0]['title'] == '兜底'
+
+
+def test_baidu_empty_page():
+    for e in ENGINES:
+        assert parse_baidu_results('', e) == []
+    assert list(iter_baidu_results([])) == []
+
+
+@pytest.mark.parametrize('engine', ENGINES, indirect=True)
+def test_generic_engines_and_incremental_match(engine):
+    body = GENERIC_PAGE.encode('utf-8')
+    url = 'https://b.example.com/list/'
+    whole = parse_generic_page(body, 'text/html; charset=utf-8', GENERIC_CONFIG, url)
+    assert [it['url'] for it in whole] == ['https://b.example.com/n/1', 'https://b.example.com/n/2',
+                                           'https://b.example.com/list/n/4']
+    assert whole[0]['cover'] == 'https://b.example.com/i/1.jpg' and whole[0]['source'] == '甲'
+    for size in (5, 64, len(body)):
+        assert_same(list(iter_generic_results(chunked(body, size), 'text/html', GENERIC_CONFIG, url)), whole)
+    assert_same(list(iter_generic_results(split_at(body, b'<li'), 'text/html', GENERIC_CONFIG, url)), whole)
+
+
+def test_generic_engines_match():
+    body = GENERIC_PAGE.encode('utf-8')
+    results = []
+    saved = parser_engine.PARSER_ENGINE
+    try:
+        for e in ENGINES:
+            parser_engine.PARSER_ENGINE = e
+            results.append(parse_generic_page(body, 'text/html', GENERIC_CONFIG, 'https://b.example.com/list/'))
+    finally:
+        parser_engine.PARSER_ENGINE = saved
+    assert_same(*results)
+
+
+def test_truncated_inside_comment():
+    html = EDGE_PAGE[:EDGE_PAGE.index('缺封面')] + '缺封面</a></h3><!--s-text'
+    results = [parse_baidu_results(html, e) for e in ENGINES]
+    assert_same(*results)
+    assert_same(list(iter_baidu_results([html.encode('utf-8')])), results[0])
+    assert results[0][1]['title'] == '缺封面'
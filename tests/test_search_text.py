@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+from tools.search_text import index_text, match_expression, tokenize
+
+DOCS = {
+    1: '市政府发布通知',
+    2: '关于开展安全检查的公告 2024年',
+    3: '教育局 通知abc123',
+    4: '水',
+}
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE VIRTUAL TABLE t USING fts5(content, tokenize='unicode61', prefix='1')")
+    conn.executemany("INSERT INTO t(rowid, content) VALUES (?, ?)", [(i, index_text(d)) for i, d in DOCS.items()])
+    yield conn
+    conn.close()
+
+
+def search(conn, q):
+    expr = match_expression(q)
+    return sorted(r[0] for r in conn.execute("SELECT rowid FROM t WHERE t MATCH ?", (expr,)))
+
+
+def test_tokenize_adds_run_tail():
+    assert tokenize('通知abc') == ['通知', '知', 'abc']
+    assert tokenize('水') == ['水']
+
+
+@pytest.mark.parametrize('q, expected', [
+    ('知', [1, 3]),      # 只出现在一段汉字末尾
+    ('市', [1]),
+    ('水', [4]),
+    ('通知', [1, 3]),
+    ('政府发布', [1]),
+    ('告', [2]),
+    ('公告 2024', [2]),
+    ('知abc123', [3]),
+    ('通知abc123', [3]),
+    ('局 知', [3]),
+    ('府发通', []),
+])
+def test_match_expression(conn, q, expected):
+    assert search(conn, q) == expected
+
+
+def test_match_expression_empty():
+    assert match_expression('  ,, ') is None
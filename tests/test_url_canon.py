@@ -0,0 +1,37 @@
+import urllib.parse
+
+import pytest
+
+from tools.url_canon import canonicalize_url, unwrap_redirect, url_hash
+
+
+@pytest.mark.parametrize('a, b', [
+    ('https://a.example.com/p?b=2&a=1', 'https://A.example.com:443/p?a=1&b=2#top'),
+    ('https://a.example.com/p?id=1&utm_source=x&spm=3', 'https://a.example.com/p?id=1'),
+    ('https://link.zhihu.com/?target=https%3A%2F%2Fa.example.com%2Fp', 'https://a.example.com/p'),
+    ('https://baijiahao.baidu.com/s?id=1&wfr=spider&for=pc', 'https://baijiahao.baidu.com/s?id=1'),
+])
+def test_same_page(a, b):
+    assert url_hash(a) == url_hash(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    ('https://site.example.com/go?url=https://a.example.com/p', 'https://a.example.com/p'),
+    ('https://site.example.com/share?u=https://a.example.com/1', 'https://site.example.com/share?u=https://a.example.com/2'),
+    ('https://link.zhihu.com/other?target=https://a.example.com/p', 'https://a.example.com/p'),
+    ('http://a.example.com/p', 'https://a.example.com/p'),
+    ('https://a.example.com/dir/', 'https://a.example.com/dir'),
+])
+def test_different_pages(a, b):
+    assert url_hash(a) != url_hash(b)
+
+
+def test_unwrap_nested():
+    inner = 'https://link.juejin.cn/?target=' + urllib.parse.quote('https://a.example.com/x', safe='')
+    outer = 'https://www.google.com/url?q=' + urllib.parse.quote(inner, safe='')
+    assert unwrap_redirect(outer) == 'https://a.example.com/x'
+
+
+def test_canonicalize_non_http():
+    assert canonicalize_url(' mailto:a@example.com ') == 'mailto:a@example.com'
+    assert url_hash('') is None
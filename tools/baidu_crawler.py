@@ -1,23 +1,37 @@
-import requests
-from bs4 import BeautifulSoup
 import urllib.parse
-import time
-import random
 from bs4.element import Tag
-
-def crawl_baidu_news(keyword, max_count=20, max_pages=5):
+from tools.fetcher import get_fetcher, HAS_CURL_CFFI, MAX_BODY_BYTES, CHUNK_SIZE, ContentRejected
+from tools.prefetch import PagePrefetcher, PREFETCH_PAGES
+from tools.charset import decode_html, decode_body
+from tools.parser_engine import (
+    make_soup, parse_html, parse_baidu_page, iter_baidu_results, element_to_tag,
+    IncrementalListParser, INCREMENTAL_PARSE
+)
+from tools.content_density import find_densest_block
+from tools.crawl_plan import RulePlan, get_crawler_plan
+from tools.parse_pool import run_parse
+from tools.cover_resolver import resolve_cover
+from tools.seen_filter import PageSeenCounter
+from tools.redirect_resolver import get_redirect_resolver, RESOLVE_REDIRECTS
+from tools.extraction_profiles import get_profile_store, element_selector
+
+def crawl_baidu_news(keyword, max_count=20, max_pages=5, prefetch=PREFETCH_PAGES, incremental=INCREMENTAL_PARSE, seen=None,
+                     resolve_redirects=RESOLVE_REDIRECTS):
     """
     爬取百度资讯搜索结果 (Generator Version)
     :param keyword: 搜索关键字
     :param max_count: 期望获取的最大数据量，默认为20
     :param max_pages: 最大爬取页数，默认为5
+    :param prefetch: 列表页预取深度，0 为串行抓取
+    :param incremental: 第 1 页边下载边解析，每个结果一闭合就推送，缩短首条结果的等待
+    :param seen: 已入库 URL 集合 (SeenFilter)；传入时为增量采集，跳过已入库的条目，一页大部分已入库即停止翻页
+    :param resolve_redirects: 把百度跳转链接并发解析为真实地址 (原地址存入 original_url)，去重与增量判断都按真实地址
     :yield: 字典形式的新闻数据
     """
     base_url = "https://www.baidu.com/s"
     
     headers = {
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-        "Accept-Encoding": "gzip, deflate",
         "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
         "Cache-Control": "max-age=0",
         "Connection": "keep-alive",
@@ -39,13 +53,14 @@ def crawl_baidu_news(keyword, max_count=20, max_pages=5):
     seen_urls = set()
     seen_titles = set() # 增加标题去重
     page = 0
-    max_pages = 5 # 防止无限循环，最多爬取5页
+    known = PageSeenCounter(seen)
+    resolver = get_redirect_resolver() if resolve_redirects else None
     
-    while count < max_count and page < max_pages:
+    def page_params(page):
         pn = page * 10
         print(f"正在爬取第 {page + 1} 页 (pn={pn})...")
         
-        params = {
+        return {
             "rtt": "1",
             "bsst": "1",
             "cl": "2",
@@ -55,112 +70,82 @@ def crawl_baidu_news(keyword, max_count=20, max_pages=5):
             "pn": str(pn)
         }
 
-        try:
-            response = requests.get(base_url, params=params, headers=headers)
-            response.encoding = 'utf-8'
-            
-            if response.status_code != 200:
-                print(f"Request failed with status code: {response.status_code}")
-                break
+    def fetch_page(page):
+        return get_fetcher().get(base_url, params=page_params(page), headers=headers, cancel=pages.closed)
 
-            # 保存HTML文件以便调试
-            with open(f'debug_baidu_page_{page}.html', 'w', encoding='utf-8') as f:
-                f.write(response.text)
+    def stream_page(page):
+        with get_fetcher().stream(base_url, params=page_params(page), headers=headers) as resp:
+            if resp.status_code != 200:
+                print(f"Request failed with status code: {resp.status_code}")
+                return
+            # 本页还在下载时就开始预取后续页
+            pages.start(page + 1)
+            yield from iter_baidu_results(resp.iter_content(CHUNK_SIZE), resp.headers.get('Content-Type'))
+
+    # 解析、推送当前页的同时预取下一页
+    pages = PagePrefetcher(fetch_page, max_pages, lookahead=prefetch)
+    try:
+        while count < max_count and page < max_pages:
+            known.new_page()
+            try:
+                if incremental and page == 0:
+                    news_items = stream_page(page)
+                else:
+                    response = pages.get(page)
+                
+                    if response.status_code != 200:
+                        print(f"Request failed with status code: {response.status_code}")
+                        break
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 查找所有的新闻结果容器
-            # 尝试不同的选择器以适应百度可能的页面结构变化
-            news_items = soup.select('.result-op.c-container')
-            
-            if not news_items:
-                print("No news items found with primary selector. Trying fallback...")
-                news_items = soup.select('.result')
-            
-            if not news_items:
-                print(f"第 {page + 1} 页未找到任何数据，停止爬取。")
-                break
+                    # 调试抓包改用 fetcher 的录制功能 (CRAWLER_RECORD_DIR)，不再每页同步写文件
 
-            for item in news_items:
-                try:
-                    # 标题
-                    title_elem = item.select_one('h3 a')
-                    title = title_elem.get_text(strip=True) if title_elem else "无标题"
-                    original_url = title_elem['href'] if title_elem else ""
-                    
+                    news_items = run_parse(parse_baidu_page, response.content)
+
+                if resolver:
+                    news_items = resolver.resolve_items(news_items)
+            
+                found = False
+                for news_data in news_items:
+                    found = True
                     # 去重
-                    if original_url in seen_urls:
+                    if news_data['url'] in seen_urls:
                         continue
-                    
+                
                     # 标题去重，避免因为百度链接不同但内容相同导致重复
-                    if title in seen_titles:
+                    if news_data['title'] in seen_titles:
                         continue
-                        
-                    seen_urls.add(original_url)
-                    seen_titles.add(title)
-
-                    def _pick_src(e):
-                        for k in ['src','data-src','data-ori','data-original','data-thumb','data-lazyload']:
-                            v = e.get(k)
-                            if v and v.strip():
-                                return v.strip()
-                        return ''
-                    def _cover_from_item(it):
-                        candidates = [
-                            it.select_one('.c-img'),
-                            it.select_one('.img_1gB26'),
-                            it.select_one('img.c-img'),
-                            it.select_one('img')
-                        ]
-                        for e in candidates:
-                            if e:
-                                s = _pick_src(e)
-                                if s:
-                                    return s
-                        return ''
-                    cover_url = _cover_from_item(item)
-                    # Skip deep cover extraction for speed in streaming mode
-                    # if not cover_url and original_url:
-                    #     # Deep cover extraction logic removed to improve response speed
-                    #     pass
-                    
-                    # 来源
-                    source_elem = item.select_one('.c-color-gray')
-                    if not source_elem:
-                        source_elem = item.select_one('.c-color-gray2') # 备选来源选择器
-                    if not source_elem:
-                        source_elem = item.select_one('.source_1Vdff') # 百度资讯新版结构
-                    source = source_elem.get_text(strip=True) if source_elem else "未知来源"
                     
-                    news_data = {
-                        "title": title,
-                        "cover": cover_url,
-                        "url": original_url,
-                        "source": source
-                    }
+                    seen_urls.add(news_data['url'])
+                    seen_titles.add(news_data['title'])
+
+                    if known.is_known(news_data['url'], news_data.get('original_url')):
+                        continue
+
                     yield news_data
                     count += 1
-                    
+                
                     if count >= max_count:
                         break
-                    
-                except Exception as e:
-                    print(f"Error parsing item: {e}")
-                    continue
             
-            if count >= max_count:
-                break
+                if not found:
+                    print(f"第 {page + 1} 页未找到任何数据，停止爬取。")
+                    break
 
-            page += 1
-            # 随机延时，避免被封
-            time.sleep(random.uniform(1, 2))
-            
-        except Exception as e:
-            print(f"Crawler error on page {page}: {e}")
-            break
+                if count >= max_count:
+                    break
+
+                if known.exhausted:
+                    print(f"第 {page + 1} 页 {known.known}/{known.total} 条已入库，停止翻页。")
+                    break
 
-import json
-from lxml import etree
+                page += 1
+                # 翻页节奏由 fetcher 的按主机限速器控制
+            
+            except Exception as e:
+                print(f"Crawler error on page {page}: {e}")
+                break
+    finally:
+        pages.close()
 
 def collect_content_by_rule(url, title_xpath, content_xpath, headers_str, timeout=15):
     """
@@ -171,65 +156,40 @@ def collect_content_by_rule(url, title_xpath, content_xpath, headers_str, timeou
     :param headers_str: JSON字符串形式的headers
     :return: (title, content) 如果失败则返回None
     """
+    return collect_content_by_plan(url, RulePlan(title_xpath, content_xpath, headers_str), timeout=timeout)
+
+def collect_content_by_plan(url, plan, timeout=15):
+    """
+    使用已编译的规则 (RulePlan) 爬取详细内容，XPath 不再逐次解析
+    :return: (title, content) 如果失败则返回None
+    """
     try:
-        headers = {}
-        if headers_str:
-            try:
-                headers = json.loads(headers_str)
-            except:
-                pass
-        
-        if not headers:
-             headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            }
-            
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        resp.encoding = resp.apparent_encoding or 'utf-8'
-        
+        if plan.error:
+            raise plan.error
+
+        resp = get_fetcher().get(url, headers=plan.headers, timeout=timeout, cache=True, max_bytes=MAX_BODY_BYTES, html_only=True)
         if resp.status_code != 200:
             return None
-            
-        html = etree.HTML(resp.text)
-        if html is None:
-            return None
-            
-        title = ""
-        content = ""
-        
-        if title_xpath:
-            t_nodes = html.xpath(title_xpath)
-            if t_nodes:
-                # lxml returns list of elements or strings
-                if isinstance(t_nodes[0], str):
-                    title = t_nodes[0].strip()
-                elif hasattr(t_nodes[0], 'text'):
-                    title = "".join([n.xpath('string(.)') for n in t_nodes]).strip()
-                else:
-                    title = str(t_nodes[0]).strip()
-
-        if content_xpath:
-            c_nodes = html.xpath(content_xpath)
-            if c_nodes:
-                # Aggregate content from all matched nodes
-                parts = []
-                for node in c_nodes:
-                    if isinstance(node, str):
-                        parts.append(node.strip())
-                    elif hasattr(node, 'xpath'):
-                        # Use string(.) to get all text within the node
-                        parts.append(node.xpath('string(.)').strip())
-                    else:
-                        parts.append(str(node).strip())
-                content = "\n".join([p for p in parts if p])
-                
-        return title, content
+
+        return run_parse(extract_by_rule, resp.content, resp.headers.get('Content-Type'), plan.title_xpath, plan.content_xpath)
     except Exception as e:
         print(f"Rule crawl error: {e}")
         return None
 
+def extract_by_rule(body, content_type, title_xpath, content_xpath):
+    """
+    按规则 XPath 从页面原始字节中提取 (可在解析进程中执行)
+    :return: (title, content)，页面为空时返回 None
+    """
+    html = parse_html(decode_body(body, content_type)[0])
+    if html is None:
+        return None
+    return RulePlan(title_xpath, content_xpath, None).extract(html)
+
 import re
 
+TAG_RE = re.compile(r'<[^>]+>')
+
 def deep_collect_content(url, timeout=10):
     """
     深度采集指定URL的内容 (Optimized Version)
@@ -242,15 +202,26 @@ def deep_collect_content(url, timeout=10):
     except Exception:
         return ""
 
-try:
-    from curl_cffi import requests as curl_requests
-    HAS_CURL_CFFI = True
-except ImportError:
-    HAS_CURL_CFFI = False
-
-def generic_extract(url, timeout=10):
+def deep_collect_with_rule(url, rule=None):
+    """
+    先按采集规则提取正文，失败或无规则时回退到通用提取
+    :param url: 目标URL
+    :param rule: RulePlan (见 tools.crawl_plan.get_rule_plan) 或 None
+    :return: 正文内容，失败返回空字符串
+    """
+    content = None
+    if rule:
+        res = collect_content_by_plan(url, rule)
+        if res:
+            _, content = res
+    if not content:
+        content = deep_collect_content(url)
+    return content or ""
+
+def generic_extract(url, timeout=10, max_bytes=MAX_BODY_BYTES):
     """
     通用提取器：提取标题、正文、封面、来源
+    :param max_bytes: 正文下载上限，非网页 (PDF、图片、压缩包等) 或超出上限的响应提前中止
     :return: dict
     """
     try:
@@ -263,131 +234,170 @@ def generic_extract(url, timeout=10):
         }
         
         host = urllib.parse.urlparse(url).netloc
+        fetcher = get_fetcher()
         
         # Special handling for baijiahao using curl_cffi if available
         if 'baijiahao.baidu.com' in host and HAS_CURL_CFFI:
              try:
                  print(f"DEBUG: Using curl_cffi for {url}")
-                 resp = curl_requests.get(
+                 resp = fetcher.get(
                      url, 
                      impersonate="chrome124",
                      headers={
                         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
                      },
-                     timeout=timeout
+                     timeout=timeout,
+                     cache=True,
+                     max_bytes=max_bytes,
+                     html_only=True
                  )
+             except ContentRejected:
+                 raise
              except Exception as e:
                  print(f"curl_cffi failed, falling back to requests: {e}")
-                 resp = requests.get(url, timeout=timeout, headers=headers)
+                 resp = fetcher.get(url, timeout=timeout, headers=headers, cache=True, max_bytes=max_bytes, html_only=True)
         else:
-             resp = requests.get(url, timeout=timeout, headers=headers)
-        
-        # Encoding detection improvement
-        if hasattr(resp, 'apparent_encoding'):
-            encoding = resp.apparent_encoding
-            if 'charset=gb2312' in resp.text.lower() or 'charset=gbk' in resp.text.lower():
-                 encoding = 'gb18030'
-            resp.encoding = encoding or 'utf-8'
-        elif hasattr(resp, 'encoding') and hasattr(resp, 'charset'):
-             # For curl_cffi, it might not have apparent_encoding but has charset
-             if 'charset=gb2312' in resp.text.lower() or 'charset=gbk' in resp.text.lower():
-                 resp.encoding = 'gb18030'
+             resp = fetcher.get(url, timeout=timeout, headers=headers, cache=True, max_bytes=max_bytes, html_only=True)
         
         if resp.status_code != 200:
             return {}
 
-        soup = BeautifulSoup(resp.text, 'html.parser')
+        # 同站已学到的正文选择器优先尝试；档案库出错不影响提取
+        store = get_profile_store()
+        learned = []
+        if store:
+            try:
+                learned = store.learned(host)
+            except Exception as e:
+                print(f"Profile lookup failed for {host}: {e}")
+
+        # HTML 解析在解析进程池中进行，不占用当前线程的 GIL
+        data = run_parse(extract_article, resp.content, resp.headers.get('Content-Type'), url, learned)
+        profile = data.pop('profile', None)
+        if store:
+            try:
+                store.record(host, learned, profile)
+            except Exception as e:
+                print(f"Profile record failed for {host}: {e}")
+        return data
+    except Exception as e:
+        print(f"Generic extract error: {e}")
+        return {}
+
+
+def extract_article(body, content_type, url, learned=None):
+    """
+    从详情页原始字节中提取标题与正文 (可在解析进程中执行)
+    :param learned: 该站点已学到的正文 CSS 选择器，优先于候选列表与密度扫描
+    :return: dict，profile 为取到正文的选择器 (供站点档案学习)
+    """
+    # 按 BOM / 响应头 / meta charset 解码一次，GB2312/GBK 按 GB18030 处理
+    soup = make_soup(decode_body(body, content_type)[0])
         
-        # 1. Clean up: remove script, style, etc.
-        # But be careful, some sites (like baijiahao) might have content in scripts (e.g. JSON) if dynamic
-        # For now, we keep script removal but maybe parse JSON if needed.
-        for tag in soup(['script', 'style', 'iframe', 'noscript', 'header', 'footer', 'nav', 'meta', 'link']):
-            tag.decompose()
-            
-        # 2. Extract Title
-        title = ""
-        h1 = soup.find('h1')
-        if h1:
-            title = h1.get_text(strip=True)
-        if not title:
-            title = soup.title.get_text(strip=True) if soup.title else ""
-            
-        # 3. Extract Content (Density based + Selectors)
-        content = ""
+    # 1. Clean up: remove script, style, etc.
+    # But be careful, some sites (like baijiahao) might have content in scripts (e.g. JSON) if dynamic
+    # For now, we keep script removal but maybe parse JSON if needed.
+    for tag in soup(['script', 'style', 'iframe', 'noscript', 'header', 'footer', 'nav', 'meta', 'link']):
+        tag.decompose()
         
-        # Specific domain logic (simplified)
-        host = urllib.parse.urlparse(url).netloc
-        candidates = []
-        if 'baijiahao.baidu.com' in host:
-            # Baijiahao often has content in specific classes
-            candidates = [
-                '.index-module_articleWrap_2Zphx', # New class often seen
-                '.article-content', 
-                '.content', 
-                '#article', 
-                'article',
-                'div[class*="article-content"]',
-                'div[class*="index-module_article"]'
-            ]
-        elif 'mp.weixin.qq.com' in host:
-             candidates = ['#js_content', '.rich_media_content']
-        else:
-            candidates = ['article', '#content', '.content', '.article', '.post', '.entry-content', '.news-content', '.main-content', '.detail-content']
-            
+    # 2. Extract Title
+    title = ""
+    title_xpath = "//h1"
+    h1 = soup.find('h1')
+    if h1:
+        title = h1.get_text(strip=True)
+    if not title:
+        title = soup.title.get_text(strip=True) if soup.title else ""
+        title_xpath = "//title"
+        
+    # 3. Extract Content (Density based + Selectors)
+    content = ""
+    
+    # Specific domain logic (simplified)
+    host = urllib.parse.urlparse(url).netloc
+    candidates = []
+    if 'baijiahao.baidu.com' in host:
+        # Baijiahao often has content in specific classes
+        candidates = [
+            '.index-module_articleWrap_2Zphx', # New class often seen
+            '.article-content', 
+            '.content', 
+            '#article', 
+            'article',
+            'div[class*="article-content"]',
+            'div[class*="index-module_article"]'
+        ]
+    elif 'mp.weixin.qq.com' in host:
+         candidates = ['#js_content', '.rich_media_content']
+    else:
+        candidates = ['article', '#content', '.content', '.article', '.post', '.entry-content', '.news-content', '.main-content', '.detail-content']
+        
+    winner = None
+    for css in learned or ():
+        elem = soup.select_one(css)
+        if elem:
+            text = elem.get_text("\n", strip=True)
+            if len(text) > 100:
+                content = text
+                winner = {'css': css, 'method': 'learned'}
+                break
+
+    if not winner:
         for sel in candidates:
             elem = soup.select_one(sel)
             if elem:
                 content = elem.get_text("\n", strip=True)
                 if len(content) > 100:
+                    winner = {'elem': elem, 'method': 'candidate'}
                     break
+    
+    # Fallback: Density Analysis
+    if not content or len(content) < 50:
+        # Find the block element with the most text (link text < 50%), scored in one bottom-up pass
+        best_elem = find_densest_block(soup)
         
-        # Fallback: Density Analysis
-        if not content or len(content) < 50:
-            # Find the block element with the most text
-            max_len = 0
-            best_elem = None
-            for tag in soup.find_all(['div', 'section', 'td', 'li']):
-                # Simple heuristic: text length minus tag overhead
-                txt = tag.get_text(strip=True)
-                if len(txt) > max_len:
-                    # Check link density
-                    links = tag.find_all('a')
-                    link_text_len = sum([len(a.get_text(strip=True)) for a in links])
-                    if len(txt) > 0 and (link_text_len / len(txt)) < 0.5: # Less than 50% link text
-                        max_len = len(txt)
-                        best_elem = tag
-            
-            if best_elem:
-                content = best_elem.get_text("\n", strip=True)
-
-        # 4. Clean content
-        # Remove common noise
-        lines = [line.strip() for line in content.split('\n') if line.strip()]
-        content = "\n".join(lines)
-        
-        # Invalid content keywords filter
-        invalid_keywords = [
-            "403 Forbidden", "404 Not Found", "访问受限", "验证码", 
-            "JavaScript is required", "Please turn on JavaScript",
-            "Browser not supported", "浏览器版本过低"
-        ]
-        if any(kw in content[:200] for kw in invalid_keywords):
-            content = ""
+        if best_elem:
+            content = best_elem.get_text("\n", strip=True)
+            if len(content) > 100:
+                winner = {'elem': best_elem, 'method': 'density'}
+
+    profile = None
+    if winner and 'elem' in winner:
+        sel = element_selector(winner['elem'])
+        if sel:
+            profile = {'css': sel[0], 'xpath': sel[1], 'title_xpath': title_xpath, 'method': winner['method']}
+    elif winner:
+        profile = dict(winner, title_xpath=title_xpath)
+
+    # 4. Clean content
+    # Remove common noise
+    lines = [line.strip() for line in content.split('\n') if line.strip()]
+    content = "\n".join(lines)
+    
+    # Invalid content keywords filter
+    invalid_keywords = [
+        "403 Forbidden", "404 Not Found", "访问受限", "验证码", 
+        "JavaScript is required", "Please turn on JavaScript",
+        "Browser not supported", "浏览器版本过低"
+    ]
+    if any(kw in content[:200] for kw in invalid_keywords):
+        content = ""
+        profile = None
 
-        return {
-            "title": title,
-            "content": content[:5000], # Limit length
-            "url": url
-        }
-    except Exception as e:
-        print(f"Generic extract error: {e}")
-        return {}
+    return {
+        "title": title,
+        "content": content[:5000], # Limit length
+        "url": url,
+        "profile": profile
+    }
 
 
-def crawl_xinhua_sc_news(max_count=20):
+def crawl_xinhua_sc_news(max_count=20, covers=None, seen=None):
     """
     爬取新华网四川新闻页，返回与百度新闻一致的数据结构 (Generator Version)
     数据源: http://sc.news.cn/scyw.htm
+    :param covers: CoverBatch，列表项没有图片时交给它后台进详情页找封面，条目先以 cover_pending 产出
+    :param seen: 已入库 URL 集合 (SeenFilter)；传入时跳过已入库的条目
     yield: Dict，每项包含 title, cover, url, source
     """
     base_url = "http://sc.news.cn/scyw.htm"
@@ -395,13 +405,13 @@ def crawl_xinhua_sc_news(max_count=20):
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
     }
     count = 0
-    seen = set()
+    seen_urls = set()
+    known = PageSeenCounter(seen)
     try:
-        r = requests.get(base_url, headers=headers, timeout=10)
-        r.encoding = r.apparent_encoding or 'utf-8'
+        r = get_fetcher().get(base_url, headers=headers, timeout=10)
         if r.status_code != 200:
             return
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = make_soup(decode_html(r))
 
         def pick_src(e):
             for k in ['src','data-src','data-ori','data-original','data-thumb','data-lazyload']:
@@ -410,56 +420,6 @@ def crawl_xinhua_sc_news(max_count=20):
                     return v.strip()
             return ''
 
-        def extract_cover_from_page(url):
-            try:
-                rr = requests.get(url, headers=headers, timeout=8)
-                rr.encoding = rr.apparent_encoding or 'utf-8'
-                if rr.status_code != 200:
-                    return ''
-                sp = BeautifulSoup(rr.text, 'html.parser')
-                metas = [
-                    sp.find('meta', attrs={'property':'og:image'}),
-                    sp.find('meta', attrs={'name':'og:image'}),
-                    sp.find('meta', attrs={'property':'twitter:image'}),
-                    sp.find('meta', attrs={'name':'twitter:image'})
-                ]
-                for m in metas:
-                    if m:
-                        c = (m.get('content') or '').strip()
-                        if c:
-                            return urllib.parse.urljoin(url, c)
-                l = sp.find('link', rel='image_src')
-                if l:
-                    h = (l.get('href') or '').strip()
-                    if h:
-                        return urllib.parse.urljoin(url, h)
-                # 尝试从可能的样式背景图中提取
-                bg_candidates = sp.select('.pic, .image, .cover, .thumb, .poster')
-                for bg in bg_candidates:
-                    style = (bg.get('style') or '')
-                    if 'background-image' in style:
-                        import re
-                        m = re.search(r"url\(['\"]?(.*?)['\"]?\)", style)
-                        if m and m.group(1):
-                            return urllib.parse.urljoin(url, m.group(1))
-                # 兜底：扫描脚本中的图片链接
-                import re
-                for sc in sp.find_all('script'):
-                    txt = sc.string or sc.text or ''
-                    if not txt:
-                        continue
-                    m = re.search(r"https?://[^\s'\"]+\.(?:jpg|jpeg|png|gif|webp)", txt, re.IGNORECASE)
-                    if m:
-                        return urllib.parse.urljoin(url, m.group(0))
-                ig = sp.select_one('article img') or sp.select_one('.article img') or sp.select_one('.content img') or sp.select_one('.news-content img') or sp.find('img')
-                if ig:
-                    s = pick_src(ig)
-                    if s:
-                        return urllib.parse.urljoin(url, s)
-                return ''
-            except Exception:
-                return ''
-
         # 主要与备用选择器，尽量适配常见新华列表结构
         item_selectors = [
             'div.dataList li',
@@ -490,9 +450,11 @@ def crawl_xinhua_sc_news(max_count=20):
             if not href or not title:
                 continue
             url = urllib.parse.urljoin(base_url, href)
-            if url in seen:
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            if known.is_known(url):
                 continue
-            seen.add(url)
 
             # 提取封面
             cover = ''
@@ -501,13 +463,15 @@ def crawl_xinhua_sc_news(max_count=20):
                 s = pick_src(img)
                 if s:
                     cover = urllib.parse.urljoin(base_url, s)
+            pending = False
             if not cover:
-                cover = extract_cover_from_page(url)
-            # 针对部分新华子域名提供兜底封面
-            if not cover:
+                # 针对部分新华子域名提供兜底封面
+                default = ''
                 host = urllib.parse.urlparse(url).netloc
                 if 'app.xinhuanet.com' in host or 'xinhuaxmt.com' in host:
-                    cover = 'https://lib.news.cn/common/sharelogo.jpg'
+                    default = 'https://lib.news.cn/common/sharelogo.jpg'
+                cover = resolve_cover(covers, url, headers=headers, default=default)
+                pending = cover is None
 
             # 来源固定标注为新华网（四川）或页面来源文本
             source = '新华网'
@@ -517,12 +481,15 @@ def crawl_xinhua_sc_news(max_count=20):
                 if st:
                     source = st
 
-            yield {
+            item = {
                 'title': title,
-                'cover': cover,
+                'cover': cover or '',
                 'url': url,
                 'source': source
             }
+            if pending:
+                item['cover_pending'] = True
+            yield item
             count += 1
             if count >= max_count:
                 break
@@ -530,231 +497,267 @@ def crawl_xinhua_sc_news(max_count=20):
     except Exception:
         pass
 
-def crawl_generic(config, keyword, max_count=20, max_pages=5):
+def parse_generic_item(plan, item, url, default_source):
+    """
+    按编译好的选择器解析单个列表项 (Tag 或 JS 变量中的 dict)
+    :return: {title, cover, url, source}，没有链接时返回 None
+    """
+    title = "无标题"
+    link = ""
+    cover = ""
+    source = default_source
+
+    if isinstance(item, dict):
+        # Dictionary item (from JS/JSON)
+        if plan.title_key and plan.title_key in item:
+            t_val = item.get(plan.title_key)
+            if isinstance(t_val, list):
+                t_val = "".join([str(x) for x in t_val])
+            title = str(t_val) if t_val else "无标题"
+            # Remove HTML tags from title if present
+            title = TAG_RE.sub('', title)
+
+        if plan.url_key and plan.url_key in item:
+            link = item.get(plan.url_key, "")
+            if link and not link.startswith('http'):
+                link = urllib.parse.urljoin(url, link)
+
+        if plan.cover_key and plan.cover_key in item:
+            cover = item.get(plan.cover_key, "")
+            if cover and not cover.startswith('http'):
+                cover = urllib.parse.urljoin(url, cover)
+
+        # Handle cover_selector with pipe for dict items
+        if not cover and plan.cover_pipe_key:
+            key = plan.cover_pipe_key
+            if key in item:
+                cover = item.get(key, "")
+                if cover and not cover.startswith('http'):
+                    cover = urllib.parse.urljoin(url, cover)
+
+        # Source handling for dict
+        if plan.fixed_source is not None:
+            source = plan.fixed_source
+        elif plan.source_key and plan.source_key in item:
+            source = item.get(plan.source_key, source)
+    else:
+        # BeautifulSoup Tag item
+        if plan.title_css is not None:
+            t_el = plan.title_css.select_one(item)
+            if t_el:
+                title = t_el.get_text(strip=True)
+
+        if plan.url_css is not None:
+            u_el = plan.url_css.select_one(item)
+            if u_el:
+                link = u_el.get(plan.url_attr)
+                if link and not link.startswith('http'):
+                    link = urllib.parse.urljoin(url, link)
+
+        if plan.cover_css is not None:
+            c_el = plan.cover_css.select_one(item)
+            if c_el:
+                for k in ['src', 'data-src', 'data-original']:
+                    v = c_el.get(k)
+                    if v:
+                        cover = v
+                        break
+                if cover and not cover.startswith('http'):
+                    cover = urllib.parse.urljoin(url, cover)
+
+        if plan.fixed_source is not None:
+            source = plan.fixed_source
+        elif plan.source_css is not None:
+            s_el = plan.source_css.select_one(item)
+            if s_el:
+                source = s_el.get_text(strip=True)
+
+    if not link:
+        return None
+    return {
+        "title": title,
+        "cover": cover,
+        "url": link,
+        "source": source
+    }
+
+def parse_generic_page(body, content_type, config, url):
+    """
+    解析通用爬虫的列表页 (可在解析进程中执行)
+    :param body: 页面原始字节
+    :param config: CrawlerConfig 字典
+    :param url: 页面地址，用于补全相对链接
+    :return: [{title, cover, url, source}]，未去重、已去掉无链接的项；页面上找不到列表项时返回 None
+    """
+    plan = get_crawler_plan(config)
+    if plan.error:
+        print(f"Generic crawler selector error ({config.get('name')}): {plan.error}")
+        return None
+    page_text, _ = decode_body(body, content_type)
+    soup = make_soup(page_text)
+
+    items = plan.list_items(soup, page_text)
+    if not items:
+        return None
+
+    results = []
+    for item in items:
+        try:
+            it = parse_generic_item(plan, item, url, config.get('name'))
+            if it:
+                results.append(it)
+        except Exception as e:
+            print(f"Generic crawler parse item error: {e}")
+            continue
+    return results
+
+def iter_generic_results(chunks, content_type, config, url):
+    """
+    增量解析通用爬虫的列表页：列表项一闭合就产出 (仅支持简单的 list_selector)
+    :param chunks: 正文字节块迭代器
+    """
+    plan = get_crawler_plan(config)
+    if plan.error:
+        print(f"Generic crawler selector error ({config.get('name')}): {plan.error}")
+        return
+    parser = IncrementalListParser(plan.list_match, content_type)
+
+    def parse(elements):
+        for el in elements:
+            try:
+                it = parse_generic_item(plan, element_to_tag(el), url, config.get('name'))
+                if it:
+                    yield it
+            except Exception as e:
+                print(f"Generic crawler parse item error: {e}")
+
+    for chunk in chunks:
+        yield from parse(parser.feed(chunk))
+    rest, _ = parser.close()
+    yield from parse(rest)
+
+def crawl_generic(config, keyword, max_count=20, max_pages=5, prefetch=PREFETCH_PAGES, incremental=INCREMENTAL_PARSE, covers=None, seen=None):
     """
     通用爬虫执行器
     :param config: CrawlerConfig 字典
     :param keyword: 搜索关键字
     :param max_count: 最大数量
     :param max_pages: 最大页数
+    :param prefetch: 列表页预取深度，0 为串行抓取
+    :param incremental: list_selector 为简单选择器时，第 1 页边下载边解析
+    :param covers: CoverBatch，|deep: 封面交给它后台解析，条目先以 cover_pending 产出；不传时同步解析
+    :param seen: 已入库 URL 集合 (SeenFilter)；传入时为增量采集，跳过已入库的条目，一页大部分已入库即停止翻页
     """
-    # 替换参数中的变量
-    base_url = config.get('base_url')
-    params_tpl = config.get('params_json')
-    headers_tpl = config.get('headers_json')
-    method = config.get('method', 'GET')
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-    }
-    if headers_tpl:
-        try:
-            h_custom = json.loads(headers_tpl)
-            headers.update(h_custom)
-        except:
-            pass
-            
-    # 解析选择器
-    list_selector = config.get('list_selector')
-    title_selector = config.get('title_selector')
-    url_selector = config.get('url_selector')
-    cover_selector = config.get('cover_selector')
-    source_selector = config.get('source_selector')
+    # 请求头、参数模板与选择器按配置编译一次 (按 id + updated_at 缓存)，逐项只做求值
+    plan = get_crawler_plan(config)
+    if plan.error:
+        # 配置里的选择器写错了：记录后不产出任何条目，不中断调用方的推送流
+        print(f"Generic crawler selector error ({config.get('name')}): {plan.error}")
+        return
+    headers = plan.headers
     
     count = 0
     seen_urls = set()
     page = 0
-    
-    while count < max_count and page < max_pages:
+    known = PageSeenCounter(seen)
+
+    def request_args(page):
         # 构建请求参数
         params = {}
-        if params_tpl:
-            try:
-                # 简单替换 {keyword}, {page}
-                p_str = params_tpl.replace('{keyword}', keyword).replace('{page}', str(page+1)).replace('{page0}', str(page))
-                params = json.loads(p_str)
-            except Exception as e:
-                print(f"Params parse error: {e}")
-                pass
-        
-        # 处理URL中的占位符
-        url = base_url.replace('{keyword}', urllib.parse.quote(keyword)).replace('{page}', str(page+1))
-        
         try:
-            print(f"Generic crawl: {url} page={page}")
-            if method.upper() == 'POST':
-                resp = requests.post(url, data=params, headers=headers, timeout=10)
-            else:
-                resp = requests.get(url, params=params, headers=headers, timeout=10)
-                
-            resp.encoding = resp.apparent_encoding or 'utf-8'
-            
+            params = plan.params(keyword, page)
+        except Exception as e:
+            print(f"Params parse error: {e}")
+        
+        url = plan.page_url(keyword, page)
+        print(f"Generic crawl: {url} page={page}")
+        if plan.method == 'POST':
+            return url, {'data': params, 'method': 'POST'}
+        return url, {'params': params}
+
+    def fetch_page(page):
+        url, kwargs = request_args(page)
+        if kwargs.pop('method', None) == 'POST':
+            return get_fetcher().post(url, headers=headers, timeout=10, cancel=pages.closed, **kwargs)
+        return get_fetcher().get(url, headers=headers, timeout=10, cancel=pages.closed, **kwargs)
+
+    def stream_page(page):
+        url, kwargs = request_args(page)
+        with get_fetcher().stream(url, headers=headers, timeout=10, **kwargs) as resp:
             if resp.status_code != 200:
                 print(f"Status code: {resp.status_code}")
-                break
+                return
+            # 本页还在下载时就开始预取后续页
+            pages.start(page + 1)
+            yield from iter_generic_results(resp.iter_content(CHUNK_SIZE), resp.headers.get('Content-Type'), config, url)
 
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            items = []
-            if list_selector:
-                if list_selector.startswith('js_var:'):
-                    # Handle JavaScript variable extraction
-                    var_name = list_selector.split('js_var:')[1].strip()
-                    pattern = r'var\s+' + re.escape(var_name) + r'\s*=\s*(\[.*?\]);'
-                    match = re.search(pattern, resp.text, re.DOTALL)
-                    if match:
-                        try:
-                            json_str = match.group(1)
-                            items = json.loads(json_str)
-                        except json.JSONDecodeError as e:
-                            print(f"JSON parse error for var {var_name}: {e}")
-                    else:
-                        print(f"Variable {var_name} not found in response")
+    # 解析、推送当前页的同时预取下一页
+    pages = PagePrefetcher(fetch_page, max_pages, lookahead=prefetch)
+    try:
+        while count < max_count and page < max_pages:
+            known.new_page()
+            url = plan.page_url(keyword, page)
+            try:
+                streamed = incremental and page == 0 and plan.list_match is not None
+                if streamed:
+                    items = stream_page(page)
                 else:
-                    items = soup.select(list_selector)
-            else:
-                # 简单兜底
-                items = soup.find_all('div', class_=re.compile(r'item|list|news|article'))
-                
-            if not items:
-                print("No items found")
-                break
+                    resp = pages.get(page)
                 
-            for item in items:
-                try:
-                    title = "无标题"
-                    link = ""
-                    cover = ""
-                    source = config.get('name')
+                    if resp.status_code != 200:
+                        print(f"Status code: {resp.status_code}")
+                        break
+
+                    items = run_parse(parse_generic_page, resp.content, resp.headers.get('Content-Type'), config, url)
                     
-                    if isinstance(item, dict):
-                        # Dictionary item (from JS/JSON)
-                        if title_selector and title_selector in item:
-                            t_val = item.get(title_selector)
-                            if isinstance(t_val, list):
-                                t_val = "".join([str(x) for x in t_val])
-                            title = str(t_val) if t_val else "无标题"
-                            # Remove HTML tags from title if present
-                            title = re.sub(r'<[^>]+>', '', title)
-                        
-                        if url_selector and url_selector in item:
-                            link = item.get(url_selector, "")
-                            if link and not link.startswith('http'):
-                                link = urllib.parse.urljoin(url, link)
-                        
-                        if cover_selector and cover_selector in item:
-                            cover = item.get(cover_selector, "")
-                            if cover and not cover.startswith('http'):
-                                cover = urllib.parse.urljoin(url, cover)
-                        
-                        # Handle cover_selector with pipe for dict items
-                        if not cover and cover_selector and '|' in cover_selector:
-                            key = cover_selector.split('|')[0].strip()
-                            if key in item:
-                                cover = item.get(key, "")
-                                if cover and not cover.startswith('http'):
-                                    cover = urllib.parse.urljoin(url, cover)
-                        
-                        # Source handling for dict
-                        if source_selector:
-                            if source_selector.startswith('fixed:'):
-                                source = source_selector.split('fixed:')[1]
-                            elif source_selector in item:
-                                source = item.get(source_selector, source)
-                    else:
-                        # BeautifulSoup Tag item
-                        if title_selector:
-                            t_el = item.select_one(title_selector)
-                            if t_el:
-                                title = t_el.get_text(strip=True)
-                                
-                        if url_selector:
-                            attr = 'href'
-                            sel = url_selector
-                            if ' (' in url_selector and url_selector.endswith(')'):
-                                parts = url_selector.split(' (')
-                                sel = parts[0]
-                                attr = parts[1][:-1]
-                                
-                            u_el = item.select_one(sel)
-                            if u_el:
-                                link = u_el.get(attr)
-                                if link and not link.startswith('http'):
-                                    link = urllib.parse.urljoin(url, link)
-                        
-                        if cover_selector:
-                            c_el = item.select_one(cover_selector)
-                            if c_el:
-                                for k in ['src', 'data-src', 'data-original']:
-                                    v = c_el.get(k)
-                                    if v:
-                                        cover = v
-                                        break
-                                if cover and not cover.startswith('http'):
-                                    cover = urllib.parse.urljoin(url, cover)
-                                    
-                        if source_selector:
-                            s_el = item.select_one(source_selector)
-                            if s_el:
-                                source = s_el.get_text(strip=True)
-
-                    if not link or link in seen_urls:
+                    if items is None:
+                        print("No items found")
+                        break
+                
+                found = False
+                for it in items:
+                    found = True
+                    link = it['url']
+                    if link in seen_urls:
                         continue
                     seen_urls.add(link)
-                    
+                    if known.is_known(link, it.get('original_url')):
+                        continue
+                
                     # Deep cover extraction logic
-                    if not cover and cover_selector and '|deep:' in cover_selector and link:
-                        try:
-                            deep_sel = cover_selector.split('|deep:')[1].strip()
-                            # Fetch detail page
-                            headers_deep = headers.copy()
-                            headers_deep['Referer'] = url
-                            resp_deep = requests.get(link, headers=headers_deep, timeout=8)
-                            if resp_deep.status_code == 200:
-                                resp_deep.encoding = resp_deep.apparent_encoding or 'utf-8'
-                                soup_deep = BeautifulSoup(resp_deep.text, 'html.parser')
-                                imgs = soup_deep.select(deep_sel)
-                                for img in imgs:
-                                    src = ""
-                                    for k in ['src', 'data-src', 'data-original']:
-                                        v = img.get(k)
-                                        if v and v.strip():
-                                            src = v.strip()
-                                            break
-                                    if src:
-                                        # Filter out small icons or common placeholder patterns if needed
-                                        if 'sharelogo' in src or 'favicon' in src:
-                                            continue
-                                        if not src.startswith('http'):
-                                            src = urllib.parse.urljoin(link, src)
-                                        cover = src
-                                        break
-                        except Exception as e:
-                            print(f"Deep cover extraction error for {link}: {e}")
-
-                    yield {
-                        "title": title,
-                        "cover": cover,
-                        "url": link,
-                        "source": source
-                    }
-                    
+                    if not it['cover'] and plan.deep_cover_selector:
+                        headers_deep = headers.copy()
+                        headers_deep['Referer'] = url
+                        cover = resolve_cover(covers, link, headers=headers_deep, deep_css=plan.deep_cover_selector)
+                        if cover is None:
+                            it['cover_pending'] = True
+                        else:
+                            it['cover'] = cover
+
+                    yield it
+                
                     count += 1
                     if count >= max_count:
                         break
-                except Exception as e:
-                    print(f"Generic crawler parse item error: {e}")
-                    continue
+                
+                if streamed and not found:
+                    print("No items found")
+                    break
                     
-            if count >= max_count:
-                break
+                if count >= max_count:
+                    break
+
+                if known.exhausted:
+                    print(f"Page {page + 1}: {known.known}/{known.total} items already stored, stopping")
+                    break
                 
-            page += 1
-            time.sleep(random.uniform(1, 2))
+                page += 1
             
-        except Exception as e:
-            print(f"Generic crawler page error: {e}")
-            break
+            except Exception as e:
+                print(f"Generic crawler page error: {e}")
+                break
+    finally:
+        pages.close()
 
 if __name__ == "__main__":
     keyword = "西昌"
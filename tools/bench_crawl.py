@@ -0,0 +1,126 @@
+"""
+离线基准：回放录制的 HTTP 流量，测量 抓取 -> 解析 -> 入库 全链路耗时
+
+录制 (真实访问网络):
+    CRAWLER_RECORD_DIR=captures python run.py
+
+回放:
+    python -m tools.bench_crawl --replay captures/capture-xxx.jsonl.gz --source baidu --keyword 成都 --deep --save
+    python -m tools.bench_crawl --from-html debug_baidu.html --keyword 成都 --profile
+"""
+import argparse
+import cProfile
+import pstats
+import time
+
+from tools.baidu_crawler import crawl_baidu_news, crawl_xinhua_sc_news, crawl_generic, generic_extract
+from tools.capture import ReplayTransport
+from tools.fetcher import get_fetcher
+
+
+def baidu_search_params(keyword, page=0):
+    # 与 crawl_baidu_news 中的请求参数保持一致
+    return {
+        "rtt": "1",
+        "bsst": "1",
+        "cl": "2",
+        "tn": "news",
+        "rsv_dl": "ns_pc",
+        "word": keyword,
+        "pn": str(page * 10)
+    }
+
+
+def build_transport(args):
+    transport = ReplayTransport(args.replay or [])
+    # 已保存的百度结果页按顺序作为第 1, 2, ... 页
+    for page, path in enumerate(args.from_html or []):
+        with open(path, 'rb') as f:
+            transport.add('GET', 'https://www.baidu.com/s', f.read(), params=baidu_search_params(args.keyword, page))
+    return transport
+
+
+def run_crawl(args):
+    if args.source == 'baidu':
+        return list(crawl_baidu_news(args.keyword, max_count=args.count, max_pages=args.pages))
+    if args.source == 'xinhua':
+        return list(crawl_xinhua_sc_news(max_count=args.count))
+    from app import create_app, db
+    from app.models import CrawlerConfig
+    app = create_app()
+    with app.app_context():
+        c = db.session.get(CrawlerConfig, int(args.source))
+        config = {k: getattr(c, k) for k in ('id', 'updated_at', 'name', 'base_url', 'method', 'params_json', 'headers_json',
+                                            'list_selector', 'title_selector', 'url_selector',
+                                            'cover_selector', 'source_selector')}
+    return list(crawl_generic(config, args.keyword, max_count=args.count, max_pages=args.pages))
+
+
+def run_save(items, keyword):
+    # 使用内存数据库走一遍真实的 /collector/save 路由
+    from app import create_app, db
+    from config import Config
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        LOGIN_DISABLED = True
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        resp = app.test_client().post('/collector/save', json={'items': items, 'keyword': keyword})
+        return resp.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回放录制流量，离线测量采集链路耗时')
+    parser.add_argument('--replay', nargs='*', help='录制文件 (capture-*.jsonl.gz)')
+    parser.add_argument('--from-html', nargs='*', help='已保存的百度结果页 HTML，按页序排列')
+    parser.add_argument('--source', default='baidu', help='baidu / xinhua / CrawlerConfig id')
+    parser.add_argument('--keyword', default='')
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--deep', action='store_true', help='对每条结果做通用正文提取')
+    parser.add_argument('--save', action='store_true', help='结果写入内存数据库')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--profile', action='store_true', help='输出 cProfile 前 30 项')
+    args = parser.parse_args()
+
+    transport = build_transport(args)
+    print(f"Loaded {len(transport)} recorded responses")
+    fetcher = get_fetcher()
+
+    profiler = cProfile.Profile() if args.profile else None
+    timings = {'crawl': 0.0, 'deep': 0.0, 'save': 0.0}
+    items = []
+    for _ in range(args.repeat):
+        fetcher.use_replay(build_transport(args))
+        if profiler:
+            profiler.enable()
+        t = time.perf_counter()
+        items = run_crawl(args)
+        timings['crawl'] += time.perf_counter() - t
+        if args.deep:
+            t = time.perf_counter()
+            for it in items:
+                data = generic_extract(it['url'])
+                it['deep_content'] = data.get('content', '')
+                it['deep_collected'] = bool(it['deep_content'])
+            timings['deep'] += time.perf_counter() - t
+        if args.save:
+            t = time.perf_counter()
+            run_save(items, args.keyword)
+            timings['save'] += time.perf_counter() - t
+        if profiler:
+            profiler.disable()
+
+    print(f"items: {len(items)}  repeat: {args.repeat}")
+    for stage, total in timings.items():
+        if total:
+            print(f"{stage:>6}: {total / args.repeat * 1000:.1f} ms/run")
+    if profiler:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(30)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+正文密度提取基准：对比逐块 get_text() 的旧算法与单遍自底向上打分，
+在深层嵌套页面上旧算法耗时随深度平方增长，新算法线性增长
+
+    python -m tools.bench_density
+    python -m tools.bench_density --depths 200 400 800 1600 3200 --files debug_baidu.html
+
+两种算法选出的块不同时以非零状态退出
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from tools.content_density import find_densest_block
+from tools.parser_engine import make_soup
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def legacy_densest_block(soup):
+    # generic_extract 原有实现，仅作对照
+    max_len = 0
+    best_elem = None
+    for tag in soup.find_all(['div', 'section', 'td', 'li']):
+        txt = tag.get_text(strip=True)
+        if len(txt) > max_len:
+            links = tag.find_all('a')
+            link_text_len = sum([len(a.get_text(strip=True)) for a in links])
+            if len(txt) > 0 and (link_text_len / len(txt)) < 0.5:
+                max_len = len(txt)
+                best_elem = tag
+    return best_elem
+
+
+def nested_page(depth):
+    """
+    政府门户式的病态页面：逐层嵌套的 div/td，每层都带一段正文和一组导航链接
+    """
+    parts = ['<html><head><title>nested</title></head><body>']
+    for i in range(depth):
+        tag = 'td' if i % 5 == 4 else 'div'
+        if tag == 'td':
+            parts.append('<table><tr><td>')
+        else:
+            parts.append(f'<div class="level-{i}">')
+        parts.append(f'<p>第{i}层正文内容，政务公开信息发布。</p>')
+        parts.append('<ul>' + ''.join(f'<li><a href="/n/{i}/{j}">栏目链接{j}</a></li>' for j in range(3)) + '</ul>')
+    for i in reversed(range(depth)):
+        parts.append('</td></tr></table>' if i % 5 == 4 else '</div>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def timed(func, soup, repeat):
+    best = None
+    t = time.perf_counter()
+    for _ in range(repeat):
+        best = func(soup)
+    return best, (time.perf_counter() - t) / repeat
+
+
+def describe(tag):
+    if tag is None:
+        return 'None'
+    return f"<{tag.name} class={tag.get('class')}> @{tag.sourceline}"
+
+
+def compare(name, html, repeat, legacy=True):
+    soup = make_soup(html)
+    new_best, new_t = timed(find_densest_block, soup, repeat)
+    line = f"{name:>28}: single-pass {new_t * 1000:9.1f} ms"
+    if not legacy:
+        print(line)
+        return 0
+    old_best, old_t = timed(legacy_densest_block, soup, repeat)
+    same = old_best is new_best
+    print(f"{line}   legacy {old_t * 1000:9.1f} ms   x{old_t / new_t:6.1f}   {'same' if same else 'DIFFERENT'}")
+    if not same:
+        print(f"    legacy: {describe(old_best)}\n    single: {describe(new_best)}")
+    return 0 if same else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='正文密度提取基准')
+    parser.add_argument('--depths', type=int, nargs='*', default=[100, 200, 400, 800])
+    parser.add_argument('--files', nargs='*', help='额外对比的真实页面，默认 debug_baidu*.html')
+    parser.add_argument('--legacy-limit', type=int, default=1600, help='深度超过该值时不再运行旧算法')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    failures = 0
+    paths = args.files if args.files is not None else sorted(glob.glob(os.path.join(basedir, 'debug_baidu*.html')))
+    for p in paths:
+        with open(p, 'r', encoding='utf-8', errors='replace') as f:
+            failures += compare(os.path.basename(p), f.read(), args.repeat)
+    for depth in args.depths:
+        failures += compare(f"nested depth {depth}", nested_page(depth), args.repeat, legacy=depth <= args.legacy_limit)
+
+    print("\nselection: " + ("OK" if not failures else f"{failures} mismatches"))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+数据仓库列表分页基准：OFFSET 分页与键集 (游标) 分页在不同翻页深度的耗时，以及 COUNT 与缓存总数
+
+    python -m tools.bench_pagination                      # 100万条，临时 SQLite 库
+    python -m tools.bench_pagination --rows 200000 --depths 1 100 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from config import Config
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据仓库列表分页基准')
+    parser.add_argument('--rows', type=int, default=1000000, help='条目数')
+    parser.add_argument('--size', type=int, default=20, help='每页条数')
+    parser.add_argument('--depths', type=int, nargs='*', default=[1, 100, 1000, 10000, 49000], help='页码')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数 (取中位数)')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.models import CollectionItem
+    from app.pagination import keyset_page, encode_cursor, cached_count, newest_first
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            t = time.perf_counter()
+            start = datetime(2024, 1, 1)
+            for base in range(0, args.rows, 50000):
+                db.session.execute(insert(CollectionItem), [
+                    {'title': f'条目 {i}', 'url': f'https://bench.local/{i}', 'url_hash': f'{i:040x}',
+                     'keyword': 'bench', 'created_at': start + timedelta(seconds=i // 3)}
+                    for i in range(base, min(args.rows, base + 50000))
+                ])
+            db.session.commit()
+            print(f"{args.rows} rows loaded in {time.perf_counter() - t:.0f}s, page size {args.size}")
+
+            print(f"{'page':>7} {'offset':>10} {'cursor':>10}")
+            for page in args.depths:
+                if (page - 1) * args.size >= args.rows:
+                    continue
+                # 游标取上一页最后一条 (不计时)
+                cursor = None
+                if page > 1:
+                    prev = newest_first(CollectionItem.query, CollectionItem) \
+                        .offset((page - 1) * args.size - 1).limit(1).one()
+                    cursor = encode_cursor(prev.created_at, prev.id)
+                offset_ms = timed(lambda: keyset_page(CollectionItem.query, CollectionItem, args.size, page=page), args.repeat)
+                cursor_ms = timed(lambda: keyset_page(CollectionItem.query, CollectionItem, args.size, cursor=cursor), args.repeat)
+                print(f"{page:>7} {offset_ms:8.1f}ms {cursor_ms:8.1f}ms")
+
+            count_ms = timed(lambda: CollectionItem.query.count(), args.repeat)
+            cached_count(('bench',), lambda: CollectionItem.query.count())
+            cached_ms = timed(lambda: cached_count(('bench',), lambda: CollectionItem.query.count()), args.repeat)
+            print(f"COUNT(*) {count_ms:.1f}ms, cached total {cached_ms:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
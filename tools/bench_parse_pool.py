@@ -0,0 +1,60 @@
+"""
+解析进程池吞吐基准：多个线程并发提取详情页，对比本进程解析与进程池解析
+
+    python -m tools.bench_parse_pool                       # 默认使用 debug_baidu*.html
+    python -m tools.bench_parse_pool --threads 8 --workers 1 2 4 --pages 64
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tools import parse_pool
+from tools.baidu_crawler import extract_article
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def run(bodies, threads):
+    def one(body):
+        return parse_pool.run_parse(extract_article, body, 'text/html; charset=utf-8', 'http://bench.local/')
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        results = list(ex.map(one, bodies))
+    return time.perf_counter() - t, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析进程池吞吐基准')
+    parser.add_argument('files', nargs='*', help='详情页 HTML，默认 debug_baidu*.html')
+    parser.add_argument('--threads', type=int, default=8, help='并发提取的线程数 (模拟 Flask/采集线程)')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4], help='进程池大小，逐个测试')
+    parser.add_argument('--pages', type=int, default=48, help='提取的页面总数')
+    args = parser.parse_args()
+
+    paths = args.files or sorted(glob.glob(os.path.join(basedir, 'debug_baidu*.html')))
+    pages = []
+    for p in paths:
+        with open(p, 'rb') as f:
+            pages.append(f.read())
+    bodies = [pages[i % len(pages)] for i in range(args.pages)]
+    print(f"{len(bodies)} pages, {args.threads} threads, cpu_count={os.cpu_count()}")
+
+    parse_pool.PARSE_WORKERS = 0
+    base_t, expected = run(bodies, args.threads)
+    print(f"in-process : {base_t:6.2f}s  {len(bodies) / base_t:6.1f} pages/s")
+
+    parse_pool.PARSE_INLINE_BYTES = 0
+    for workers in args.workers:
+        parse_pool.shutdown()
+        parse_pool.PARSE_WORKERS = workers
+        run(bodies[:workers], workers)  # 预热：子进程启动与模块导入不计入
+        t, results = run(bodies, args.threads)
+        same = 'same' if results == expected else 'DIFFERENT'
+        print(f"workers={workers:<3}: {t:6.2f}s  {len(bodies) / t:6.1f} pages/s  x{base_t / t:4.1f}  {same}")
+    parse_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
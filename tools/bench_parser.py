@@ -0,0 +1,97 @@
+"""
+解析引擎一致性检查与吞吐基准：lxml 与 bs4 (html.parser) 对同一批页面必须产出相同的结果
+
+    python -m tools.bench_parser                      # 默认使用仓库里的 debug_baidu*.html
+    python -m tools.bench_parser page1.html page2.html --repeat 20
+
+不一致时打印差异并以非零状态退出，切换默认引擎前先跑一遍
+逐字段的一致性测试 (含增量解析、截断与边界情况) 见 tests/test_parser_parity.py
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from tools import parse_pool, parser_engine
+from tools.baidu_crawler import generic_extract
+from tools.capture import ReplayTransport
+from tools.fetcher import get_fetcher
+from tools.parser_engine import ENGINES, parse_baidu_results
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def detail_url(path):
+    return 'http://bench.local/' + os.path.basename(path)
+
+
+def run_generic(paths, engine):
+    # 把页面当作详情页走一遍 generic_extract
+    parser_engine.PARSER_ENGINE = engine
+    return [generic_extract(detail_url(p)) for p in paths]
+
+
+def diff(name, a, b):
+    if a == b:
+        return 0
+    print(f"MISMATCH {name}")
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        for i, (x, y) in enumerate(zip(a, b)):
+            if x != y:
+                print(f"  [{i}] {ENGINES[0]}: {x}\n  [{i}] {ENGINES[1]}: {y}")
+    else:
+        print(f"  {ENGINES[0]}: {a}\n  {ENGINES[1]}: {b}")
+    return 1
+
+
+def timed(func, repeat):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - t) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析引擎一致性检查与吞吐基准')
+    parser.add_argument('files', nargs='*', help='百度资讯结果页 HTML，默认 debug_baidu*.html')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    # 引擎切换只对本进程生效，对比时不走解析进程池
+    parse_pool.PARSE_WORKERS = 0
+    paths = args.files or sorted(glob.glob(os.path.join(basedir, 'debug_baidu*.html')))
+    if not paths:
+        print("no pages to check")
+        return 1
+    pages = {}
+    transport = ReplayTransport()
+    for p in paths:
+        with open(p, 'rb') as f:
+            body = f.read()
+        pages[p] = body.decode('utf-8', 'replace')
+        transport.add('GET', detail_url(p), body)
+    get_fetcher().use_replay(transport)
+
+    failures = 0
+    for p, html in pages.items():
+        results = [parse_baidu_results(html, engine) for engine in ENGINES]
+        failures += diff(f"baidu results {os.path.basename(p)}", *results)
+        print(f"{os.path.basename(p)}: {len(results[0])} items")
+    failures += diff("generic_extract", *[run_generic(paths, engine) for engine in ENGINES])
+
+    total_bytes = sum(len(h.encode('utf-8')) for h in pages.values())
+    print(f"\n{len(pages)} pages, {total_bytes / 1024:.0f} KB, repeat {args.repeat}")
+    for engine in ENGINES:
+        list_t = timed(lambda: [parse_baidu_results(h, engine) for h in pages.values()], args.repeat)
+        detail_t = timed(lambda: run_generic(paths, engine), args.repeat)
+        print(f"{engine:>5}: list {list_t * 1000:7.1f} ms ({total_bytes / list_t / 1048576:5.1f} MB/s)"
+              f"   detail {detail_t * 1000:7.1f} ms ({total_bytes / detail_t / 1048576:5.1f} MB/s)")
+    parser_engine.PARSER_ENGINE = os.environ.get('CRAWLER_PARSER_ENGINE', 'lxml')
+
+    print("\nparity: " + ("OK" if not failures else f"{failures} mismatches"))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
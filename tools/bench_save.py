@@ -0,0 +1,117 @@
+"""
+采集结果入库吞吐基准：逐条 ORM 入库 (旧的 /collector/save) 与按块批量入库 (app/ingest.py) 对比
+
+    python -m tools.bench_save                        # 1k、10k 条，临时 SQLite 库
+    python -m tools.bench_save --sizes 500 5000 --existing 0.5 --deep 0.3
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from config import Config
+
+
+def make_items(n, seed=0, deep_ratio=0.2):
+    rnd = random.Random(seed)
+    words = ['政务', '公开', '通知', '会议', '发展', '改革', '项目', '建设', '服务', '民生', '安全', '教育', '医疗', '交通']
+    items = []
+    for i in range(n):
+        title = ''.join(rnd.choice(words) for _ in range(6)) + f' 第{i}号'
+        item = {
+            'url': f'https://news{i % 50}.example.com/a/{i}.html?utm_source=bench',
+            'title': title,
+            'cover': f'https://img.example.com/{i}.jpg',
+            'source': f'来源{i % 20}',
+            'deep_collected': False
+        }
+        if rnd.random() < deep_ratio:
+            item['deep_collected'] = True
+            item['deep_content'] = title + '。' + ''.join(rnd.choice(words) for _ in range(120))
+        items.append(item)
+    return items
+
+
+def save_per_item(items, keyword):
+    """
+    旧的入库方式：逐条查询、逐条 index_item，最后一次提交
+    """
+    from app import db
+    from app.models import CollectionItem, DeepCollectionContent
+    from app.dedup import index_item
+    for item_data in items:
+        url = item_data.get('url')
+        it = CollectionItem.find_by_url(url)
+        if not it:
+            it = CollectionItem()
+            it.created_at = datetime.utcnow()
+            db.session.add(it)
+        it.keyword = keyword
+        it.title = item_data.get('title')
+        it.cover = item_data.get('cover')
+        it.url = url
+        it.source = item_data.get('source')
+        it.deep_collected = item_data.get('deep_collected', False)
+        it.updated_at = datetime.utcnow()
+        deep_content = item_data.get('deep_content')
+        if deep_content:
+            if it.deep_content_obj:
+                it.deep_content_obj.content = deep_content
+            else:
+                it.deep_content_obj = DeepCollectionContent(content=deep_content)
+        index_item(it)
+    db.session.commit()
+
+
+def run(name, save, items, existing, db_path):
+    from app import create_app, db
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        if existing:
+            save(items[:existing], 'seed')
+        db.session.expunge_all()
+        t = time.perf_counter()
+        save(items, 'bench')
+        elapsed = time.perf_counter() - t
+        db.session.remove()
+        db.engine.dispose()
+    print(f"{name:<9}: {len(items):>6} items  {elapsed:7.2f}s  {len(items) / elapsed:8.1f} items/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='采集结果入库吞吐基准')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000], help='每次提交的条目数')
+    parser.add_argument('--existing', type=float, default=0.3, help='已入库条目的比例 (走更新路径)')
+    parser.add_argument('--deep', type=float, default=0.2, help='带深度采集正文的比例')
+    parser.add_argument('--skip-per-item', action='store_true', help='只测批量入库')
+    args = parser.parse_args()
+
+    from app.ingest import save_items
+
+    def bulk(items, keyword):
+        save_items(items, keyword)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        for n in args.sizes:
+            items = make_items(n, deep_ratio=args.deep)
+            existing = int(n * args.existing)
+            print(f"-- {n} items, {existing} already stored, {args.deep:.0%} with deep content")
+            bulk_t = run('bulk', bulk, items, existing, db_path)
+            if not args.skip_per_item:
+                base_t = run('per-item', save_per_item, items, existing, db_path)
+                print(f"speedup  : x{base_t / bulk_t:.1f}")
+
+
+if __name__ == '__main__':
+    main()
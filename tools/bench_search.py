@@ -0,0 +1,83 @@
+"""
+全文检索延迟基准：索引逐步增长到 100 万条，测常见词、少见词、多词检索的耗时
+
+    python -m tools.bench_search                         # 1万、10万、100万条，临时 SQLite 库
+    python -m tools.bench_search --sizes 10000 200000 --repeat 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from config import Config
+from tools.search_text import index_text
+
+WORDS = ['政务', '公开', '通知', '会议', '发展', '改革', '项目', '建设', '服务', '民生', '安全', '教育', '医疗', '交通',
+         '乡村', '振兴', '生态', '环境', '招商', '引资', '营商', '数字', '经济', '文旅', '消费', '就业', '养老', '住房']
+RARE = ['量子计算', '熊猫基地', '川剧变脸']
+
+QUERIES = {
+    'common': '政务',
+    'phrase': '政务公开',
+    'multi': '教育 改革',
+    'single': '政',
+    'rare': '熊猫基地',
+}
+
+
+def make_doc(rnd, i):
+    title = ''.join(rnd.choice(WORDS) for _ in range(6))
+    content = ''.join(rnd.choice(WORDS) for _ in range(40))
+    if i % 997 == 0:
+        content += rnd.choice(RARE)
+    return {'id': i, 'title': index_text(title), 'content': index_text(content)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全文检索延迟基准')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10000, 100000, 1000000], help='索引条目数，逐级增长')
+    parser.add_argument('--repeat', type=int, default=10, help='每个检索重复次数 (取中位数)')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.search import rebuild_search_index, search_items
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            rebuild_search_index()
+            rnd = random.Random(0)
+            insert = text("INSERT INTO item_search(rowid, title, content) VALUES (:id, :title, :content)")
+            count = 0
+            print(f"{'rows':>9} " + ' '.join(f"{name:>14}" for name in QUERIES))
+            for size in sorted(args.sizes):
+                t = time.perf_counter()
+                while count < size:
+                    batch = [make_doc(rnd, i) for i in range(count + 1, min(size, count + 10000) + 1)]
+                    db.session.execute(insert, batch)
+                    count += len(batch)
+                db.session.commit()
+                load = time.perf_counter() - t
+
+                cells = []
+                for q in QUERIES.values():
+                    times = []
+                    for _ in range(args.repeat):
+                        t = time.perf_counter()
+                        total, hits = search_items(q, limit=20)
+                        times.append(time.perf_counter() - t)
+                    times.sort()
+                    cells.append(f"{times[len(times) // 2] * 1000:7.1f}ms/{total:<6}")
+                print(f"{count:>9} " + ' '.join(f"{c:>14}" for c in cells) + f"   (load {load:.0f}s)")
+        print("单元格：中位耗时 / 命中数 (命中数上限 SEARCH_MAX_HITS)")
+
+
+if __name__ == '__main__':
+    main()
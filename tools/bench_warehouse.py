@@ -0,0 +1,141 @@
+"""
+数据仓库列表与规则关联基准：整行 ORM 加载 (含正文全文) 与列投影 + 正文摘要的响应体积、耗时对比
+
+    python -m tools.bench_warehouse                       # 2万条，80% 带 2 万字正文，临时 SQLite 库
+    python -m tools.bench_warehouse --rows 5000 --content-chars 50000 --size 50
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import joinedload, undefer
+
+from config import Config
+
+
+def timed(func, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t)
+    times.sort()
+    return times[len(times) // 2] * 1000, result
+
+
+def list_full_rows(size):
+    """
+    旧的列表方式：整行加载条目、规则与正文，正文全文随列表返回
+    """
+    from app.models import CollectionItem, DeepCollectionContent
+    items = CollectionItem.query.options(
+        undefer(CollectionItem.deep_content),
+        joinedload(CollectionItem.rule),
+        joinedload(CollectionItem.deep_content_obj).undefer(DeepCollectionContent.content).undefer(DeepCollectionContent.minhash)
+    ).order_by(CollectionItem.created_at.desc(), CollectionItem.id.desc()).limit(size).all()
+    data = []
+    for it in items:
+        content = it.deep_content_obj.content if it.deep_content_obj and it.deep_content_obj.content else it.deep_content
+        data.append({'id': it.id, 'title': it.title, 'url': it.url, 'source': it.source,
+                     'rule_name': it.rule.name if it.rule else None, 'deep_content': content or '',
+                     'created_at': it.created_at.isoformat()})
+    return json.dumps({'items': data}).encode('utf-8')  # 与 jsonify 一致 (非 ASCII 字符转义)
+
+
+def associate_full_rows():
+    """
+    旧的规则关联方式：整行加载所有未关联条目 (含旧版正文字段)
+    """
+    from app import db
+    from app.models import CollectionItem, CrawlRule, match_rule
+    rules = CrawlRule.query.all()
+    for it in CollectionItem.query.options(undefer(CollectionItem.deep_content)).filter(CollectionItem.rule_id == None):
+        rule = match_rule(rules, it.url, it.source)
+        if rule:
+            it.rule_id = rule.id
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据仓库列表与规则关联基准')
+    parser.add_argument('--rows', type=int, default=20000, help='条目数')
+    parser.add_argument('--deep', type=float, default=0.8, help='带深度采集正文的比例')
+    parser.add_argument('--legacy', type=float, default=0.1, help='正文存在旧版字段 (collection_item.deep_content) 的比例')
+    parser.add_argument('--content-chars', type=int, default=20000, help='每条正文字数')
+    parser.add_argument('--size', type=int, default=20, help='每页条数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数 (取中位数)')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.models import CollectionItem, CrawlRule, DeepCollectionContent, Job
+    from app.jobs import enqueue_job, run_job
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+            LOGIN_DISABLED = True
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            rnd = random.Random(0)
+            body = ('政务公开通知正文' * (args.content_chars // 8 + 1))[:args.content_chars]
+            start = datetime(2024, 1, 1)
+            t = time.perf_counter()
+            db.session.add_all([CrawlRule(name=f'规则{i}', site=f'news{i}.example.com', match_type='domain') for i in range(20)])
+            for base in range(0, args.rows, 2000):
+                ids = range(base + 1, min(args.rows, base + 2000) + 1)
+                items, contents = [], []
+                for i in ids:
+                    roll = rnd.random()
+                    items.append({'id': i, 'title': f'条目 {i}', 'url': f'https://news{i % 40}.example.com/{i}',
+                                  'url_hash': f'{i:040x}', 'source': f'来源{i % 20}', 'keyword': 'bench',
+                                  'deep_collected': roll < args.deep + args.legacy,
+                                  'deep_content': body if args.deep <= roll < args.deep + args.legacy else None,
+                                  'created_at': start + timedelta(seconds=i)})
+                    if roll < args.deep:
+                        contents.append({'item_id': i, 'content': body, 'minhash': os.urandom(512)})
+                db.session.execute(insert(CollectionItem), items)
+                if contents:
+                    db.session.execute(insert(DeepCollectionContent), contents)
+            db.session.commit()
+            print(f"{args.rows} rows loaded in {time.perf_counter() - t:.0f}s, "
+                  f"{args.content_chars} chars per body, page size {args.size}")
+
+            client = app.test_client()
+            full_ms, full_body = timed(lambda: list_full_rows(args.size), args.repeat)
+            lean_ms, resp = timed(lambda: client.get(f'/warehouse/list?size={args.size}'), args.repeat)
+            item_id = resp.get_json()['items'][0]['id']
+            detail_ms, detail = timed(lambda: client.get(f'/warehouse/item/{item_id}'), args.repeat)
+            print(f"{'':<16} {'payload':>12} {'time':>10}")
+            print(f"{'list full rows':<16} {len(full_body):>10,}B {full_ms:8.1f}ms")
+            print(f"{'list projection':<16} {len(resp.data):>10,}B {lean_ms:8.1f}ms")
+            print(f"{'item detail':<16} {len(detail.data):>10,}B {detail_ms:8.1f}ms")
+            print(f"payload x{len(full_body) / len(resp.data):.0f} smaller")
+
+            def reset():
+                db.session.execute(update(CollectionItem).values(rule_id=None))
+                db.session.commit()
+                db.session.expunge_all()
+
+            reset()
+            t = time.perf_counter()
+            associate_full_rows()
+            full_assoc = time.perf_counter() - t
+            reset()
+            t = time.perf_counter()
+            run_job(enqueue_job('auto_associate', {}))
+            lean_assoc = time.perf_counter() - t
+            job = Job.query.order_by(Job.id.desc()).first()
+            print(f"auto_associate full rows {full_assoc:.2f}s, projection {lean_assoc:.2f}s "
+                  f"({json.loads(job.result_json)['associated']} associated)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import base64
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+# 录制/回放开关，可通过环境变量开启
+RECORD_DIR = os.environ.get('CRAWLER_RECORD_DIR')  # 录制目录，设置后所有真实请求写入 capture-*.jsonl.gz
+REPLAY_FILE = os.environ.get('CRAWLER_REPLAY')     # 回放文件，多个用逗号分隔
+
+# 正文已解压保存，回放时这些头不能原样带上
+_DROP_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length', 'connection')
+
+
+class ReplayMiss(requests.ConnectionError):
+    pass
+
+
+def request_key(method, url, params=None, data=None):
+    """
+    请求的唯一标识：方法 + 完整 URL (含查询参数) + 请求体
+    """
+    prepared = requests.Request(method.upper(), url, params=params, data=data).prepare()
+    body = prepared.body or ''
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    return f"{prepared.method} {prepared.url} {body}".rstrip()
+
+
+def build_response(url, status_code, headers, body):
+    resp = Response()
+    resp.status_code = status_code
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = body
+    resp._content_consumed = True  # 允许 iter_content() 按块读取已有正文
+    resp.url = url
+    resp.encoding = None
+    resp.reason = 'OK' if status_code == 200 else ''
+    return resp
+
+
+class Recorder:
+    """
+    后台录制器：请求线程只把响应放入队列，由后台线程压缩写盘，不阻塞抓取
+    """
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, time.strftime('capture-%Y%m%d-%H%M%S') + f'-{os.getpid()}.jsonl.gz')
+        self._queue = queue.Queue(maxsize=1000)
+        self._thread = threading.Thread(target=self._writer, name='capture-writer', daemon=True)
+        self._thread.start()
+        self.dropped = 0
+
+    def record(self, key, resp, elapsed):
+        entry = {
+            'key': key,
+            'url': resp.url,
+            'status_code': resp.status_code,
+            'headers': {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS},
+            'body': resp.content,
+            'elapsed': round(elapsed, 4),
+            'ts': time.time()
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # 宁可丢一条录制，也不拖慢抓取
+            self.dropped += 1
+
+    def _writer(self):
+        with gzip.open(self.path, 'at', encoding='utf-8') as f:
+            while True:
+                entry = self._queue.get()
+                if entry is None:
+                    break
+                entry['body'] = base64.b64encode(entry['body'] or b'').decode('ascii')
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+
+class ReplayTransport:
+    """
+    回放录制的请求/响应，不访问网络
+    同一请求录到多次时按顺序返回，用完后重复最后一次
+    """
+    def __init__(self, paths=None):
+        self._entries = defaultdict(list)
+        self._cursor = defaultdict(int)
+        self._lock = threading.Lock()
+        for path in paths or []:
+            self.load(path)
+
+    def load(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                e = json.loads(line)
+                e['body'] = base64.b64decode(e['body'])
+                self._entries[e['key']].append(e)
+
+    def add(self, method, url, body, status_code=200, headers=None, params=None, data=None):
+        """
+        手工加入一条回放记录 (例如由已保存的 HTML 构造)
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        key = request_key(method, url, params, data)
+        self._entries[key].append({
+            'key': key, 'url': url, 'status_code': status_code,
+            'headers': headers or {'Content-Type': 'text/html; charset=utf-8'}, 'body': body
+        })
+
+    def send(self, method, url, params=None, data=None):
+        key = request_key(method, url, params, data)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise ReplayMiss(f"no recorded response for {key}")
+            idx = min(self._cursor[key], len(entries) - 1)
+            self._cursor[key] += 1
+        e = entries[idx]
+        return build_response(e['url'], e['status_code'], e['headers'], e['body'])
+
+    def __len__(self):
+        return sum(len(v) for v in self._entries.values())
@@ -0,0 +1,112 @@
+import codecs
+import re
+
+try:
+    from charset_normalizer import from_bytes as _detect
+    HAS_DETECTOR = True
+except ImportError:
+    HAS_DETECTOR = False
+
+SNIFF_BYTES = 4096          # meta charset 只在前几 KB 里找
+DETECT_SAMPLE_BYTES = 64 * 1024  # 统计检测只看开头一段
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# GB2312/GBK 都是 GB18030 的子集，按声明解码常遇到生僻字乱码
+_ALIASES = {
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030',
+    'x-gbk': 'gb18030',
+    'gb_2312-80': 'gb18030',
+    'cp936': 'gb18030',
+    'utf8': 'utf-8',
+    'unicode': 'utf-8',
+    'big5': 'big5hkscs',
+}
+
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_XML_ENCODING = re.compile(rb'^<\?xml[^>]+encoding\s*=\s*["\']([\w.:-]+)', re.I)
+
+
+def normalize_encoding(name):
+    """
+    规范化编码名，无法识别时返回 None
+    """
+    if not name:
+        return None
+    if isinstance(name, bytes):
+        name = name.decode('ascii', 'ignore')
+    name = name.strip().lower()
+    name = _ALIASES.get(name, name)
+    try:
+        codecs.lookup(name)
+    except LookupError:
+        return None
+    return name
+
+
+def declared_encodings(content, content_type=None):
+    """
+    按优先级返回声明的编码：BOM > HTTP 头 > 页面开头的 meta charset / xml 声明
+    """
+    found = []
+    for bom, enc in _BOMS:
+        if content.startswith(bom):
+            found.append(enc)
+            break
+    if content_type:
+        m = _HEADER_CHARSET.search(content_type)
+        if m:
+            found.append(normalize_encoding(m.group(1)))
+    head = content[:SNIFF_BYTES]
+    m = _XML_ENCODING.search(head) or _META_CHARSET.search(head)
+    if m:
+        found.append(normalize_encoding(m.group(1)))
+    result = []
+    for enc in found:
+        if enc and enc not in result:
+            result.append(enc)
+    return result
+
+
+def decode_body(content, content_type=None):
+    """
+    将响应正文解码为文本，正常情况下只解码一次
+    依次尝试声明的编码与 UTF-8，都失败时才对开头一段做统计检测
+    :param content: 响应正文 bytes
+    :param content_type: 响应头 Content-Type
+    :return: (text, encoding)
+    """
+    if not content:
+        return '', 'utf-8'
+    candidates = declared_encodings(content, content_type)
+    if 'utf-8' not in candidates and 'utf-8-sig' not in candidates:
+        candidates.append('utf-8')
+    for enc in candidates:
+        try:
+            return content.decode(enc), enc
+        except (UnicodeDecodeError, LookupError):
+            continue
+    enc = None
+    if HAS_DETECTOR:
+        best = _detect(content[:DETECT_SAMPLE_BYTES]).best()
+        if best is not None:
+            enc = normalize_encoding(best.encoding)
+    # 中文站点里最常见的非 UTF-8 编码
+    enc = enc or 'gb18030'
+    return content.decode(enc, 'replace'), enc
+
+
+def decode_html(resp):
+    """
+    解码 requests / curl_cffi 的响应并回写 resp.encoding
+    :return: 文本
+    """
+    text, encoding = decode_body(resp.content, resp.headers.get('Content-Type'))
+    resp.encoding = encoding
+    return text
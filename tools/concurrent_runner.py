@@ -0,0 +1,87 @@
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class DomainLimitedRunner:
+    """
+    按域名限流的并发执行器
+    - 线程池大小有上限 (max_workers)
+    - 同一域名同时执行的任务数有上限 (per_domain)，不同域名之间并行
+    - 整体截止时间 (deadline 秒)，超时后不再派发新任务，未完成的任务记入 unfinished
+    - 等待结果期间每隔 tick 秒调用一次 on_tick (后台任务据此续租)
+    """
+    def __init__(self, max_workers=8, per_domain=2, deadline=None):
+        self.max_workers = max(1, int(max_workers))
+        self.per_domain = max(1, int(per_domain))
+        self.deadline = deadline
+        self.unfinished = []
+
+    def run(self, tasks, func, tick=None, on_tick=None):
+        """
+        :param tasks: 可迭代的 (key, url, args)，func(*args) 为实际执行的调用
+        :param func: 任务函数
+        :param tick: 没有结果返回时调用 on_tick 的间隔 (秒)
+        :param on_tick: 无参函数，在调用方线程执行，抛出的异常会终止执行
+        :yield: (key, result, error)，按完成顺序产出
+        """
+        queues = {}
+        for key, url, args in tasks:
+            domain = urllib.parse.urlparse(url or '').netloc.lower()
+            queues.setdefault(domain, deque()).append((key, args))
+
+        end_at = time.monotonic() + self.deadline if self.deadline else None
+        in_flight = {}        # future -> (key, domain)
+        domain_busy = {}      # domain -> running count
+        self.unfinished = []
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while queues or in_flight:
+                # 派发：轮询各域名，直到线程池占满或没有可派发的域名
+                if end_at is None or time.monotonic() < end_at:
+                    progressed = True
+                    while progressed and len(in_flight) < self.max_workers:
+                        progressed = False
+                        for domain in list(queues.keys()):
+                            if len(in_flight) >= self.max_workers:
+                                break
+                            if domain_busy.get(domain, 0) >= self.per_domain:
+                                continue
+                            key, args = queues[domain].popleft()
+                            if not queues[domain]:
+                                del queues[domain]
+                            fut = executor.submit(func, *args)
+                            in_flight[fut] = (key, domain)
+                            domain_busy[domain] = domain_busy.get(domain, 0) + 1
+                            progressed = True
+
+                if not in_flight:
+                    break
+
+                timeout = None
+                if end_at is not None:
+                    timeout = max(0, end_at - time.monotonic())
+                if on_tick and tick:
+                    timeout = tick if timeout is None else min(timeout, tick)
+                done, _ = wait(list(in_flight.keys()), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    if end_at is not None and time.monotonic() >= end_at:
+                        break  # 到达截止时间
+                    on_tick()
+                    continue
+
+                for fut in done:
+                    key, domain = in_flight.pop(fut)
+                    domain_busy[domain] -= 1
+                    try:
+                        yield key, fut.result(), None
+                    except Exception as e:
+                        yield key, None, e
+        finally:
+            self.unfinished = [k for k, _ in in_flight.values()]
+            for q in queues.values():
+                self.unfinished.extend(k for k, _ in q)
+            # 不等待超时仍在运行的任务，其结果将被丢弃
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,65 @@
+from bs4.element import CData, NavigableString, Tag
+
+BLOCK_TAGS = ('div', 'section', 'td', 'li')
+MAX_LINK_RATIO = 0.5  # 链接文字占比不低于该值的块视为导航/列表
+
+# 与 get_text() 计入的字符串类型一致 (不含注释、脚本等)
+_TEXT_TYPES = (NavigableString, CData)
+
+
+class BlockScore:
+    __slots__ = ('text_len', 'link_len', 'tags')
+
+    def __init__(self):
+        self.text_len = 0   # 去空白后的文字长度，等于 len(tag.get_text(strip=True))
+        self.link_len = 0   # 后代 <a> 的文字长度之和
+        self.tags = 0       # 后代标签数 (标签开销)
+
+    @property
+    def link_ratio(self):
+        return self.link_len / self.text_len if self.text_len else 0.0
+
+
+def block_scores(root):
+    """
+    一次自底向上遍历，算出每个标签的文字长度、链接文字长度与标签数
+    逆文档序处理时子节点总是先于父节点，累加到父节点即可，整体 O(n)
+    :return: ({id(tag): BlockScore}, 文档序的标签列表)
+    """
+    nodes = list(root.descendants)
+    scores = {id(root): BlockScore()}
+    tags = []
+    for node in nodes:
+        if isinstance(node, Tag):
+            scores[id(node)] = BlockScore()
+            tags.append(node)
+    for node in reversed(nodes):
+        parent = scores.get(id(node.parent))
+        if parent is None:
+            continue
+        if isinstance(node, Tag):
+            s = scores[id(node)]
+            parent.text_len += s.text_len
+            parent.link_len += s.link_len + (s.text_len if node.name == 'a' else 0)
+            parent.tags += s.tags + 1
+        elif type(node) in _TEXT_TYPES:
+            parent.text_len += len(node.strip())
+    return scores, tags
+
+
+def find_densest_block(root, names=BLOCK_TAGS, max_link_ratio=MAX_LINK_RATIO):
+    """
+    找出文字最多且链接占比低的块
+    与逐块 get_text()/find_all('a') 的旧算法选择结果相同 (长度相同时取文档中靠前者)
+    :return: Tag 或 None
+    """
+    scores, tags = block_scores(root)
+    best, max_len = None, 0
+    for tag in tags:
+        if tag.name not in names:
+            continue
+        s = scores[id(tag)]
+        if s.text_len > max_len and s.link_ratio < max_link_ratio:
+            max_len = s.text_len
+            best = tag
+    return best
@@ -0,0 +1,245 @@
+import os
+import re
+import threading
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+
+import soupsieve
+
+from tools.charset import decode_body
+from tools.fetcher import MAX_BODY_BYTES, get_fetcher
+from tools.parse_pool import run_parse
+from tools.parser_engine import COVER_ATTRS, make_soup
+
+COVER_WORKERS = int(os.environ.get('CRAWLER_COVER_WORKERS', 4))            # 并发解析封面的线程数
+COVER_CACHE_SIZE = int(os.environ.get('CRAWLER_COVER_CACHE_SIZE', 4096))   # URL → 封面 缓存条数
+COVER_TIMEOUT = float(os.environ.get('CRAWLER_COVER_TIMEOUT', 20))         # 列表采集结束后最多再等多久补封面 (秒)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+}
+
+_META_TAG = re.compile(r'<meta\b[^>]*>', re.IGNORECASE)
+_ATTR = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+_HEAD_END = re.compile(r'</head\s*>|<body\b', re.IGNORECASE)
+_META_KEYS = ('og:image', 'twitter:image')
+_BG_URL = re.compile(r"url\(['\"]?(.*?)['\"]?\)")
+_SCRIPT_IMG = re.compile(r"https?://[^\s'\"]+\.(?:jpg|jpeg|png|gif|webp)", re.IGNORECASE)
+
+
+def meta_cover(text):
+    """
+    快速路径：只用正则扫描 <head> 里的 og:image / twitter:image，不建树
+    :return: 图片地址 (未补全) 或空字符串
+    """
+    m = _HEAD_END.search(text)
+    head = text[:m.start()] if m else text
+    found = {}
+    for tag in _META_TAG.findall(head):
+        attrs = {k.lower(): (a or b or c) for k, a, b, c in _ATTR.findall(tag)}
+        key = (attrs.get('property') or attrs.get('name') or '').lower()
+        content = (attrs.get('content') or '').strip()
+        if key in _META_KEYS and content and key not in found:
+            found[key] = content
+    for key in _META_KEYS:
+        if key in found:
+            return found[key]
+    return ''
+
+
+def _pick_src(e, attrs=COVER_ATTRS):
+    for k in attrs:
+        v = e.get(k)
+        if v and v.strip():
+            return v.strip()
+    return ''
+
+
+def extract_page_cover(body, content_type, url, deep_css=None):
+    """
+    从详情页原始字节中找封面 (可在解析进程中执行)
+    :param deep_css: 采集配置里 |deep: 指定的选择器，优先于页面元信息；
+                     选择器没有命中时只再看 og:image 等元信息，不退到页面里的任意图片 (多为站点 logo、横幅)
+    :return: 绝对地址，找不到返回空字符串
+    """
+    text = decode_body(body, content_type)[0]
+
+    if deep_css:
+        soup = make_soup(text)
+        for img in soupsieve.select(deep_css, soup):
+            src = _pick_src(img, ('src', 'data-src', 'data-original'))
+            # 过滤分享图标、站点图标
+            if src and 'sharelogo' not in src and 'favicon' not in src:
+                return urllib.parse.urljoin(url, src)
+        cover = meta_cover(text)
+        return urllib.parse.urljoin(url, cover) if cover else ''
+
+    # 新华列表的兜底封面：元信息、image_src、背景图、脚本中的图片、正文第一张图
+    cover = meta_cover(text)
+    if cover:
+        return urllib.parse.urljoin(url, cover)
+
+    soup = make_soup(text)
+    l = soup.find('link', rel='image_src')
+    if l:
+        h = (l.get('href') or '').strip()
+        if h:
+            return urllib.parse.urljoin(url, h)
+    # 尝试从可能的样式背景图中提取
+    for bg in soup.select('.pic, .image, .cover, .thumb, .poster'):
+        style = (bg.get('style') or '')
+        if 'background-image' in style:
+            m = _BG_URL.search(style)
+            if m and m.group(1):
+                return urllib.parse.urljoin(url, m.group(1))
+    # 兜底：扫描脚本中的图片链接
+    for sc in soup.find_all('script'):
+        txt = sc.string or sc.text or ''
+        if not txt:
+            continue
+        m = _SCRIPT_IMG.search(txt)
+        if m:
+            return urllib.parse.urljoin(url, m.group(0))
+    ig = soup.select_one('article img') or soup.select_one('.article img') or soup.select_one('.content img') or soup.select_one('.news-content img') or soup.find('img')
+    if ig:
+        s = _pick_src(ig)
+        if s:
+            return urllib.parse.urljoin(url, s)
+    return ''
+
+
+class CoverResolver:
+    """
+    封面解析服务：列表采集不再逐条串行进详情页找图，而是交给有界线程池并发解析
+    - 结果按 (URL, 选择器) 缓存在内存 LRU 中，同一 URL 并发请求只抓取一次
+    - 详情页经共享 fetcher 抓取 (限速、HTTP 缓存)，稍后深度采集同一页面可直接命中缓存
+    """
+    def __init__(self, workers=COVER_WORKERS, cache_size=COVER_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='cover')
+
+    def cached(self, url, deep_css=None):
+        """
+        :return: 已解析的封面 (可能为空字符串)；未解析过返回 None
+        """
+        key = (url, deep_css)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _store(self, key, cover):
+        with self._lock:
+            self._cache[key] = cover
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _resolve(self, key, headers, default):
+        url, deep_css = key
+        try:
+            resp = get_fetcher().get(url, headers=headers or DEFAULT_HEADERS, timeout=8, cache=True,
+                                     max_bytes=MAX_BODY_BYTES, html_only=True)
+            if resp.status_code != 200:
+                return default
+            cover = run_parse(extract_page_cover, resp.content, resp.headers.get('Content-Type'), url, deep_css)
+            self._store(key, cover)
+            return cover or default
+        except Exception as e:
+            # 抓取失败不缓存，下次再试
+            print(f"Cover resolve error for {url}: {e}")
+            return default
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def submit(self, url, headers=None, deep_css=None, default=''):
+        """
+        后台解析封面
+        :param default: 找不到封面时的兜底值
+        :return: Future，结果为封面地址
+        """
+        key = (url, deep_css)
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = self._executor.submit(self._resolve, key, headers, default)
+                self._inflight[key] = fut
+        return fut
+
+    def resolve(self, url, headers=None, deep_css=None, default=''):
+        """
+        同步解析 (先查缓存)
+        """
+        hit = self.cached(url, deep_css)
+        if hit is not None:
+            return hit or default
+        return self.submit(url, headers, deep_css, default).result()
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_cover_resolver():
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = CoverResolver()
+        return _resolver
+
+
+class CoverBatch:
+    """
+    一次列表采集中待补的封面
+    列表爬虫把缺封面的条目登记进来后立即产出条目，调用方随后用 ready()/drain() 取回解析结果
+    """
+    def __init__(self, resolver=None):
+        self.resolver = resolver or get_cover_resolver()
+        self._pending = {}
+
+    def submit(self, key, url, headers=None, deep_css=None, default=''):
+        """
+        :param key: 条目标识 (列表中的链接)
+        :return: 已缓存时直接返回封面，否则返回 None (稍后由 ready/drain 给出)
+        """
+        hit = self.resolver.cached(url, deep_css)
+        if hit is not None:
+            return hit or default
+        self._pending[self.resolver.submit(url, headers, deep_css, default)] = key
+        return None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def ready(self):
+        """
+        不阻塞，取出已解析完的 [(key, cover)]
+        """
+        done = [f for f in self._pending if f.done()]
+        return [(self._pending.pop(f), f.result()) for f in done]
+
+    def drain(self, timeout=COVER_TIMEOUT):
+        """
+        按完成顺序产出剩余的 (key, cover)，超时后放弃等待
+        """
+        try:
+            for f in as_completed(list(self._pending), timeout=timeout):
+                yield self._pending.pop(f), f.result()
+        except FutureTimeout:
+            print(f"Cover resolve timed out, {len(self._pending)} pending")
+        self._pending.clear()
+
+
+def resolve_cover(covers, url, headers=None, deep_css=None, default=''):
+    """
+    列表爬虫取封面：传入 CoverBatch 时交给后台解析，返回 None 表示待补；否则同步解析
+    """
+    if covers is not None:
+        return covers.submit(url, url, headers, deep_css, default)
+    return get_cover_resolver().resolve(url, headers, deep_css, default)
@@ -0,0 +1,255 @@
+import json
+import re
+import threading
+import urllib.parse
+from functools import lru_cache
+
+import soupsieve
+from lxml import etree
+
+from tools.parser_engine import simple_selector
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+}
+# 未配置列表选择器时的兜底
+FALLBACK_LIST_CLASS = re.compile(r'item|list|news|article')
+
+_STRING_VALUE = etree.XPath('string(.)')
+
+# 编译结果按 (类型, id) 缓存，记录的 updated_at 变化即重新编译
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def _cached(kind, key, updated_at, build):
+    if key is None:
+        return build()
+    with _plans_lock:
+        hit = _plans.get((kind, key))
+    if hit is not None and hit[0] == updated_at:
+        return hit[1]
+    plan = build()
+    with _plans_lock:
+        _plans[(kind, key)] = (updated_at, plan)
+    return plan
+
+
+def clear_plans():
+    with _plans_lock:
+        _plans.clear()
+
+
+def parse_headers(headers_json, defaults=None):
+    headers = dict(defaults or {})
+    if headers_json:
+        try:
+            headers.update(json.loads(headers_json))
+        except Exception:
+            pass
+    return headers
+
+
+@lru_cache(maxsize=512)
+def compile_xpath(expr):
+    # 解析进程按表达式字符串缓存编译结果
+    return etree.XPath(expr)
+
+
+def _css(selector):
+    return soupsieve.compile(selector) if selector else None
+
+
+class RulePlan:
+    """
+    CrawlRule 的编译结果：预编译的标题/正文 XPath 与解析好的请求头
+    XPath 语法错误不在编译时抛出，留到采集时按规则失败处理 (回退通用提取)
+    """
+    def __init__(self, title_xpath, content_xpath, headers_json, rule_id=None):
+        self.rule_id = rule_id
+        self.title_xpath = title_xpath
+        self.content_xpath = content_xpath
+        self.error = None
+        self.title = self.content = None
+        try:
+            self.title = compile_xpath(title_xpath) if title_xpath else None
+            self.content = compile_xpath(content_xpath) if content_xpath else None
+        except etree.XPathSyntaxError as e:
+            self.error = e
+        self.headers = parse_headers(headers_json) or dict(DEFAULT_HEADERS)
+
+    def extract(self, html):
+        """
+        :param html: lxml 根节点
+        :return: (title, content)
+        """
+        title = ""
+        content = ""
+
+        if self.title is not None:
+            t_nodes = self.title(html)
+            if not isinstance(t_nodes, list):
+                # string()/count() 等表达式直接返回值
+                title = str(t_nodes).strip()
+            elif t_nodes:
+                # lxml returns list of elements or strings
+                if isinstance(t_nodes[0], str):
+                    title = t_nodes[0].strip()
+                elif hasattr(t_nodes[0], 'text'):
+                    title = "".join([_STRING_VALUE(n) for n in t_nodes]).strip()
+                else:
+                    title = str(t_nodes[0]).strip()
+
+        if self.content is not None:
+            c_nodes = self.content(html)
+            if not isinstance(c_nodes, list):
+                content = str(c_nodes).strip()
+            elif c_nodes:
+                # Aggregate content from all matched nodes
+                parts = []
+                for node in c_nodes:
+                    if isinstance(node, str):
+                        parts.append(node.strip())
+                    elif hasattr(node, 'xpath'):
+                        parts.append(_STRING_VALUE(node).strip())
+                    else:
+                        parts.append(str(node).strip())
+                content = "\n".join([p for p in parts if p])
+
+        return title, content
+
+
+def get_rule_plan(rule):
+    """
+    取 CrawlRule 的编译结果，按 id + updated_at 缓存
+    """
+    return _cached('rule', rule.id, rule.updated_at,
+                   lambda: RulePlan(rule.title_xpath, rule.content_xpath, rule.headers_json, rule_id=rule.id))
+
+
+class CrawlerPlan:
+    """
+    CrawlerConfig 的编译结果：请求头、参数模板、预编译的 CSS 选择器与各类特殊语法
+    - url_selector:   "sel (attr)" 取指定属性，默认 href
+    - cover_selector: "sel|deep:detail_sel" 列表项取不到时进详情页用 detail_sel 找
+    - source_selector: "fixed:名称" 固定来源
+    - list_selector:  "js_var:name" 从页面 JS 变量中读取 JSON 列表
+    CSS 选择器语法错误记在 error 上，不在编译时抛出 (同 RulePlan)
+    """
+    def __init__(self, config):
+        self.name = config.get('name')
+        self.base_url = config.get('base_url') or ''
+        self.method = (config.get('method') or 'GET').upper()
+        self.headers = parse_headers(config.get('headers_json'), DEFAULT_HEADERS)
+
+        self.params_tpl = config.get('params_json')
+        self.params_struct = None
+        if self.params_tpl:
+            try:
+                self.params_struct = json.loads(self.params_tpl)
+            except ValueError:
+                # 占位符不在引号里 (如 "pn": {page}) 时模板本身不是合法 JSON，只能逐页替换后再解析
+                self.params_struct = None
+
+        # 字典数据 (js_var) 按原始字段名取值
+        self.title_key = config.get('title_selector')
+        self.url_key = config.get('url_selector')
+        self.cover_key = config.get('cover_selector')
+        self.source_key = config.get('source_selector')
+
+        # 选择器语法错误不向外抛出，记在 error 上，由爬虫记录后跳过该配置
+        self.error = None
+        self.js_var = None
+        self.list_css = self.list_match = None
+        self.title_css = self.url_css = self.cover_css = self.source_css = None
+        self.url_attr = 'href'
+        self.cover_pipe_key = self.deep_cover_selector = self.deep_cover_css = None
+        self.fixed_source = None
+        try:
+            self._compile_selectors(config)
+        except soupsieve.SelectorSyntaxError as e:
+            self.error = e
+
+    def _compile_selectors(self, config):
+        list_selector = config.get('list_selector')
+        if list_selector and list_selector.startswith('js_var:'):
+            var_name = list_selector.split('js_var:')[1].strip()
+            self.js_var = var_name
+            self.js_var_pattern = re.compile(r'var\s+' + re.escape(var_name) + r'\s*=\s*(\[.*?\]);', re.DOTALL)
+        elif list_selector:
+            self.list_css = _css(list_selector)
+        # 简单选择器可用于增量解析 (见 parser_engine.IncrementalListParser)
+        self.list_match = simple_selector(list_selector) if self.list_css is not None else None
+
+        self.title_css = _css(self.title_key)
+
+        url_selector = self.url_key
+        if url_selector:
+            sel = url_selector
+            if ' (' in url_selector and url_selector.endswith(')'):
+                sel, attr = url_selector.split(' (', 1)
+                self.url_attr = attr[:-1]
+            self.url_css = _css(sel)
+
+        cover_selector = self.cover_key or ''
+        self.cover_pipe_key = cover_selector.split('|')[0].strip() if '|' in cover_selector else None
+        if '|deep:' in cover_selector:
+            self.deep_cover_selector = cover_selector.split('|deep:')[1].strip()
+            self.deep_cover_css = _css(self.deep_cover_selector)
+        self.cover_css = _css(cover_selector.split('|')[0].strip())
+
+        if self.source_key:
+            if self.source_key.startswith('fixed:'):
+                self.fixed_source = self.source_key.split('fixed:')[1]
+            else:
+                self.source_css = _css(self.source_key)
+
+    def page_url(self, keyword, page):
+        # 处理URL中的占位符
+        return self.base_url.replace('{keyword}', urllib.parse.quote(keyword)).replace('{page}', str(page + 1))
+
+    def params(self, keyword, page):
+        """
+        按模板生成第 page 页 (从 0 开始) 的请求参数
+        """
+        if not self.params_tpl:
+            return {}
+        if self.params_struct is None:
+            p_str = self.params_tpl.replace('{keyword}', keyword).replace('{page}', str(page + 1)).replace('{page0}', str(page))
+            return json.loads(p_str)
+
+        def fill(v):
+            if isinstance(v, str):
+                return v.replace('{keyword}', keyword).replace('{page}', str(page + 1)).replace('{page0}', str(page))
+            if isinstance(v, dict):
+                return {fill(k): fill(x) for k, x in v.items()}
+            if isinstance(v, list):
+                return [fill(x) for x in v]
+            return v
+        return fill(self.params_struct)
+
+    def list_items(self, soup, page_text):
+        """
+        :return: 列表项 (Tag 或 dict)
+        """
+        if self.js_var:
+            match = self.js_var_pattern.search(page_text)
+            if not match:
+                print(f"Variable {self.js_var} not found in response")
+                return []
+            try:
+                return json.loads(match.group(1))
+            except json.JSONDecodeError as e:
+                print(f"JSON parse error for var {self.js_var}: {e}")
+                return []
+        if self.list_css is not None:
+            return self.list_css.select(soup)
+        # 简单兜底
+        return soup.find_all('div', class_=FALLBACK_LIST_CLASS)
+
+
+def get_crawler_plan(config):
+    """
+    取 CrawlerConfig (字典形式) 的编译结果；带 id 与 updated_at 时缓存
+    """
+    return _cached('crawler', config.get('id'), config.get('updated_at'), lambda: CrawlerPlan(config))
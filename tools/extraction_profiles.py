@@ -0,0 +1,148 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+LEARN_PROFILES = os.environ.get('CRAWLER_LEARN_PROFILES', '1') == '1'
+PROFILE_DB = os.environ.get('CRAWLER_PROFILE_DB') or os.path.join(basedir, '.cache', 'profiles.sqlite')
+LEARN_MIN_HITS = int(os.environ.get('CRAWLER_LEARN_MIN_HITS', 3))          # 命中多少次后才优先使用
+LEARN_MIN_RATE = float(os.environ.get('CRAWLER_LEARN_MIN_RATE', 0.6))      # 最低命中率
+LEARN_MAX_SELECTORS = 3                                                    # 每个主机最多先试几个
+
+# id/class 里带长串数字的多半是逐页变化的 (post-12345)，不能作为站点级规则
+_VOLATILE = re.compile(r'\d{3,}')
+_IDENT = re.compile(r'^[A-Za-z_][\w-]*$')
+
+
+def element_selector(el):
+    """
+    为正文所在元素生成站点级选择器
+    :param el: bs4 Tag
+    :return: (css, xpath)；没有稳定的 id/class 且不是 article 等语义标签时返回 None
+    """
+    tag = el.name
+    el_id = el.get('id')
+    if el_id and _IDENT.match(el_id) and not _VOLATILE.search(el_id):
+        return f"{tag}#{el_id}", f"//{tag}[@id='{el_id}']"
+    classes = [c for c in (el.get('class') or []) if _IDENT.match(c) and not _VOLATILE.search(c)]
+    if classes:
+        css = tag + ''.join('.' + c for c in classes)
+        cond = ' and '.join(f"contains(concat(' ', normalize-space(@class), ' '), ' {c} ')" for c in classes)
+        return css, f"//{tag}[{cond}]"
+    if tag in ('article', 'main'):
+        return tag, f"//{tag}"
+    return None
+
+
+class ProfileStore:
+    """
+    按主机记录正文选择器的命中情况 (SQLite)
+    - generic_extract 每处理一页，记录本次先试过的已学选择器与最终取到正文的选择器
+    - 命中次数与命中率达标的选择器，下次同站页面优先使用，跳过候选列表与密度扫描
+    - 可提升为 CrawlRule (content_xpath)
+    """
+    def __init__(self, path=PROFILE_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        with self._db() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                "host TEXT, css TEXT, xpath TEXT, title_xpath TEXT, method TEXT, "
+                "attempts INTEGER, hits INTEGER, last_hit REAL, PRIMARY KEY (host, css))"
+            )
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = conn
+        return conn
+
+    def learned(self, host):
+        """
+        该主机上达标的选择器，按命中率排序
+        :return: [css]
+        """
+        rows = self._db().execute(
+            "SELECT css FROM profiles WHERE host = ? AND hits >= ? AND hits >= attempts * ? "
+            "ORDER BY CAST(hits AS REAL) / attempts DESC, hits DESC LIMIT ?",
+            (host, LEARN_MIN_HITS, LEARN_MIN_RATE, LEARN_MAX_SELECTORS)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def record(self, host, tried, winner):
+        """
+        :param tried: 本次按顺序先试过的已学选择器
+        :param winner: 取到正文的选择器 {css, xpath, title_xpath, method}，未取到为 None
+        """
+        now = time.time()
+        win_css = winner['css'] if winner else None
+        with self._db() as conn:
+            for css in tried:
+                conn.execute("UPDATE profiles SET attempts = attempts + 1 WHERE host = ? AND css = ?", (host, css))
+                if css == win_css:
+                    break
+            if not winner:
+                return
+            if win_css in tried:
+                conn.execute("UPDATE profiles SET hits = hits + 1, last_hit = ? WHERE host = ? AND css = ?",
+                             (now, host, win_css))
+                return
+            conn.execute(
+                "INSERT INTO profiles (host, css, xpath, title_xpath, method, attempts, hits, last_hit) "
+                "VALUES (?, ?, ?, ?, ?, 1, 1, ?) "
+                "ON CONFLICT (host, css) DO UPDATE SET attempts = attempts + 1, hits = hits + 1, "
+                "last_hit = excluded.last_hit, title_xpath = excluded.title_xpath, method = excluded.method",
+                (host, win_css, winner['xpath'], winner.get('title_xpath'), winner.get('method'), now)
+            )
+
+    def profiles(self, host=None, limit=200):
+        sql = "SELECT host, css, xpath, title_xpath, method, attempts, hits, last_hit FROM profiles"
+        args = ()
+        if host:
+            sql += " WHERE host = ?"
+            args = (host,)
+        sql += " ORDER BY hits DESC LIMIT ?"
+        rows = self._db().execute(sql, args + (limit,)).fetchall()
+        keys = ('host', 'css', 'xpath', 'title_xpath', 'method', 'attempts', 'hits', 'last_hit')
+        result = []
+        for r in rows:
+            d = dict(zip(keys, r))
+            d['hit_rate'] = round(d['hits'] / d['attempts'], 3) if d['attempts'] else 0.0
+            d['learned'] = d['hits'] >= LEARN_MIN_HITS and d['hit_rate'] >= LEARN_MIN_RATE
+            result.append(d)
+        return result
+
+    def get(self, host, css):
+        for p in self.profiles(host):
+            if p['css'] == css:
+                return p
+        return None
+
+    def delete(self, host, css=None):
+        with self._db() as conn:
+            if css:
+                conn.execute("DELETE FROM profiles WHERE host = ? AND css = ?", (host, css))
+            else:
+                conn.execute("DELETE FROM profiles WHERE host = ?", (host,))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """
+    进程内共享的 ProfileStore，未开启学习时返回 None
+    """
+    global _store
+    if not LEARN_PROFILES:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore()
+        return _store
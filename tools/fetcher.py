@@ -0,0 +1,476 @@
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http import cookiejar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError, ConnectTimeoutError
+from urllib3.util import connection as urllib3_connection
+
+from tools.capture import Recorder, ReplayTransport, request_key, RECORD_DIR, REPLAY_FILE
+from tools.http_cache import HttpCache, request_variant
+from tools.rate_limiter import RateLimiter
+
+try:
+    from curl_cffi import requests as curl_requests
+    HAS_CURL_CFFI = True
+except ImportError:
+    HAS_CURL_CFFI = False
+
+try:
+    import brotli  # noqa: F401  urllib3 会自动使用它解码 br
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+# 连接池参数，可通过环境变量调整
+POOL_HOSTS = int(os.environ.get('CRAWLER_POOL_HOSTS', 64))        # 缓存多少个主机的连接池
+POOL_PER_HOST = int(os.environ.get('CRAWLER_POOL_PER_HOST', 8))   # 每个主机最多保持的连接数
+MAX_CONNECTIONS = int(os.environ.get('CRAWLER_MAX_CONNECTIONS', 64))  # 全局同时在途请求上限
+DNS_TTL = int(os.environ.get('CRAWLER_DNS_TTL', 300))             # DNS 缓存秒数
+DNS_MAX_HOSTS = int(os.environ.get('CRAWLER_DNS_MAX_HOSTS', 1024))  # DNS 缓存的主机数上限
+# 限速排队最多等待的秒数 (网页请求线程)，超过则抛 RateLimited；后台 worker 进程不设上限
+MAX_RATE_WAIT = float(os.environ.get('CRAWLER_MAX_RATE_WAIT', 30))
+HTTP_CACHE_ENABLED = os.environ.get('CRAWLER_HTTP_CACHE', '1') == '1'
+MAX_BODY_BYTES = int(os.environ.get('CRAWLER_MAX_BODY_BYTES', 2 * 1024 * 1024))  # 详情页正文下载上限
+CHUNK_SIZE = 16 * 1024
+
+# 允许作为网页解析的 Content-Type；缺失时靠首块内容嗅探
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/xml', 'application/xml', 'text/plain')
+# 常见二进制文件头
+BINARY_SIGNATURES = (b'%PDF', b'PK\x03\x04', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'RIFF', b'\x1f\x8b', b'Rar!', b'\xd0\xcf\x11\xe0', b'7z\xbc\xaf')
+
+
+class ContentRejected(requests.RequestException):
+    """
+    响应类型不是网页或超出大小上限，已提前中止下载
+    """
+    pass
+
+
+class RateLimited(requests.RequestException):
+    """
+    主机处于限速冷却 (Retry-After、Crawl-delay) 中，需要等待的时间超过 max_wait，未发出请求
+    """
+    pass
+
+
+class RequestCancelled(requests.RequestException):
+    """
+    请求发出前调用方已取消 (cancel 事件被 set)
+    """
+    pass
+
+
+def is_html_content_type(content_type):
+    if not content_type:
+        return True
+    ct = content_type.split(';', 1)[0].strip().lower()
+    return ct in HTML_CONTENT_TYPES
+
+
+def looks_binary(head):
+    if head.startswith(BINARY_SIGNATURES):
+        return True
+    sample = head[:1024]
+    return bool(sample) and sample.count(b'\x00') > len(sample) // 10
+
+
+class DnsCache:
+    """
+    爬虫连接用的 DNS 缓存：按 (host, port) 缓存解析出的地址，只供本模块的连接类使用，
+    不替换 socket.getaddrinfo，进程内其他连接 (数据库、AI 接口等) 不受影响
+    - 最多缓存 max_entries 个主机 (LRU)
+    - 解析失败不缓存；缓存的地址全部连不上时丢弃，下次重新解析
+    """
+    def __init__(self, ttl=DNS_TTL, max_entries=DNS_MAX_HOSTS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        """
+        :return: 地址列表 (按 getaddrinfo 的顺序)
+        :raise socket.gaierror: 解析失败
+        """
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and hit[0] > now:
+                self._cache.move_to_end(key)
+                return hit[1]
+        addresses = []
+        for _, _, _, _, sockaddr in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        with self._lock:
+            self._cache[key] = (now + self.ttl, addresses)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return addresses
+
+    def forget(self, host, port):
+        with self._lock:
+            self._cache.pop((host, port), None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_dns_cache = DnsCache()
+
+
+class _CachedDnsConnection:
+    """
+    urllib3 连接的 DNS 缓存版本：建连时按缓存的地址逐个尝试，证书校验与 SNI 仍使用原主机名
+    """
+    def _new_conn(self):
+        host, port = self._dns_host, self.port
+        try:
+            addresses = _dns_cache.resolve(host, port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        error = None
+        for address in addresses:
+            try:
+                return urllib3_connection.create_connection(
+                    (address, port), self.timeout,
+                    source_address=self.source_address, socket_options=self.socket_options
+                )
+            except socket.timeout as e:
+                error = ConnectTimeoutError(self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})")
+                error.__cause__ = e
+            except OSError as e:
+                error = NewConnectionError(self, f"Failed to establish a new connection: {e}")
+                error.__cause__ = e
+        # 缓存的地址都连不上 (可能已变更)，下次重新解析
+        _dns_cache.forget(host, port)
+        raise error or NewConnectionError(self, f"Failed to establish a new connection: no address for {host}")
+
+
+class _CachedDnsHTTPConnection(_CachedDnsConnection, HTTPConnection):
+    pass
+
+
+class _CachedDnsHTTPSConnection(_CachedDnsConnection, HTTPSConnection):
+    pass
+
+
+class _CachedDnsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDnsHTTPConnection
+
+
+class _CachedDnsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDnsHTTPSConnection
+
+
+class CrawlerAdapter(HTTPAdapter):
+    """
+    爬虫 Session 使用的适配器：连接池中的连接带 DNS 缓存 (经代理的请求除外)
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CachedDnsHTTPConnectionPool,
+            'https': _CachedDnsHTTPSConnectionPool,
+        }
+
+
+class _NoCookies(cookiejar.CookiePolicy):
+    """
+    共享 Session 不在请求之间保存 Cookie，不同爬虫配置/主机之间不会串用
+    (单个请求的跳转链内仍会带上途中设置的 Cookie；需要登录态的配置在请求头里写 Cookie)
+    """
+    netscape = True
+    rfc2965 = False
+    hide_cookie2 = False
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+class Fetcher:
+    """
+    所有爬虫函数共用的 HTTP 抓取器
+    - 基于 requests.Session，按主机维护连接池并保持 keep-alive
+    - 连接自带 DNS 缓存 (不影响进程内其他 DNS 查询)
+    - 不在请求之间保存 Cookie，各爬虫配置互不影响
+    - 自动处理 gzip/deflate (安装 brotli 时支持 br)
+    - 限制每主机连接数与全局在途请求数
+    - 每次请求前经过按主机的自适应限速器 (tools/rate_limiter.py)，排队超过 max_wait 抛 RateLimited
+    - 详情页等请求可走磁盘 HTTP 缓存并做条件重验证 (tools/http_cache.py)
+    - 可选录制真实响应或回放录制文件，离线复现整条采集链路 (tools/capture.py)
+    """
+    def __init__(self, pool_hosts=POOL_HOSTS, pool_per_host=POOL_PER_HOST, max_connections=MAX_CONNECTIONS, limiter=None, cache=None):
+        self.pool_hosts = pool_hosts
+        self.pool_per_host = pool_per_host
+        self.max_connections = max_connections
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._curl_local = threading.local()
+        self.session = self._build_session()
+        self.limiter = limiter or RateLimiter()
+        self.limiter.robots_fetch = self._fetch_robots
+        self.max_wait = MAX_RATE_WAIT  # 限速排队上限秒数，None 为一直等待
+        self.cache = cache
+        self.recorder = None
+        self.replay = None
+
+    def _build_session(self):
+        session = requests.Session()
+        # pool_block=True: 单主机连接用尽时排队等待，而不是新建连接后丢弃
+        adapter = CrawlerAdapter(pool_connections=self.pool_hosts, pool_maxsize=self.pool_per_host, pool_block=True)
+        session.cookies.set_policy(_NoCookies())
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            "User-Agent": DEFAULT_USER_AGENT,
+            "Accept-Encoding": "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate",
+            "Connection": "keep-alive"
+        })
+        return session
+
+    def _curl_session(self):
+        # curl_cffi 的 Session 不是线程安全的，每个线程各持有一个
+        s = getattr(self._curl_local, 'session', None)
+        if s is None:
+            s = curl_requests.Session()
+            self._curl_local.session = s
+        return s
+
+    def _fetch_robots(self, url):
+        # robots.txt 本身不经过限速，避免递归
+        with self._slots:
+            return self.session.get(url, timeout=5)
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=10, impersonate=None, cache=False,
+                max_bytes=None, html_only=False, cancel=None, **kwargs):
+        """
+        发起请求
+        :param impersonate: 指定浏览器指纹 (如 chrome124) 时走 curl_cffi (需已安装)
+        :param cache: 是否使用磁盘缓存 (仅 GET)，适合详情页这类内容稳定的页面
+        :param max_bytes: 正文大小上限，流式下载，超出即中止并抛出 ContentRejected
+        :param html_only: 只接受网页，Content-Type 或首块内容显示为二进制时中止并抛出 ContentRejected
+        :param cancel: threading.Event，在限速排队或等待连接名额时被 set 则不再发出请求，抛出 RequestCancelled
+        :return: Response
+        """
+        if max_bytes or html_only:
+            kwargs.update(max_bytes=max_bytes, html_only=html_only)
+        if cancel is not None:
+            kwargs['cancel'] = cancel
+        if not (cache and self.cache and method.upper() == 'GET'):
+            return self._send(method, url, params, data, headers, timeout, impersonate, **kwargs)
+
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        # 缓存键含请求身份 (Cookie、认证、自定义请求头、浏览器指纹)，Vary 按实际发出的请求头核对
+        variant = request_variant(headers, impersonate)
+        sent_headers = requests.structures.CaseInsensitiveDict(self.session.headers)
+        sent_headers.update(headers or {})
+        entry = self.cache.lookup(full_url, variant, sent_headers)
+        if entry and entry.fresh:
+            return self.cache.hit(entry)
+        if entry:
+            headers = dict(headers or {})
+            headers.update(entry.validators())
+        resp = self._send(method, url, params, data, headers, timeout, impersonate, **kwargs)
+        if entry and resp.status_code == 304:
+            return self.cache.revalidated(entry, resp)
+        self.cache.miss()
+        try:
+            self.cache.store(full_url, resp, variant, sent_headers)
+        except Exception as e:
+            print(f"HTTP cache store error for {full_url}: {e}")
+        return resp
+
+    def start_recording(self, directory):
+        """
+        开始录制：之后每个真实响应都会在后台写入 directory 下的压缩文件
+        """
+        self.recorder = Recorder(directory)
+        return self.recorder.path
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def use_replay(self, paths_or_transport):
+        """
+        切换为回放模式：不访问网络，也不经过缓存与限速
+        """
+        if isinstance(paths_or_transport, ReplayTransport):
+            self.replay = paths_or_transport
+        else:
+            self.replay = ReplayTransport(paths_or_transport)
+        self.cache = None
+        return self.replay
+
+    def _acquire(self, url, cancel=None):
+        if not self.limiter.acquire(url, self.max_wait, cancel):
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelled(f"Request cancelled: {url}")
+            raise RateLimited(f"Host is rate limited for more than {self.max_wait}s: {url}")
+
+    def _send(self, method, url, params, data, headers, timeout, impersonate, max_bytes=None, html_only=False, cancel=None, **kwargs):
+        if self.replay is not None:
+            return self.replay.send(method, url, params, data)
+
+        self._acquire(url, cancel)
+        start = time.monotonic()
+        resp = None
+        try:
+            with self._slots:
+                # 排队等连接名额期间可能已被取消
+                if cancel is not None and cancel.is_set():
+                    raise RequestCancelled(f"Request cancelled: {url}")
+                if impersonate and HAS_CURL_CFFI:
+                    curl = self._curl_session()
+                    # 与 requests Session 一样，不把上一个请求的 Cookie 带到下一个请求
+                    curl.cookies.clear()
+                    resp = curl.request(
+                        method, url, params=params, data=data, headers=headers,
+                        timeout=timeout, impersonate=impersonate, **kwargs
+                    )
+                    if max_bytes or html_only:
+                        self._check_body(resp, resp.content, max_bytes, html_only)
+                elif max_bytes or html_only:
+                    resp = self.session.request(method, url, params=params, data=data, headers=headers, timeout=timeout, stream=True, **kwargs)
+                    self._read_body(resp, max_bytes, html_only)
+                else:
+                    resp = self.session.request(method, url, params=params, data=data, headers=headers, timeout=timeout, **kwargs)
+        except ContentRejected:
+            # 对方正常响应，只是内容不要，不算主机异常
+            self.limiter.feedback(url, resp.status_code, None, time.monotonic() - start)
+            raise
+        except RequestCancelled:
+            raise
+        except Exception:
+            self.limiter.feedback(url, error=True)
+            raise
+        elapsed = time.monotonic() - start
+        self.limiter.feedback(url, resp.status_code, resp.headers.get('Retry-After'), elapsed)
+        if self.recorder is not None:
+            self.recorder.record(request_key(method, url, params, data), resp, elapsed)
+        return resp
+
+    def _check_body(self, resp, head, max_bytes, html_only, length=None):
+        if resp.status_code != 200:
+            return
+        if html_only and not is_html_content_type(resp.headers.get('Content-Type')):
+            raise ContentRejected(f"non-HTML content type: {resp.headers.get('Content-Type')}")
+        if html_only and looks_binary(head[:CHUNK_SIZE]):
+            raise ContentRejected("binary content")
+        size = length if length is not None else len(head)
+        if max_bytes and size > max_bytes:
+            raise ContentRejected(f"response larger than {max_bytes} bytes")
+
+    def _read_body(self, resp, max_bytes, html_only):
+        """
+        流式读取正文：先看响应头与首块内容，再边读边计数，超出上限立即断开
+        """
+        try:
+            length = resp.headers.get('Content-Length')
+            if length and length.isdigit():
+                self._check_body(resp, b'', max_bytes, html_only, length=int(length))
+            chunks = []
+            size = 0
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                if not chunks:
+                    self._check_body(resp, chunk, max_bytes, html_only)
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise ContentRejected(f"response larger than {max_bytes} bytes")
+                chunks.append(chunk)
+            resp._content = b''.join(chunks)
+        except Exception:
+            resp.close()
+            raise
+
+    @contextmanager
+    def stream(self, url, params=None, headers=None, timeout=10, method='GET', data=None):
+        """
+        流式请求：在 with 块内用 resp.iter_content() 边下载边处理，退出时释放连接
+        不经过磁盘缓存；整个读取过程占用一个连接名额
+        """
+        if self.replay is not None:
+            yield self.replay.send(method, url, params, data)
+            return
+
+        self._acquire(url)
+        start = time.monotonic()
+        with self._slots:
+            try:
+                resp = self.session.request(method, url, params=params, data=data, headers=headers, timeout=timeout, stream=True)
+            except Exception:
+                self.limiter.feedback(url, error=True)
+                raise
+            self.limiter.feedback(url, resp.status_code, resp.headers.get('Retry-After'), time.monotonic() - start)
+
+            chunks = []
+            complete = []
+            if self.recorder is not None:
+                raw_iter = resp.iter_content
+
+                def iter_content(chunk_size=1, decode_unicode=False):
+                    for chunk in raw_iter(chunk_size, decode_unicode):
+                        chunks.append(chunk)
+                        yield chunk
+                    complete.append(True)
+                resp.iter_content = iter_content
+            try:
+                yield resp
+            finally:
+                resp.close()
+                # 只录制完整读完的响应
+                if self.recorder is not None and complete:
+                    resp._content = b''.join(chunks)
+                    self.recorder.record(request_key(method, url, params, data), resp, time.monotonic() - start)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """
+    获取进程内共享的 Fetcher 单例
+    """
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = Fetcher(cache=HttpCache() if HTTP_CACHE_ENABLED else None)
+                if REPLAY_FILE:
+                    _fetcher.use_replay(REPLAY_FILE.split(','))
+                elif RECORD_DIR:
+                    print(f"Recording HTTP traffic to {_fetcher.start_recording(RECORD_DIR)}")
+    return _fetcher
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+CACHE_DIR = os.environ.get('CRAWLER_CACHE_DIR') or os.path.join(basedir, '.cache', 'http')
+CACHE_TTL = int(os.environ.get('CRAWLER_CACHE_TTL', 3600))                          # 无 max-age 时的默认新鲜期(秒)
+CACHE_MAX_BYTES = int(os.environ.get('CRAWLER_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 磁盘占用上限
+CACHE_MAX_ENTRY_BYTES = 5 * 1024 * 1024  # 单条响应超过该大小不缓存
+
+# 缓存里的正文已经解压，这些头不能原样回放
+_DROP_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length', 'connection', 'set-cookie')
+# 不区分缓存的请求头 (条件请求、连接管理、来源页)；其余请求头 (Cookie、Authorization、自定义头等) 都参与缓存键
+_VARIANT_SKIP = ('if-none-match', 'if-modified-since', 'connection', 'accept-encoding', 'referer')
+
+
+def request_variant(headers, impersonate=None):
+    """
+    请求身份的摘要：带不同 Cookie/认证头/自定义头或浏览器指纹的请求各自缓存，互不命中
+    只保存哈希，缓存里不落明文 Cookie
+    """
+    parts = sorted(f"{k.lower()}={v}" for k, v in (headers or {}).items() if k.lower() not in _VARIANT_SKIP)
+    if impersonate:
+        parts.append(f"impersonate={impersonate}")
+    if not parts:
+        return ''
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _vary_names(headers):
+    vary = headers.get('Vary') or headers.get('vary') or ''
+    return [v.strip().lower() for v in vary.split(',') if v.strip()]
+
+
+def _vary_values(names, request_headers):
+    request_headers = CaseInsensitiveDict(request_headers or {})
+    return {name: request_headers.get(name) for name in names}
+
+
+class CacheEntry:
+    def __init__(self, key, url, status_code, headers, body, stored_at, expires_at, vary=None):
+        self.key = key
+        self.vary = vary or {}
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+    def validators(self):
+        """
+        条件请求头：If-None-Match / If-Modified-Since
+        """
+        h = {}
+        etag = self.headers.get('ETag') or self.headers.get('etag')
+        last_modified = self.headers.get('Last-Modified') or self.headers.get('last-modified')
+        if etag:
+            h['If-None-Match'] = etag
+        if last_modified:
+            h['If-Modified-Since'] = last_modified
+        return h
+
+    def to_response(self):
+        resp = Response()
+        resp.status_code = self.status_code
+        resp.headers = CaseInsensitiveDict(self.headers)
+        resp._content = self.body
+        resp.url = self.url
+        resp.encoding = None
+        resp.reason = 'OK'
+        resp.from_cache = True
+        return resp
+
+
+class HttpCache:
+    """
+    磁盘 HTTP 缓存
+    - 正文与响应头按 URL + 请求身份 (request_variant) 的哈希存为文件，索引 (大小、最近访问、过期时间) 存于 SQLite
+    - 响应带 Vary 时记下对应请求头的值，查找时不一致按未命中处理；Vary: * 不缓存
+    - 新鲜期内直接命中；过期后带 ETag/Last-Modified 做条件请求，304 时复用缓存正文
+    - 超出容量预算时按最近访问时间 (LRU) 淘汰
+    """
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._local = threading.local()
+        with self._db() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, url TEXT, size INTEGER, stored_at REAL, expires_at REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)")
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.cache_dir, 'index.sqlite'), timeout=10)
+            self._local.conn = conn
+        return conn
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    @staticmethod
+    def _tmp_suffix():
+        # 多线程/多进程写同一条目时各用各的临时文件，再原子替换
+        return f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def make_key(url, variant=''):
+        raw = url + '\n' + variant if variant else url
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def lookup(self, url, variant='', request_headers=None):
+        """
+        :param variant: request_variant() 的结果
+        :param request_headers: 实际发出的请求头 (含 Session 默认头)，用于核对 Vary
+        """
+        key = self.make_key(url, variant)
+        try:
+            with open(self._path(key) + '.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(self._path(key) + '.body', 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        vary = meta.get('vary') or {}
+        if vary and _vary_values(vary, request_headers) != vary:
+            return None
+        with self._db() as conn:
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(key, meta['url'], meta['status_code'], meta['headers'], body, meta['stored_at'], meta['expires_at'],
+                          vary)
+
+    def miss(self):
+        self._count('misses')
+
+    def hit(self, entry):
+        self._count('hits')
+        return entry.to_response()
+
+    def revalidated(self, entry, resp):
+        """
+        收到 304：延长新鲜期，合并新的校验头，返回缓存正文
+        """
+        self._count('revalidated')
+        headers = dict(entry.headers)
+        for k in ('ETag', 'Last-Modified', 'Cache-Control', 'Expires'):
+            if k in resp.headers:
+                headers[k] = resp.headers[k]
+        entry.headers = headers
+        entry.expires_at = time.time() + self._ttl_for(headers)
+        self._write_meta(entry.key, entry.url, entry.status_code, headers, entry.stored_at, entry.expires_at, entry.vary)
+        with self._db() as conn:
+            conn.execute("UPDATE entries SET expires_at = ?, last_access = ? WHERE key = ?",
+                         (entry.expires_at, time.time(), entry.key))
+        return entry.to_response()
+
+    def _ttl_for(self, headers):
+        cc = (headers.get('Cache-Control') or headers.get('cache-control') or '').lower()
+        m = re.search(r'max-age=(\d+)', cc)
+        if m:
+            return int(m.group(1))
+        return self.ttl
+
+    def _write_meta(self, key, url, status_code, headers, stored_at, expires_at, vary=None):
+        meta = {'url': url, 'status_code': status_code, 'headers': headers,
+                'stored_at': stored_at, 'expires_at': expires_at, 'vary': vary or {}}
+        tmp = self._path(key) + self._tmp_suffix()
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._path(key) + '.json')
+
+    def store(self, url, resp, variant='', request_headers=None):
+        """
+        缓存 200 响应；no-store、Vary: * 或过大的响应不缓存
+        """
+        if resp.status_code != 200:
+            return
+        cc = (resp.headers.get('Cache-Control') or '').lower()
+        if 'no-store' in cc:
+            return
+        names = _vary_names(resp.headers)
+        if '*' in names:
+            return
+        body = resp.content
+        if not body or len(body) > CACHE_MAX_ENTRY_BYTES:
+            return
+        key = self.make_key(url, variant)
+        vary = _vary_values(names, request_headers)
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+        now = time.time()
+        # no-cache: 可以存，但每次都需要重新校验
+        expires_at = now if 'no-cache' in cc else now + self._ttl_for(headers)
+        os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+        tmp = self._path(key) + self._tmp_suffix()
+        with open(tmp, 'wb') as f:
+            f.write(body)
+        os.replace(tmp, self._path(key) + '.body')
+        self._write_meta(key, url, resp.status_code, headers, now, expires_at, vary)
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, url, size, stored_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, len(body), now, expires_at, now)
+            )
+        self._count('stores')
+        self._evict()
+
+    def _evict(self):
+        conn = self._db()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+        removed = []
+        for key, size in rows:
+            if total <= target:
+                break
+            for suffix in ('.body', '.json'):
+                try:
+                    os.remove(self._path(key) + suffix)
+                except OSError:
+                    pass
+            total -= size
+            removed.append((key,))
+        with conn:
+            conn.executemany("DELETE FROM entries WHERE key = ?", removed)
+        with self._lock:
+            self.stats['evictions'] += len(removed)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        row = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        stats.update({'entries': row[0], 'bytes': row[1], 'max_bytes': self.max_bytes})
+        return stats
@@ -0,0 +1,132 @@
+import hashlib
+import re
+from array import array
+
+# 标题 SimHash：64 位，按 4 段 × 16 位分桶；海明距离 ≤ 3 时至少有一段完全相同 (抽屉原理)
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+# 正文 MinHash：64 个哈希函数，按 16 段 × 4 行分桶，Jaccard 约 0.5 以上的文档大概率落入同一桶
+MINHASH_PERM = 64
+MINHASH_BANDS = 16
+CONTENT_SHINGLE = 5
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 转载标题常见的来源后缀与前缀标记
+_TITLE_SUFFIX = re.compile(r'\s*[-_|—–]+\s*[^-_|—–]{1,20}(网|报|台|频道|政府|门户|新闻|客户端|号)\s*$')
+_TITLE_PREFIX = re.compile(r'^\s*[【\[(（](转载|转发|原创|视频|图文|独家|最新|快讯)[】\])）]\s*')
+_NOISE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def _h64(s):
+    return int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def normalize_title(title):
+    """
+    去掉转载前缀、来源后缀、标点与空白，英文转小写
+    """
+    t = title or ''
+    t = _TITLE_PREFIX.sub('', t)
+    t = _TITLE_SUFFIX.sub('', t)
+    return _NOISE.sub('', t).lower()
+
+
+def shingles(text, k):
+    """
+    字符 k-gram 集合 (中文不分词，直接按字切片)
+    """
+    text = _NOISE.sub('', text or '').lower()
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def simhash(features):
+    """
+    :param features: 特征串集合
+    :return: 64 位无符号整数
+    """
+    weights = [0] * SIMHASH_BITS
+    for f in features:
+        h = _h64(f)
+        for i in range(SIMHASH_BITS):
+            weights[i] += 1 if (h >> i) & 1 else -1
+    value = 0
+    for i, w in enumerate(weights):
+        if w > 0:
+            value |= 1 << i
+    return value
+
+
+def title_simhash(title):
+    norm = normalize_title(title)
+    return simhash(shingles(norm, 2)) if norm else None
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def simhash_bands(value):
+    """
+    :return: 分桶键，如 ['t0:ab12', ...]
+    """
+    width = SIMHASH_BITS // SIMHASH_BANDS
+    mask = (1 << width) - 1
+    return [f"t{i}:{(value >> (i * width)) & mask:x}" for i in range(SIMHASH_BANDS)]
+
+
+def to_signed64(value):
+    # SQLite INTEGER 是有符号 64 位
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned64(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+# 各哈希函数的 (a, b) 参数，按固定种子生成，保证重启后签名一致
+_PERMS = [(_h64(f"a{i}") % (_MERSENNE - 1) + 1, _h64(f"b{i}") % _MERSENNE) for i in range(MINHASH_PERM)]
+
+
+def minhash(features):
+    """
+    :return: MINHASH_PERM 个 32 位最小哈希值；特征为空返回 None
+    """
+    if not features:
+        return None
+    base = [_h64(f) for f in features]
+    return [min((a * x + b) % _MERSENNE for x in base) & _MAX_HASH for a, b in _PERMS]
+
+
+def content_minhash(text):
+    return minhash(shingles(text, CONTENT_SHINGLE))
+
+
+def minhash_bands(signature):
+    rows = MINHASH_PERM // MINHASH_BANDS
+    keys = []
+    for i in range(MINHASH_BANDS):
+        band = signature[i * rows:(i + 1) * rows]
+        digest = hashlib.blake2b(array('I', band).tobytes(), digest_size=8).hexdigest()
+        keys.append(f"c{i}:{digest}")
+    return keys
+
+
+def jaccard_estimate(a, b):
+    """
+    两个 MinHash 签名相同位置取值相等的比例，即 Jaccard 相似度的估计
+    """
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def pack_signature(signature):
+    return array('I', signature).tobytes()
+
+
+def unpack_signature(data):
+    sig = array('I')
+    sig.frombytes(data)
+    return list(sig)
@@ -0,0 +1,148 @@
+import atexit
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, CancelledError, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# HTML 解析进程池：解析是 CPU 密集的，放在 Flask/采集线程里会长时间占住 GIL
+PARSE_WORKERS = int(os.environ.get('CRAWLER_PARSE_WORKERS', min(4, os.cpu_count() or 1)))  # 0 为关闭，全部在本进程解析
+PARSE_TIMEOUT = float(os.environ.get('CRAWLER_PARSE_TIMEOUT', 30))                           # 单个页面解析超时 (秒)
+PARSE_INLINE_BYTES = int(os.environ.get('CRAWLER_PARSE_INLINE_BYTES', 32 * 1024))           # 小于该大小的页面直接在本进程解析
+
+_pool = None
+_pool_lock = threading.Lock()
+_inflight = {}  # 进程池 -> 已提交未完成的任务
+_stuck = {}     # 因超时退役的进程池 -> 超时的任务；其余任务做完后结束整个池
+
+
+class ParseTimeout(Exception):
+    pass
+
+
+def _init_worker():
+    # Ctrl+C 由父进程处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None and PARSE_WORKERS > 0:
+            # spawn：父进程里有 Flask/采集线程，fork 出的子进程可能继承到被持有的锁
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return _pool
+
+
+def _reset_pool(pool):
+    """
+    丢弃出问题的进程池，下次使用时重建
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+        _inflight.pop(pool, None)
+        _stuck.pop(pool, None)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _kill_pool(pool):
+    # 强制结束仍在解析的子进程 (卡住的任务无法单独取消)
+    for p in list((getattr(pool, '_processes', None) or {}).values()):
+        p.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _task_done(pool, future):
+    with _pool_lock:
+        futures = _inflight.get(pool)
+        if futures is None:
+            return
+        futures.discard(future)
+        drained = pool in _stuck and futures <= _stuck[pool]
+        if drained:
+            _inflight.pop(pool)
+            _stuck.pop(pool)
+    if drained:
+        _kill_pool(pool)
+
+
+def _retire_pool(pool, future):
+    """
+    任务超时：进程池不再接新任务 (新任务用新建的池)，同池其他在途任务照常做完后再结束整个池
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+        futures = _inflight.get(pool)
+        if futures is None:
+            return
+        stuck = _stuck.setdefault(pool, set())
+        stuck.add(future)
+        drained = futures <= stuck
+        if drained:
+            _inflight.pop(pool)
+            _stuck.pop(pool)
+    if drained:
+        _kill_pool(pool)
+
+
+def _submit(pool, func, body, args):
+    future = pool.submit(func, body, *args)
+    with _pool_lock:
+        _inflight.setdefault(pool, set()).add(future)
+    future.add_done_callback(lambda f: _task_done(pool, f))
+    return future
+
+
+def run_parse(func, body, *args, timeout=None):
+    """
+    在解析进程池中执行 func(body, *args)
+    小页面、进程池关闭或不可用时直接在本进程执行
+    :param func: 模块级函数 (需可被子进程导入)，参数与返回值需可 pickle
+    :param body: 页面原始字节
+    :param timeout: 超时秒数，默认 PARSE_TIMEOUT；超时抛出 ParseTimeout，进程池在其他任务做完后重建
+    """
+    if not body or len(body) < PARSE_INLINE_BYTES:
+        return func(body, *args)
+    pool = _get_pool()
+    if pool is None:
+        return func(body, *args)
+    try:
+        future = _submit(pool, func, body, args)
+    except (BrokenProcessPool, RuntimeError):
+        _reset_pool(pool)
+        return func(body, *args)
+    try:
+        return future.result(timeout=timeout or PARSE_TIMEOUT)
+    except FutureTimeout:
+        _retire_pool(pool, future)
+        raise ParseTimeout(f"parse timed out after {timeout or PARSE_TIMEOUT}s")
+    except (BrokenProcessPool, CancelledError):
+        # 进程池崩溃或已被结束：本任务回退到本进程解析
+        _reset_pool(pool)
+        return func(body, *args)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+        retired = list(_stuck)
+        _inflight.clear()
+        _stuck.clear()
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+    # 退役池里还有卡住的子进程，不结束的话退出时会一直等待
+    for p in retired:
+        _kill_pool(p)
+
+
+atexit.register(shutdown)
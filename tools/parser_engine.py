@@ -0,0 +1,303 @@
+import os
+import re
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from tools.charset import SNIFF_BYTES, declared_encodings, decode_body
+
+# 解析引擎：lxml (默认，快) / bs4 (原 html.parser 实现，作为对照与兜底)
+PARSER_ENGINE = os.environ.get('CRAWLER_PARSER_ENGINE', 'lxml')
+ENGINES = ('lxml', 'bs4')
+# 列表首页边下载边解析
+INCREMENTAL_PARSE = os.environ.get('CRAWLER_INCREMENTAL_PARSE', '1') == '1'
+
+# bs4 get_text() 不收录这些标签里的文字 (脚本、样式、模板、注音)
+_VISIBLE_TEXT = './/text()[not(ancestor::script or ancestor::style or ancestor::template or ancestor::rt or ancestor::rp)]'
+
+COVER_ATTRS = ['src', 'data-src', 'data-ori', 'data-original', 'data-thumb', 'data-lazyload']
+
+
+def _engine(engine):
+    engine = engine or PARSER_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"unknown parser engine: {engine}")
+    return engine
+
+
+def _drop_open_comment(text):
+    """
+    下载中断的页面可能停在未闭合的注释里：html.parser 会把 "<!--..." 当作文字，
+    lxml 则按 HTML 规范当作注释丢弃，这里先去掉，两个引擎结果一致
+    """
+    start = text.rfind('<!--')
+    if start != -1 and text.find('-->', start + 4) == -1:
+        return text[:start]
+    return text
+
+
+def make_soup(text, engine=None):
+    """
+    构造 BeautifulSoup，lxml 引擎下改用 lxml 建树 (比 html.parser 快数倍)，
+    适用于选择器由用户配置、只能用 CSS 选择的场景
+    """
+    if _engine(engine) == 'lxml':
+        return BeautifulSoup(text, 'lxml')
+    return BeautifulSoup(_drop_open_comment(text), 'html.parser')
+
+
+def parse_html(text):
+    """
+    lxml 解析 HTML 文本，返回根节点 (空文档返回 None)
+    """
+    try:
+        return etree.HTML(text)
+    except ValueError:
+        # 带 <?xml encoding=...?> 声明的 str 不能直接交给 lxml
+        return etree.HTML(text.encode('utf-8'), etree.HTMLParser(encoding='utf-8'))
+
+
+def has_class(*names):
+    """
+    生成按 class 匹配的 XPath 条件，等价于 CSS 的 .a.b
+    """
+    return ' and '.join(f"contains(concat(' ', normalize-space(@class), ' '), ' {n} ')" for n in names)
+
+
+def first(el, xpath):
+    found = el.xpath(xpath)
+    return found[0] if found else None
+
+
+def text_of(el):
+    """
+    与 bs4 的 get_text(strip=True) 一致：各段文字去空白后直接拼接
+    """
+    return ''.join(s.strip() for s in el.xpath(_VISIBLE_TEXT))
+
+
+def _pick_src(e):
+    for k in COVER_ATTRS:
+        v = e.get(k)
+        if v and v.strip():
+            return v.strip()
+    return ''
+
+
+def parse_baidu_results(html, engine=None):
+    """
+    解析百度资讯结果页
+    :param html: 页面文本
+    :param engine: lxml / bs4，默认取 CRAWLER_PARSER_ENGINE
+    :return: [{title, cover, url, source}]，未去重
+    """
+    if _engine(engine) == 'bs4':
+        return _baidu_results_bs4(html)
+    return _baidu_results_lxml(html)
+
+
+def parse_baidu_page(body):
+    """
+    解析百度资讯结果页原始字节 (页面固定为 UTF-8，可在解析进程中执行)
+    """
+    return parse_baidu_results(body.decode('utf-8', 'replace'))
+
+
+BAIDU_CONTAINER = ('result-op', 'c-container')
+
+
+def _baidu_results_lxml(html):
+    root = parse_html(html)
+    if root is None:
+        return []
+    news_items = root.xpath(f".//*[{has_class(*BAIDU_CONTAINER)}]")
+    if not news_items:
+        print("No news items found with primary selector. Trying fallback...")
+        news_items = root.xpath(f".//*[{has_class('result')}]")
+    return [r for r in map(_baidu_item_lxml, news_items) if r is not None]
+
+
+def _baidu_item_lxml(item):
+    try:
+        title_elem = first(item, './/h3//a')
+        title = text_of(title_elem) if title_elem is not None else "无标题"
+        original_url = title_elem.attrib['href'] if title_elem is not None else ""
+
+        cover_url = ''
+        for xp in (f".//*[{has_class('c-img')}]", f".//*[{has_class('img_1gB26')}]",
+                   f".//img[{has_class('c-img')}]", './/img'):
+            e = first(item, xp)
+            if e is not None:
+                cover_url = _pick_src(e)
+                if cover_url:
+                    break
+
+        source_elem = None
+        for cls in ('c-color-gray', 'c-color-gray2', 'source_1Vdff'):
+            source_elem = first(item, f".//*[{has_class(cls)}]")
+            if source_elem is not None:
+                break
+        source = text_of(source_elem) if source_elem is not None else "未知来源"
+
+        return {"title": title, "cover": cover_url, "url": original_url, "source": source}
+    except Exception as e:
+        print(f"Error parsing item: {e}")
+        return None
+
+
+_SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?((?:[#.][\w-]+)*)$')
+
+
+def simple_selector(css):
+    """
+    把只含标签、#id、.class 的简单选择器 (如 div.news-item、.result-op.c-container) 转成 lxml 元素判断函数
+    含组合符、属性或伪类的选择器返回 None
+    """
+    m = _SIMPLE_SELECTOR.match((css or '').strip())
+    if not m or not css.strip():
+        return None
+    tag = (m.group(1) or '').lower() or None
+    parts = re.findall(r'([#.])([\w-]+)', m.group(2))
+    ids = [v for k, v in parts if k == '#']
+    classes = {v for k, v in parts if k == '.'}
+
+    def match(el):
+        if not isinstance(el.tag, str):
+            return False
+        if tag and el.tag.lower() != tag:
+            return False
+        if ids and any(el.get('id') != i for i in ids):
+            return False
+        return not classes or classes.issubset((el.get('class') or '').split())
+    return match
+
+
+class IncrementalListParser:
+    """
+    增量列表解析：边下载边把字节喂给 lxml HTMLPullParser，列表项的闭合标签一到就产出该元素
+    编码按 BOM / 响应头 / 开头的 meta charset 确定，未声明时按 UTF-8，不是合法 UTF-8 再做检测
+    """
+    def __init__(self, match, content_type=None):
+        self.match = match
+        self.content_type = content_type
+        self._parser = None
+        self._head = b''
+
+    def _start(self, head):
+        encodings = declared_encodings(head, self.content_type)
+        if encodings:
+            encoding = encodings[0]
+        else:
+            try:
+                head[:-3].decode('utf-8')
+                encoding = 'utf-8'
+            except UnicodeDecodeError:
+                encoding = decode_body(head)[1]
+        self._parser = etree.HTMLPullParser(events=('end',), encoding=encoding)
+        self._parser.feed(head)
+
+    def _ready(self):
+        return [el for _, el in self._parser.read_events() if self.match(el)]
+
+    def feed(self, chunk):
+        """
+        :return: 本次新闭合的匹配元素
+        """
+        if self._parser is None:
+            self._head += chunk
+            if len(self._head) < SNIFF_BYTES:
+                return []
+            head, self._head = self._head, b''
+            self._start(head)
+        else:
+            self._parser.feed(chunk)
+        return self._ready()
+
+    def close(self):
+        """
+        :return: (剩余的匹配元素, 根节点)
+        """
+        if self._parser is None:
+            if not self._head:
+                return [], None
+            self._start(self._head)
+        try:
+            root = self._parser.close()
+        except etree.XMLSyntaxError:
+            root = None
+        return self._ready(), root
+
+
+def element_to_tag(el):
+    """
+    把 lxml 元素转成 bs4 Tag，便于沿用按 CSS 选择器编写的逐项解析逻辑
+    """
+    frag = BeautifulSoup(etree.tostring(el, encoding='unicode', with_tail=False), 'html.parser')
+    return frag.find(True)
+
+
+def iter_baidu_results(chunks, content_type=None):
+    """
+    增量解析百度资讯结果页：每个结果容器闭合即产出一条 (未去重)
+    整页都没有主选择器命中时，按非增量模式的兜底选择器解析整棵树
+    :param chunks: 正文字节块迭代器 (如 resp.iter_content())
+    """
+    parser = IncrementalListParser(simple_selector('.' + '.'.join(BAIDU_CONTAINER)), content_type)
+    found = False
+    for chunk in chunks:
+        for el in parser.feed(chunk):
+            found = True
+            item = _baidu_item_lxml(el)
+            if item is not None:
+                yield item
+    rest, root = parser.close()
+    for el in rest:
+        found = True
+        item = _baidu_item_lxml(el)
+        if item is not None:
+            yield item
+    if not found and root is not None:
+        print("No news items found with primary selector. Trying fallback...")
+        for el in root.xpath(f".//*[{has_class('result')}]"):
+            item = _baidu_item_lxml(el)
+            if item is not None:
+                yield item
+
+
+def _baidu_results_bs4(html):
+    soup = BeautifulSoup(_drop_open_comment(html), 'html.parser')
+    # 查找所有的新闻结果容器
+    # 尝试不同的选择器以适应百度可能的页面结构变化
+    news_items = soup.select('.result-op.c-container')
+    if not news_items:
+        print("No news items found with primary selector. Trying fallback...")
+        news_items = soup.select('.result')
+
+    results = []
+    for item in news_items:
+        try:
+            # 标题
+            title_elem = item.select_one('h3 a')
+            title = title_elem.get_text(strip=True) if title_elem else "无标题"
+            original_url = title_elem['href'] if title_elem else ""
+
+            cover_url = ''
+            for e in (item.select_one('.c-img'), item.select_one('.img_1gB26'),
+                      item.select_one('img.c-img'), item.select_one('img')):
+                if e:
+                    cover_url = _pick_src(e)
+                    if cover_url:
+                        break
+
+            # 来源
+            source_elem = item.select_one('.c-color-gray')
+            if not source_elem:
+                source_elem = item.select_one('.c-color-gray2') # 备选来源选择器
+            if not source_elem:
+                source_elem = item.select_one('.source_1Vdff') # 百度资讯新版结构
+            source = source_elem.get_text(strip=True) if source_elem else "未知来源"
+
+            results.append({"title": title, "cover": cover_url, "url": original_url, "source": source})
+        except Exception as e:
+            print(f"Error parsing item: {e}")
+    return results
@@ -0,0 +1,74 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PREFETCH_PAGES = int(os.environ.get('CRAWLER_PREFETCH_PAGES', 1))  # 列表页预取深度，0 为关闭
+
+
+class PagePrefetcher:
+    """
+    列表页流水线预取：第 N 页返回后立即发出第 N+1..N+lookahead 页的请求，
+    在解析、推送第 N 页的同时下一页已在路上。请求仍经过 fetcher 的限速器。
+    fetch_page 应把 closed 作为 cancel 传给 fetcher，关闭后还在限速排队的预取不再发出
+    """
+    def __init__(self, fetch_page, max_pages, lookahead=PREFETCH_PAGES):
+        """
+        :param fetch_page: fetch_page(page) -> Response，page 从 0 开始
+        :param max_pages: 最多请求的页数
+        :param lookahead: 预取深度，0 时退化为串行抓取
+        """
+        self.fetch_page = fetch_page
+        self.max_pages = max_pages
+        self.lookahead = max(0, int(lookahead or 0))
+        self._futures = {}
+        self.closed = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.lookahead, thread_name_prefix='page-prefetch') if self.lookahead else None
+
+    def _submit(self, page):
+        if page < self.max_pages and page not in self._futures:
+            self._futures[page] = self._executor.submit(self._fetch, page)
+
+    def _fetch(self, page):
+        if self.closed.is_set():
+            return None
+        resp = self.fetch_page(page)
+        if self.closed.is_set() and resp is not None:
+            # 关闭后才返回的预取用不到了，立即归还连接
+            resp.close()
+            return None
+        return resp
+
+    def start(self, page):
+        """
+        不等待结果，提前发出第 page 页起 lookahead 页的请求
+        """
+        if self._executor is None:
+            return
+        for p in range(page, page + self.lookahead):
+            self._submit(p)
+
+    def get(self, page):
+        """
+        取第 page 页的响应 (阻塞)，成功返回后安排后续页预取；请求异常原样抛出
+        """
+        if self._executor is None:
+            return self.fetch_page(page)
+        self._submit(page)
+        resp = self._futures.pop(page).result()
+        if getattr(resp, 'status_code', None) == 200:
+            for p in range(page + 1, page + 1 + self.lookahead):
+                self._submit(p)
+        return resp
+
+    def close(self):
+        """
+        丢弃未用到的预取：尚未开始的直接取消，还在限速排队的 (fetch_page 传了 cancel=closed) 不再发出；
+        已经发出的请求不会被中断，会照常占用连接直到超时或读完，之后结果被丢弃、连接立即归还
+        """
+        if self._executor is None:
+            return
+        self.closed.set()
+        for fut in self._futures.values():
+            fut.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+import urllib.parse
+from email.utils import parsedate_to_datetime
+
+# 令牌桶参数 (单位: 请求/秒)，可通过环境变量调整
+DEFAULT_RATE = float(os.environ.get('CRAWLER_HOST_RATE', 2))     # 每主机初始速率
+MIN_RATE = float(os.environ.get('CRAWLER_HOST_MIN_RATE', 0.1))   # 收紧后的下限
+MAX_RATE = float(os.environ.get('CRAWLER_HOST_MAX_RATE', 8))     # 放宽后的上限
+BURST = float(os.environ.get('CRAWLER_HOST_BURST', 2))           # 桶容量
+RESPECT_ROBOTS = os.environ.get('CRAWLER_RESPECT_ROBOTS', '1') == '1'
+MAX_RETRY_AFTER = 300  # Retry-After 最长只认 5 分钟
+ROBOTS_WAIT = 15       # 其他线程等待首个线程读取 robots.txt 的最长秒数
+
+# 对反爬敏感的主机给一个保守的初始速率 (百度搜索原先每页间隔 1~2 秒)
+HOST_RATES = {
+    'www.baidu.com': 0.67,
+}
+
+THROTTLE_STATUS = (429, 503)
+INCREASE_AFTER = 5   # 连续成功多少次后放宽一档
+INCREASE_STEP = 0.5  # 每次放宽增加的速率
+
+
+class HostBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0   # Retry-After 指定的冷却截止时间
+        self.min_interval = 0.0    # robots.txt Crawl-delay
+        self.successes = 0
+        self.latency = None        # 响应耗时 EWMA
+        self.best_latency = None
+        self.lock = threading.Lock()
+        self.ready = threading.Event()  # robots.txt 读取完成 (Crawl-delay 已生效)
+
+    def _effective_rate(self):
+        if self.min_interval:
+            return min(self.rate, 1.0 / self.min_interval)
+        return self.rate
+
+    def _refill(self, now):
+        # 有 Crawl-delay 时不允许突发
+        cap = 1.0 if self.min_interval else self.burst
+        self.tokens = min(cap, self.tokens + (now - self.updated) * self._effective_rate())
+        self.updated = now
+
+    def reserve(self, max_wait=None):
+        """
+        预约一个令牌，返回需要等待的秒数 (令牌可以透支，多个并发调用按顺序排队)
+        :param max_wait: 需要等待超过该秒数时不预约，令牌退回，返回 None
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            rate = self._effective_rate()
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / rate
+            wait = max(wait, self.blocked_until - now)
+            if max_wait is not None and wait > max_wait:
+                self.tokens += 1
+                return None
+            return wait
+
+
+class RateLimiter:
+    """
+    按主机共享的自适应令牌桶限速器
+    - 每个主机一个令牌桶，所有并发抓取共同消耗
+    - 遵守 robots.txt 的 Crawl-delay 与响应的 Retry-After
+    - 遇到 429/503 或网络错误时乘性收紧，持续健康时加性放宽 (AIMD)
+    """
+    def __init__(self, rate=DEFAULT_RATE, burst=BURST, min_rate=MIN_RATE, max_rate=MAX_RATE, respect_robots=RESPECT_ROBOTS):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.respect_robots = respect_robots
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.robots_fetch = None  # 由 Fetcher 注入，绕过限速直接抓取 robots.txt
+
+    def _bucket(self, url):
+        parts = urllib.parse.urlparse(url)
+        host = parts.netloc.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            created = bucket is None
+            if created:
+                bucket = HostBucket(HOST_RATES.get(host, self.rate), self.burst)
+                self._buckets[host] = bucket
+        if not created:
+            # 同主机的首批并发请求等首个线程读完 robots.txt，再按 Crawl-delay 排队
+            bucket.ready.wait(ROBOTS_WAIT)
+            return bucket
+        try:
+            if self.respect_robots and parts.scheme in ('http', 'https'):
+                bucket.min_interval = self._crawl_delay(f"{parts.scheme}://{parts.netloc}/robots.txt")
+        finally:
+            bucket.ready.set()
+        return bucket
+
+    def _crawl_delay(self, robots_url):
+        if not self.robots_fetch:
+            return 0.0
+        try:
+            resp = self.robots_fetch(robots_url)
+            if resp.status_code != 200:
+                return 0.0
+            return parse_crawl_delay(resp.text)
+        except Exception as e:
+            print(f"robots.txt fetch error for {robots_url}: {e}")
+            return 0.0
+
+    def acquire(self, url, max_wait=None, cancel=None):
+        """
+        阻塞直到该主机允许发起下一次请求
+        :param max_wait: 最多等待的秒数，None 为不限；需要等待更久时不占用令牌，直接返回 False
+        :param cancel: threading.Event，等待期间被 set 时提前返回 False
+        :return: 是否已获得请求许可
+        """
+        bucket = self._bucket(url)
+        wait = bucket.reserve(max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            if cancel is not None and cancel.wait(wait):
+                # 取消的请求不发出，退回预约的令牌
+                with bucket.lock:
+                    bucket.tokens += 1
+                return False
+            if cancel is None:
+                time.sleep(wait)
+        return True
+
+    def feedback(self, url, status_code=None, retry_after=None, elapsed=None, error=False):
+        """
+        根据响应结果调整该主机的速率
+        :param status_code: HTTP 状态码，网络错误时为 None
+        :param retry_after: 响应头 Retry-After 的原始值
+        :param elapsed: 响应耗时 (秒)
+        :param error: 是否发生网络错误 (超时、连接失败等)
+        """
+        bucket = self._bucket(url)
+        with bucket.lock:
+            now = time.monotonic()
+            if error or status_code in THROTTLE_STATUS:
+                factor = 0.5 if status_code in THROTTLE_STATUS else 0.75
+                bucket.rate = max(self.min_rate, bucket.rate * factor)
+                bucket.successes = 0
+                bucket.tokens = min(bucket.tokens, 0)
+                delay = parse_retry_after(retry_after)
+                if delay is None and status_code in THROTTLE_STATUS:
+                    delay = 1.0 / bucket.rate
+                if delay:
+                    bucket.blocked_until = max(bucket.blocked_until, now + delay)
+                return
+
+            if elapsed is not None:
+                bucket.latency = elapsed if bucket.latency is None else 0.8 * bucket.latency + 0.2 * elapsed
+                bucket.best_latency = elapsed if bucket.best_latency is None else min(bucket.best_latency, elapsed)
+                # 响应明显变慢说明对方有压力，暂不放宽
+                if bucket.latency > 3 * bucket.best_latency + 0.5:
+                    bucket.successes = 0
+                    return
+
+            bucket.successes += 1
+            if bucket.successes >= INCREASE_AFTER:
+                bucket.successes = 0
+                bucket.rate = min(self.max_rate, bucket.rate + INCREASE_STEP)
+
+    def snapshot(self):
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {
+            host: {
+                'rate': round(b.rate, 3),
+                'crawl_delay': b.min_interval,
+                'blocked_for': round(max(0.0, b.blocked_until - time.monotonic()), 3),
+                'latency': round(b.latency, 3) if b.latency is not None else None
+            }
+            for host, b in buckets.items()
+        }
+
+
+def parse_retry_after(value):
+    """
+    解析 Retry-After (秒数或 HTTP 日期)，返回秒数或 None
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except Exception:
+            return None
+    return min(max(0.0, seconds), MAX_RETRY_AFTER)
+
+
+def parse_crawl_delay(robots_txt, user_agent='*'):
+    """
+    从 robots.txt 中读取适用于 user_agent 的 Crawl-delay (支持小数，标准库 robotparser 只认整数)
+    """
+    delay = None
+    in_group = False
+    prev_was_agent = False
+    for raw in robots_txt.splitlines():
+        line = raw.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        key, value = [x.strip() for x in line.split(':', 1)]
+        key = key.lower()
+        if key == 'user-agent':
+            # 连续的 User-agent 行属于同一组
+            matched = value == '*' or value.lower() == user_agent.lower()
+            in_group = (in_group and prev_was_agent) or matched
+            prev_was_agent = True
+            continue
+        prev_was_agent = False
+        if key == 'crawl-delay' and in_group:
+            try:
+                delay = float(value)
+            except ValueError:
+                pass
+    return max(0.0, delay or 0.0)
@@ -0,0 +1,143 @@
+import html
+import os
+import re
+
+# 中文分词方式：bigram (默认，相邻两字一词，无需依赖) 或 jieba (需安装 jieba)
+# 建索引与查询必须使用同一种，切换后需重建全文索引
+SEARCH_SEGMENTER = os.environ.get('CRAWLER_SEARCH_SEGMENTER', 'bigram')
+SNIPPET_WIDTH = int(os.environ.get('CRAWLER_SNIPPET_WIDTH', 80))  # 摘要长度 (字)
+
+try:
+    import jieba
+    HAS_JIEBA = True
+except ImportError:
+    HAS_JIEBA = False
+
+_CJK = r'㐀-䶿一-鿿豈-﫿'
+_RUNS = re.compile(rf'[{_CJK}]+|[0-9A-Za-zÀ-ɏ]+')
+_IS_CJK = re.compile(rf'[{_CJK}]')
+
+
+def _use_jieba():
+    return SEARCH_SEGMENTER == 'jieba' and HAS_JIEBA
+
+
+def _cjk_tokens(run, tail=True):
+    if _use_jieba():
+        return [w for w in jieba.cut_for_search(run) if w.strip()]
+    tokens = [run[i:i + 2] for i in range(len(run) - 1)]
+    # 末字单独成词：只出现在一段汉字末尾的字没有以它开头的 bigram，单字检索靠它命中
+    if tail or not tokens:
+        tokens.append(run[-1])
+    return tokens
+
+
+def tokenize(text):
+    """
+    切成全文索引的词：中文按 bigram (或 jieba)，每段汉字的末字另成一词，字母数字按词并转小写
+    :return: 词列表
+    """
+    tokens = []
+    for run in _RUNS.findall(text or ''):
+        if _IS_CJK.match(run):
+            tokens.extend(_cjk_tokens(run))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def _query_tokens(term):
+    """
+    检索词的分词：与建索引相同，但检索词末尾那段汉字在正文中可能还没结束，不加末字
+    :return: (词列表, 末尾是否为单个汉字)
+    """
+    runs = _RUNS.findall(term)
+    tokens = []
+    for i, run in enumerate(runs):
+        if _IS_CJK.match(run):
+            tokens.extend(_cjk_tokens(run, tail=i < len(runs) - 1))
+        else:
+            tokens.append(run.lower())
+    single = bool(runs) and len(runs[-1]) == 1 and bool(_IS_CJK.match(runs[-1]))
+    return tokens, single
+
+
+def index_text(text):
+    """
+    存入 FTS5 表的文本：分好的词以空格连接，交给 unicode61 分词器按空格切分
+    """
+    return ' '.join(tokenize(text))
+
+
+def query_terms(q):
+    """
+    用户输入按空白切成检索词 (多个词同时命中)
+    """
+    return [t for t in (q or '').split() if _RUNS.search(t)]
+
+
+def _quote(token):
+    return '"' + token.replace('"', '""') + '"'
+
+
+def match_expression(q):
+    """
+    把用户输入转换成 FTS5 MATCH 表达式
+    - 每个检索词内的 bigram 组成短语 (相邻出现)，以单个汉字结尾时末词用前缀匹配
+    - 多个检索词之间为 AND
+    :return: 表达式，没有可检索的内容时返回 None
+    """
+    parts = []
+    for term in query_terms(q):
+        if _use_jieba():
+            tokens = tokenize(term)
+            if tokens:
+                parts.append(' AND '.join(_quote(t) for t in tokens))
+            continue
+        tokens, single = _query_tokens(term)
+        if not tokens:
+            continue
+        # 单字前缀同时命中以它开头的 bigram 与末字词
+        parts.append(_quote(' '.join(tokens)) + ('*' if single else ''))
+    return ' AND '.join(f'({p})' for p in parts) if parts else None
+
+
+def _term_pattern(q):
+    terms = sorted({t for t in query_terms(q)}, key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile('|'.join(re.escape(t) for t in terms), re.IGNORECASE)
+
+
+def highlight(text, q):
+    """
+    转义 HTML 并用 <mark> 标出检索词
+    """
+    text = text or ''
+    pattern = _term_pattern(q)
+    if not pattern:
+        return html.escape(text)
+    out = []
+    last = 0
+    for m in pattern.finditer(text):
+        out.append(html.escape(text[last:m.start()]))
+        out.append('<mark>' + html.escape(m.group(0)) + '</mark>')
+        last = m.end()
+    out.append(html.escape(text[last:]))
+    return ''.join(out)
+
+
+def snippet(text, q, width=SNIPPET_WIDTH):
+    """
+    取正文中第一个命中位置附近的一段作为摘要，并标出检索词
+    """
+    text = re.sub(r'\s+', ' ', text or '').strip()
+    if not text:
+        return ''
+    pattern = _term_pattern(q)
+    m = pattern.search(text) if pattern else None
+    start = max(0, m.start() - width // 4) if m else 0
+    end = min(len(text), start + width)
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if end < len(text) else ''
+    return prefix + highlight(text[start:end], q) + suffix
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import math
+import os
+import threading
+
+from tools.url_canon import url_hash
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+SEEN_FILTER_PATH = os.environ.get('CRAWLER_SEEN_FILTER') or os.path.join(basedir, '.cache', 'seen.bloom')
+SEEN_CAPACITY = int(os.environ.get('CRAWLER_SEEN_CAPACITY', 1000000))       # 预计条目数，超出后按两倍容量重建
+SEEN_ERROR_RATE = float(os.environ.get('CRAWLER_SEEN_ERROR_RATE', 0.001))   # 误判率 (把新条目当成已入库)
+SEEN_STOP_RATIO = float(os.environ.get('CRAWLER_SEEN_STOP_RATIO', 0.8))     # 增量采集时一页中已入库占比达到该值即停止翻页
+SEEN_FORMAT = 2  # 文件格式版本，收录内容变化时递增 (2: 同时收录跳转原地址)，旧文件作废后重新同步
+
+
+class BloomFilter:
+    """
+    布隆过滤器：只会把新条目误判为已见过 (概率约 error_rate)，不会漏判已见过的条目
+    """
+    def __init__(self, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        """
+        :return: key 之前是否 (可能) 已存在
+        """
+        present = True
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, key):
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+
+class SeenFilter:
+    """
+    已入库 URL 的持久化集合 (按规范化 URL 哈希，含跳转解析前的原地址)，供列表爬虫做增量采集
+    - 文件头记录已同步到的 CollectionItem 最大 id，每次采集前只补同步新入库的记录
+    - 删除的条目无法从布隆过滤器中移除，需要时整体重建
+    """
+    def __init__(self, path=SEEN_FILTER_PATH, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.max_id = 0
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('version') != SEEN_FORMAT:
+                    raise ValueError(f"format {header.get('version')} != {SEEN_FORMAT}")
+                bloom = BloomFilter(header['capacity'], header['error_rate'])
+                bits = f.read()
+            if len(bits) != len(bloom.bits):
+                raise ValueError("size mismatch")
+            bloom.bits = bytearray(bits)
+            bloom.count = header['count']
+            self.bloom = bloom
+            self.max_id = header['max_id']
+        except Exception as e:
+            print(f"Seen filter {self.path} unreadable, starting empty: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        header = {'version': SEEN_FORMAT, 'capacity': self.bloom.capacity, 'error_rate': self.bloom.error_rate,
+                  'count': self.bloom.count, 'max_id': self.max_id}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            f.write(self.bloom.bits)
+        os.replace(tmp, self.path)
+
+    def reset(self, capacity=None):
+        self.bloom = BloomFilter(capacity or self.bloom.capacity, self.bloom.error_rate)
+        self.max_id = 0
+
+    @property
+    def full(self):
+        return self.bloom.count >= self.bloom.capacity
+
+    def add_hash(self, h):
+        if h:
+            self.bloom.add(h)
+
+    def add(self, url):
+        self.add_hash(url_hash(url))
+
+    def __contains__(self, url):
+        h = url_hash(url)
+        return bool(h) and h in self.bloom
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def get_seen_filter():
+    global _filter
+    with _filter_lock:
+        if _filter is None:
+            _filter = SeenFilter()
+        return _filter
+
+
+class PageSeenCounter:
+    """
+    增量采集时统计每页已入库的比例，决定是否继续翻页
+    """
+    def __init__(self, seen, stop_ratio=SEEN_STOP_RATIO):
+        self.seen = seen
+        self.stop_ratio = stop_ratio
+        self.total = 0
+        self.known = 0
+        self.skipped = 0
+
+    def new_page(self):
+        self.total = self.known = 0
+
+    def is_known(self, url, original_url=None):
+        """
+        :param original_url: 跳转解析前的原地址，之前按原地址入库的条目也算已入库
+        :return: True 时跳过该条
+        """
+        if self.seen is None:
+            return False
+        self.total += 1
+        if url in self.seen or (original_url and original_url in self.seen):
+            self.known += 1
+            self.skipped += 1
+            return True
+        return False
+
+    @property
+    def exhausted(self):
+        return self.seen is not None and self.total > 0 and self.known / self.total >= self.stop_ratio
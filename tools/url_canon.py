@@ -0,0 +1,92 @@
+import hashlib
+import urllib.parse
+
+# 统计/分享类参数，不影响页面内容
+TRACKING_PARAMS = {
+    'spm', 'wfr', 'share_token', 'share_from', 'sharefrom', 'isappinstalled', 'scene', 'clicktime',
+    'enterid', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'from_source', 'timestamp'
+}
+TRACKING_PREFIXES = ('utm_',)
+# 按主机只保留的参数 (其余均为渠道标记)
+HOST_KEEP_PARAMS = {
+    'baijiahao.baidu.com': {'id'},
+}
+# 已知的明文跳转包装：主机 -> (路径, 携带目标地址的参数)，其他站点的同名参数是页面自身的参数
+REDIRECT_WRAPPERS = {
+    'link.zhihu.com': ('/', 'target'),
+    'link.juejin.cn': ('/', 'target'),
+    'link.csdn.net': ('/', 'target'),
+    'www.jianshu.com': ('/go-wild', 'url'),
+    'www.douban.com': ('/link2/', 'url'),
+    'weibo.cn': ('/sinaurl', 'u'),
+    'www.google.com': ('/url', 'q'),
+    'l.facebook.com': ('/l.php', 'u'),
+}
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def unwrap_redirect(url):
+    """
+    拆开 REDIRECT_WRAPPERS 中明文携带目标地址的跳转链接 (如 https://link.zhihu.com/?target=https%3A%2F%2F...)
+    百度 /link?url= 是加密串，需请求后才能解析，这里原样返回
+    """
+    for _ in range(3):
+        parts = urllib.parse.urlsplit(url)
+        wrapper = REDIRECT_WRAPPERS.get((parts.hostname or '').lower())
+        if not wrapper or (parts.path or '/') != wrapper[0]:
+            return url
+        values = urllib.parse.parse_qs(parts.query).get(wrapper[1])
+        if not values or not values[0].startswith(('http://', 'https://')):
+            return url
+        url = values[0]
+    return url
+
+
+def canonicalize_url(url):
+    """
+    URL 规范化，用于判重 (只合并确定是同一页面的写法)：
+    - 拆开已知的明文跳转包装，去掉片段与统计参数，剩余参数排序
+    - 协议与主机小写，去掉默认端口；协议不同、末尾斜杠不同的仍视为不同页面，交给近似重复检测
+    :return: 规范化后的 URL；无法解析时返回去空白后的原串
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+    url = unwrap_redirect(url)
+    try:
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https'):
+        return url
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    if port and str(port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = parts.path or '/'
+
+    keep = HOST_KEEP_PARAMS.get(parts.hostname or '')
+    params = []
+    for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True):
+        lk = k.lower()
+        if keep is not None and k not in keep:
+            continue
+        if lk in TRACKING_PARAMS or lk.startswith(TRACKING_PREFIXES):
+            continue
+        params.append((k, v))
+    params.sort()
+
+    return urllib.parse.urlunsplit((scheme, host, path, urllib.parse.urlencode(params), ''))
+
+
+def url_hash(url):
+    """
+    规范化 URL 的 SHA-1 (40 位十六进制)，作为 CollectionItem.url_hash 唯一键
+    """
+    canon = canonicalize_url(url)
+    if not canon:
+        return None
+    return hashlib.sha1(canon.encode('utf-8')).hexdigest()
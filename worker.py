@@ -0,0 +1,34 @@
+import argparse
+import multiprocessing
+import signal
+
+from app import create_app
+
+
+def _worker_main(stop_event):
+    # 每个进程各自创建 app 与数据库连接
+    from app.jobs import worker_loop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    app = create_app()
+    worker_loop(app, stop_event)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='后台任务 worker 进程池')
+    parser.add_argument('-n', '--procs', type=int, default=None, help='worker 进程数，默认取 JOB_WORKERS')
+    args = parser.parse_args()
+
+    procs = args.procs or create_app().config['JOB_WORKERS']
+    stop_event = multiprocessing.Event()
+
+    def _stop(signum, frame):
+        stop_event.set()
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    workers = [multiprocessing.Process(target=_worker_main, args=(stop_event,)) for _ in range(procs)]
+    for p in workers:
+        p.start()
+    print(f"Started {procs} job workers")
+    for p in workers:
+        p.join()